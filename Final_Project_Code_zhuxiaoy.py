@@ -2,27 +2,86 @@
 ##### Name:          Xiaoyang Zhu
 ##### Uniqname:      zhuxiaoy
 #################################
-from requests_oauthlib import OAuth1
-from bs4 import BeautifulSoup
-import requests
 import json
-import secrets
 import sqlite3
-import plotly.graph_objs as go
-from flask import Flask, render_template, request
+import os
+import sys
+import hashlib
+import importlib.util
+import threading
+from urllib.parse import urlencode
+from cache_store import CacheStore, migrate_json_cache, BOX_OFFICE_NAMESPACE, OMDB_NAMESPACE, OMDB_ID_NAMESPACE, TIME_INTERVALS
+import omdb_resolver
+import movie_db
+import interval_index
+from render_cache import RenderCache
+import instrumentation
+from instrumentation import timed
+## flask, requests, bs4 and numpy are imported by the functions that need them, so a query
+## (python Final_Project_Code_zhuxiaoy.py query ...) starts without loading them
 
-app = Flask(__name__)
-App = Flask(__name__)
+## one website serves both the comparison pages and the detail page of every movie (see get_app)
+APP = None
 
+DB_FILENAME = movie_db.DB_FILENAME
 CACHE_FILENAME = "cache.json"
-CACHE_DICT = {}
-api_key = secrets.API_KEY
-oauth = OAuth1(client_key = api_key)
+CACHE_DB_FILENAME = "cache.sqlite"
+CACHE_DICT = None
+## the cache keeps at most this many bytes of (compressed) pages and OMDB responses, dropping the least recently used
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_COMPRESS = True
+BOX_OFFICE_BASE_URL = "https://www.boxofficemojo.com"
+OMDB_BASE_URL = 'http://www.omdbapi.com/'
+## at most this many requests per second are sent to each host
+RATE_LIMITS = {'www.boxofficemojo.com': 2, 'www.omdbapi.com': 10}
+MAX_WORKERS = 8
+## rows per executemany call, and titles looked up on OMDB together, when the tables are built
+BATCH_SIZE = 500
+## a changed page with fewer rows than this share of the rows stored for its time interval is taken for an
+## error page (or a page cut short) and its rows are kept, instead of deleting the years missing from it
+MIN_PAGE_ROWS_RATIO = 0.5
+## processes parsing Box Office Mojo pages when the tables are built (1 parses in the program's own process)
+PARSE_WORKERS = 1
+FETCHER = None
+PLOTLY_JS = None
+HOST = '127.0.0.1'
+PORT = 5000
+## the number of requests the server handles at the same time
+SERVER_THREADS = 8
+SERVER_THREAD = None
+## the json API the pages fetch their data from (see api_server.py). The website answers it under /api/ itself,
+## so the pages ask their own site; set API_BASE_URL (or --api-url=https://api.example.com) when the API is
+## served on its own instead (python api_server.py --allow-origin=<the website's origin>)
+API_BASE_URL = ''
+API = None
+## rendered pages of both websites, emptied when a build or sync changes Movies.sqlite
+RENDER_CACHE = RenderCache(lambda: movie_db.get_database_version(DB_FILENAME))
+## the variables the comparison form offers for each kind of movies
+COMPARISON_FORM = {'AllMovies': ['cumulative gross', 'average gross'],
+                   'Champions': ['gross', 'IMDB rating', 'Rotten Tomatoes rating', 'Metacritic rating']}
+## the OMDB key and its OAuth1 signer, read the first time OMDB is asked (see get_omdb_auth)
+OMDB_AUTH = None
+## whether the comparison queries read the in-memory dataset (movie_dataset.py); a one-shot query
+## reads SQLite instead, which is faster than importing numpy and loading the dataset
+USE_DATASET = True
+## whether the champions of a time interval and the details of a movie are read from the in-memory
+## index (interval_index.py); a one-shot query reads SQLite instead, which is faster than loading it
+USE_INDEX = True
+## the most movies /api/search answers
+SEARCH_MAX_LIMIT = 50
+## the longest rolling average (in years) and the most genres or directors /analytics answers
+ANALYTICS_MAX_WINDOW = 50
+ANALYTICS_MAX_LIMIT = 50
+## the number of box office champions the command line program lists at a time
+PAGE_SIZE = 10
+## the subcommands of the program (see the end of this file)
+COMMANDS = ['build', 'serve', 'browse', 'query']
 
 def open_cache():
-    ''' Opens the cache file if it exists and loads the JSON into
-    the CACHE_DICT dictionary.
-    if the cache file doesn't exist, creates a new cache dictionary
+    ''' Opens the cache store once and keeps it in CACHE_DICT, removing the entries that have expired
+    (see cache_store.DEFAULT_POLICIES for how long pages and OMDB responses are kept).
+    If the store is empty and an old cache.json exists, the json cache is migrated into it
+    so later runs never parse the json file again.
     
     Parameters
     ----------
@@ -30,33 +89,33 @@ def open_cache():
     
     Returns
     -------
-    The opened cache: dict
+    The opened cache: CacheStore
     '''
-    try:
-        cache_file = open(CACHE_FILENAME, 'r')
-        cache_contents = cache_file.read()
-        cache_dict = json.loads(cache_contents)
-        cache_file.close()
-    except:
-        cache_dict = {}
-    return cache_dict
+    global CACHE_DICT
+    if CACHE_DICT is None:
+        with instrumentation.span('cache load'):
+            CACHE_DICT = CacheStore(CACHE_DB_FILENAME, max_bytes=CACHE_MAX_BYTES, compress=CACHE_COMPRESS)
+            CACHE_DICT.prune()
+            if len(CACHE_DICT) == 0 and os.path.exists(CACHE_FILENAME):
+                migrate_json_cache(CACHE_FILENAME, CACHE_DICT)
+    return CACHE_DICT
 
-def save_cache(cache_dict):
-    ''' Saves the current state of the cache to disk
+def open_fetcher():
+    ''' Creates the shared fetcher once and keeps it in FETCHER.
     
     Parameters
     ----------
-    cache_dict: dict
-        The dictionary to save
+    None
     
     Returns
     -------
-    None
+    The shared fetcher: Fetcher
     '''
-    dumped_json_cache = json.dumps(cache_dict)
-    fw = open(CACHE_FILENAME,"w")
-    fw.write(dumped_json_cache)
-    fw.close()
+    global FETCHER
+    if FETCHER is None:
+        from fetcher import Fetcher
+        FETCHER = Fetcher(max_workers=MAX_WORKERS, rate_limits=RATE_LIMITS)
+    return FETCHER
 
 class Movie:
     '''a movie of the highest box office in one specific time interval (e.g. the first quarter of 2020)
@@ -73,11 +132,14 @@ class Movie:
         the name of a movie (e.g. 'Bad Boys for Life')
 
     gross: int
-        the gross of a movie (e.g. $135,561,888)
+        the gross of a movie in dollars (e.g. 135561888)
 
     id: int
         the id of a movie (e.g. 1)
     '''
+    ## no per-instance __dict__, so a long list of movies takes a fraction of the memory
+    __slots__ = ('year', 'time_interval', 'name', 'gross', 'id')
+
     def __init__(self, year, time_interval, name, gross, id):
         self.year = year
         self.time_interval = time_interval
@@ -86,7 +148,7 @@ class Movie:
         self.id = id
 
     def info(self):
-        return '<' + self.name + '>,' + ' (' + str(self.year) + ') ' + ' with a gross of ' + str(self.gross) + '.'
+        return '<' + self.name + '>,' + ' (' + str(self.year) + ') ' + ' with a gross of ' + format_money(self.gross) + '.'
 
 def get_information_from_box_office_website(response):
     '''Extract all important information from the scraping result of the box office website.
@@ -110,44 +172,297 @@ def get_information_from_box_office_website(response):
         and values are lists that contain the corresponding information.
         (e.g. {'Movie Year':[2020,2019,......], 'Movie Name': ['Bad Boys for Life','The King's Speech']})
     '''
-    soup = BeautifulSoup(response, 'html.parser')
-    SearchTable = soup.find('div', class_='a-section imdb-scroll-table-inner')
-    
-    MovieYears = SearchTable.find_all('td', class_='a-text-left mojo-header-column mojo-truncate mojo-field-type-year mojo-sort-column')
-    Movie_Year = []
-    for movie in MovieYears:
-        Movie_Year.append(movie.text)
-
-    MovieNames = SearchTable.find_all('td', class_='a-text-left mojo-field-type-release mojo-cell-wide')
-    Movie_Name = []
-    for movie in MovieNames:
-        Movie_Name.append(movie.text)
-
-    AllGross = SearchTable.find_all('td', class_='a-text-right mojo-field-type-money')
-    All_Gross = []
-    for movie in AllGross:
-        All_Gross.append(movie.text)
-    Cumulative_G = []
-    Average_G = []
-    Gross = []
-    for i in list(range(len(All_Gross))):
-        ind = i % 3
-        if ind == 0:
-            Cumulative_G.append(All_Gross[i])
-        if ind == 1:
-            Average_G.append(All_Gross[i])
-        if ind == 2:
-            Gross.append(All_Gross[i])
-    
-    Releases = SearchTable.find_all('td', class_='a-text-right mojo-field-type-positive_integer')
-    Release = []
-    for movie in Releases:
-        Release.append(movie.text)
-    
-    Movie_List_Dict= {}
-    Movie_List_Dict = {'Movie Year': Movie_Year, 'Movie Name': Movie_Name, 'Gross': Gross, 'Release': Release, 'Cumulative Gross': Cumulative_G, 'Average Gross': Average_G}
+    from box_office_parser import parse_box_office_rows
+    Movie_Rows = parse_box_office_rows(response)
+    Movie_List_Dict = {'Movie Year': [], 'Movie Name': [], 'Gross': [], 'Release': [], 'Cumulative Gross': [], 'Average Gross': []}
+    for year, name, gross, release, cumulative_gross, average_gross in Movie_Rows:
+        Movie_List_Dict['Movie Year'].append(year)
+        Movie_List_Dict['Movie Name'].append(name)
+        Movie_List_Dict['Gross'].append(gross)
+        Movie_List_Dict['Release'].append(release)
+        Movie_List_Dict['Cumulative Gross'].append(cumulative_gross)
+        Movie_List_Dict['Average Gross'].append(average_gross)
     return Movie_List_Dict
 
+def parse_number(text):
+    ''' Converts a scraped money amount or count into an integer.
+
+    Parameters
+    ----------
+    text: string
+        a number as shown on the box office website (e.g. '$135,561,888', '246')
+
+    Returns
+    -------
+    int
+        the number (e.g. 135561888), or None if the text holds no number (e.g. '-')
+    '''
+    if isinstance(text, (int, float)):
+        return int(text)
+    digits = text.replace('$', '').replace(',', '').strip()
+    if not digits.isdigit():
+        return None
+    return int(digits)
+
+def parse_rating(text):
+    ''' Converts an OMDB rating into a float on a 100-point scale.
+
+    Parameters
+    ----------
+    text: string
+        a rating as given by OMDB (e.g. '8.1/10', '94%', '64/100')
+
+    Returns
+    -------
+    float
+        the rating out of 100 (e.g. 81.0, 94.0, 64.0), or None if there is no rating
+    '''
+    if text is None or isinstance(text, float):
+        return text
+    try:
+        if '/' in text:
+            score, scale = text.split('/')
+            return round(float(score) / float(scale) * 100, 1)
+        return float(text.split('%')[0])
+    except ValueError:
+        return None
+
+def parse_runtime(text):
+    ''' Converts an OMDB runtime into minutes.
+
+    Parameters
+    ----------
+    text: string
+        a runtime as given by OMDB (e.g. '124 min')
+
+    Returns
+    -------
+    int
+        the runtime in minutes (e.g. 124), or None if there is no runtime (e.g. 'N/A')
+    '''
+    if text is None or isinstance(text, int):
+        return text
+    minutes = text.split(' ')[0]
+    if not minutes.isdigit():
+        return None
+    return int(minutes)
+
+def format_money(amount):
+    ''' Formats a number of dollars for display (e.g. 135561888 -> '$135,561,888').
+    '''
+    if amount is None:
+        return 'N/A'
+    return '${:,}'.format(amount)
+
+def normalize_box_office_row(row):
+    ''' Converts the strings of one row read by parse_box_office_rows into numbers,
+    so the tables hold integers that SQLite can sort and aggregate.
+
+    Parameters
+    ----------
+    row: tuple
+        a (year, movie name, gross, release, cumulative gross, average gross) tuple of strings
+        (e.g. ('2020', 'Bad Boys for Life', '$204,417,855', '246', '$1,789,195,274', '$7,273,151'))
+
+    Returns
+    -------
+    tuple
+        the same fields with an integer year and integer grosses and release count
+        (e.g. (2020, 'Bad Boys for Life', 204417855, 246, 1789195274, 7273151))
+    '''
+    year, name, gross, release, cumulative_gross, average_gross = row
+    return int(year), name, parse_number(gross), parse_number(release), parse_number(cumulative_gross), parse_number(average_gross)
+
+def get_box_office_urls():
+    ''' Makes the urls of the Box Office Mojo pages of all quarters and months.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    list
+        a list of (time interval, url) tuples in the order of quarters then months
+    '''
+    Quarter = ['q1','q2','q3','q4']
+    Month = ['january','february','march','april','may','june','july','august','september','october','november','december']
+    QuarterName = {'q1': 'first quarter', 'q2': 'second quarter', 'q3': 'third quarter', 'q4': 'fourth quarter'}
+
+    Urls = []
+    for quarter in Quarter:
+        Urls.append((QuarterName[quarter], BOX_OFFICE_BASE_URL + "/quarter/" + quarter + "/?grossesOption=calendarGrosses"))
+    for month in Month:
+        Urls.append((month, BOX_OFFICE_BASE_URL + "/month/" + month + "/?grossesOption=calendarGrosses"))
+    return Urls
+
+def get_validators(response):
+    ''' Reads the ETag and Last-Modified headers of a response, the ones a conditional request sends back.
+    '''
+    return dict((name, response.headers[name]) for name in ['ETag', 'Last-Modified'] if name in response.headers)
+
+def fetch_box_office_page(TimeInterval, BoxOfficeUrl, meta):
+    '''Fetches one Box Office Mojo page and saves it to the cache with its ETag, Last-Modified and content hash.
+    A page cached before is revalidated with a conditional request (If-None-Match and If-Modified-Since);
+    when the website answers 304 Not Modified, nothing is downloaded and only the expiry of the cached page
+    is renewed. When the fetch fails (e.g. 404 Not Found), a page cached before is kept with its validators
+    and stays expired, so the next sync asks for it again. Runs on a fetcher thread.
+
+    Parameters
+    ----------
+    TimeInterval: string
+        the time interval of the page (e.g. 'june')
+    BoxOfficeUrl: string
+        the url of the page
+    meta: dict
+        the metadata saved with the cached page (e.g. {'ETag': '"5f2b..."', 'hash': '9f86d0...'}), or {}
+
+    Returns
+    -------
+    tuple
+        (the metadata of the page, its html or None if it did not change)
+    '''
+    headers = {}
+    if 'ETag' in meta:
+        headers['If-None-Match'] = meta['ETag']
+    if 'Last-Modified' in meta:
+        headers['If-Modified-Since'] = meta['Last-Modified']
+    import requests
+    try:
+        response = open_fetcher().get(BoxOfficeUrl, headers=headers)
+    except requests.RequestException as e:
+        if open_cache().get_meta(BOX_OFFICE_NAMESPACE, TimeInterval) is None:
+            raise
+        print("Keeping the cached page of " + TimeInterval + ": " + str(e))
+        instrumentation.count('page fetches failed')
+        return meta, None
+    if response.status_code == 304:
+        instrumentation.count('pages not modified')
+        meta = dict(meta, **get_validators(response))
+        open_cache().refresh(BOX_OFFICE_NAMESPACE, TimeInterval, meta)
+        return meta, None
+    html = response.text
+    meta = dict(get_validators(response), hash=get_source_hash(html))
+    open_cache().set(BOX_OFFICE_NAMESPACE, TimeInterval, html, meta)
+    return meta, html
+
+def iter_box_office_entries(Urls=None):
+    '''Makes sure the Box Office Mojo pages are cached and fresh, one at a time, in order, without reading them.
+    Pages that are not cached or have expired are fetched (or revalidated) at most MAX_WORKERS ahead
+    of the page being yielded.
+
+    Parameters
+    ----------
+    Urls: list
+        the (time interval, url) tuples of the pages, by default those of all quarters and months
+
+    Returns
+    -------
+    generator
+        (time interval, metadata, html) tuples, where html is None when the page was already cached
+        or did not change (read it with read_box_office_page)
+    '''
+    if Urls is None:
+        Urls = get_box_office_urls()
+    CACHE_DICT = open_cache()
+    fetcher = open_fetcher()
+    Pending = {}
+    Fresh = {}
+    ahead = 0
+    for i in list(range(len(Urls))):
+        ## start the fetches of the next uncached or expired pages while this one is read
+        while ahead < len(Urls) and len(Pending) < MAX_WORKERS:
+            TimeInterval, BoxOfficeUrl = Urls[ahead]
+            entry = CACHE_DICT.get_meta(BOX_OFFICE_NAMESPACE, TimeInterval)
+            if entry is not None and entry[1]:
+                Fresh[ahead] = entry[0]
+            else:
+                meta = {} if entry is None else entry[0]
+                Pending[ahead] = fetcher.call(BOX_OFFICE_NAMESPACE + ':' + TimeInterval, fetch_box_office_page, TimeInterval, BoxOfficeUrl, meta)
+            ahead = ahead + 1
+        TimeInterval = Urls[i][0]
+        with instrumentation.span('box office page', interval=TimeInterval):
+            if i in Fresh:
+                print("Using Cache")
+                instrumentation.count('cache hits: ' + BOX_OFFICE_NAMESPACE)
+                meta, response = Fresh.pop(i), None
+            else:
+                print("Fetching")
+                instrumentation.count('cache misses: ' + BOX_OFFICE_NAMESPACE)
+                meta, response = Pending.pop(i).result()
+        yield TimeInterval, meta, response
+
+def read_box_office_page(TimeInterval):
+    '''Reads (and decompresses) the cached html of a page checked by iter_box_office_entries.
+    '''
+    return open_cache().get(BOX_OFFICE_NAMESPACE, TimeInterval, allow_expired=True)
+
+def iter_box_office_pages(Urls=None):
+    '''Yields the html of the Box Office Mojo pages one at a time, in order.
+    A page is read from the cache only when it is its turn, and pages that are not cached are fetched
+    at most MAX_WORKERS ahead of the page being yielded, so only a few pages are in memory at once.
+
+    Parameters
+    ----------
+    Urls: list
+        the (time interval, url) tuples of the pages, by default those of all quarters and months
+
+    Returns
+    -------
+    generator
+        (time interval, html) tuples (e.g. ('first quarter', '<html>...'))
+    '''
+    for TimeInterval, meta, response in iter_box_office_entries(Urls):
+        if response is None:
+            response = read_box_office_page(TimeInterval)
+        yield TimeInterval, response
+
+def get_box_office_pages():
+    '''Get the html of the Box Office Mojo pages of all quarters and months.
+    Pages that are not cached are fetched concurrently and saved to the cache.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    list
+        a list of (time interval, html) tuples in the order of quarters then months
+        (e.g. [('first quarter', '<html>...'), ..., ('december', '<html>...')])
+    '''
+    return list(iter_box_office_pages())
+
+def iter_box_office_tuples(Pages=None, workers=None):
+    '''Yields the tuples of the movies of the highest box office page by page, with ids counted from 1
+    in the order of the pages, so the rows of a page can be stored before the next page is read.
+    With several workers the pages are parsed in a pool of processes (see box_office_parser.parse_pages);
+    the rows still come back in the order of the pages, so the ids are the same.
+
+    Parameters
+    ----------
+    Pages: iterable
+        (time interval, html) tuples, by default iter_box_office_pages()
+    workers: int
+        the number of processes parsing pages, by default PARSE_WORKERS
+
+    Returns
+    -------
+    generator
+        (id, year, time interval, movie name, gross, release, cumulative gross, average gross) tuples
+    '''
+    if Pages is None:
+        Pages = iter_box_office_pages()
+    if workers is None:
+        workers = PARSE_WORKERS
+    a = 1
+    from box_office_parser import parse_pages
+    for TimeInterval, Rows in parse_pages(Pages, workers):
+        for row in Rows:
+            year, name, gross, release, cumulative_gross, average_gross = normalize_box_office_row(row)
+            yield (a, year, TimeInterval, name, gross, release, cumulative_gross, average_gross)
+            a = a + 1
+
 def get_box_office_tuples():
     '''Make a list of tuples that represent movies of the highest box office in different time intervals (quarters/ months).
 
@@ -163,193 +478,919 @@ def get_box_office_tuples():
         the number of released movies in this time interval, the cumulative gross of all movies in this time interval, 
         the average gross of all movies in this time interval
     '''
-    Quarter = ['q1','q2','q3','q4']
-    Month = ['january','february','march','april','may','june','july','august','september','october','november','december']
-    
-    AllBoxOffice_Quarter = []
-    a = 1
-    for quarter in Quarter:
-        BoxOfficeUrl_Q = "https://www.boxofficemojo.com/quarter/" + quarter + "/?grossesOption=calendarGrosses"
-        if quarter == 'q1':
-            TimeInterval = 'first quarter'
-        if quarter == 'q2':
-            TimeInterval = 'second quarter'
-        if quarter == 'q3':
-            TimeInterval = 'third quarter'
-        if quarter == 'q4':
-            TimeInterval = 'fourth quarter'
-        
-        CACHE_DICT = open_cache()
-        if TimeInterval in CACHE_DICT.keys():
-            print("Using Cache")
-            response = CACHE_DICT[TimeInterval]
+    return list(iter_box_office_tuples())
+
+def batched(iterable, size):
+    ''' Groups the items of an iterable into lists of at most size items, without reading ahead further.
+
+    Parameters
+    ----------
+    iterable: iterable
+        the items (e.g. a generator of rows)
+    size: int
+        the number of items per list (e.g. 100)
+
+    Returns
+    -------
+    generator
+        lists of consecutive items
+    '''
+    Batch = []
+    for item in iterable:
+        Batch.append(item)
+        if len(Batch) >= size:
+            yield Batch
+            Batch = []
+    if len(Batch) > 0:
+        yield Batch
+
+def get_film_key(title, year):
+    ''' Makes the cache key of the film a box office row names (e.g. 'Bad Boys for Life|2020').
+    '''
+    return title + '|' + str(year)
+
+def get_omdb_auth():
+    ''' Reads the OMDB key once, from secrets.py or from OMDB_API_KEY when secrets.py has none
+    (e.g. offline benchmarks). Only building or syncing the tables asks OMDB, so only they need a key.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tuple
+        (the key, its OAuth1 signer)
+    '''
+    global OMDB_AUTH
+    if OMDB_AUTH is None:
+        import secrets
+        from requests_oauthlib import OAuth1
+        api_key = getattr(secrets, 'API_KEY', os.environ.get('OMDB_API_KEY'))
+        if api_key is None:
+            raise RuntimeError('An OMDB api key is needed to look movies up: put API_KEY in secrets.py or set OMDB_API_KEY')
+        OMDB_AUTH = (api_key, OAuth1(client_key = api_key))
+    return OMDB_AUTH
+
+def request_omdb(params):
+    ''' Sends one OMDB request and returns its json.
+
+    Parameters
+    ----------
+    params: dict
+        the query of the request (e.g. {'t': 'The Lion King', 'y': 2019}, {'s': 'The Lion King'} or {'i': 'tt6105098'})
+
+    Returns
+    -------
+    dict
+        the OMDB json
+    '''
+    api_key, oauth = get_omdb_auth()
+    params = dict(params, apikey=api_key)
+    return open_fetcher().get(OMDB_BASE_URL, params=params, auth=oauth).json()
+
+def fetch_omdb_details(imdb_id):
+    ''' Fetches the OMDB json of a film by its imdbID and saves it to the cache. Runs on a fetcher thread.
+    '''
+    response = request_omdb({'i': imdb_id})
+    open_cache().set(OMDB_NAMESPACE, imdb_id, response)
+    return response
+
+def resolve_omdb_response(title, year, legacy=None):
+    ''' Finds the OMDB record of the film a box office row names and saves its imdbID and json to the cache.
+    The title and year are looked up first (t= and y=), except for a re-release; if that finds no film of
+    that year, OMDB is searched (s=) for the title without its re-release suffix and the results are ranked
+    (see omdb_resolver.rank_search_results). A film found by neither is saved as unresolved, so it is only
+    tried again once the entry expires. Runs on a fetcher thread.
+
+    Parameters
+    ----------
+    title: string
+        the name of the movie on the box office website (e.g. 'The Lion King')
+    year: int
+        the year of the box office row (e.g. 2019)
+    legacy: dict
+        the OMDB json cached for the title alone by the earlier version, which is not this film (see
+        submit_omdb_responses); if there is one and OMDB cannot be reached, the film is left unresolved
+        instead of failing the build
+
+    Returns
+    -------
+    dict
+        the OMDB json of the film, or omdb_resolver.NOT_FOUND
+    '''
+    import requests
+    CACHE_DICT = open_cache()
+    search_title, rerelease = omdb_resolver.clean_title(title)
+    try:
+        response = None
+        if not rerelease:
+            response = request_omdb({'t': title, 'y': year})
+            if not omdb_resolver.is_match(response, title, year):
+                response = None
+        if response is None:
+            instrumentation.count('omdb searches')
+            imdb_id = omdb_resolver.rank_search_results(request_omdb({'s': search_title, 'type': 'movie'}), search_title, year, rerelease)
+            if imdb_id is not None:
+                response = request_omdb({'i': imdb_id})
+    except (requests.RequestException, ValueError):
+        ## nothing is saved, so the film is resolved again by the next run
+        if legacy is None:
+            raise
+        return omdb_resolver.NOT_FOUND
+    if response is None or response.get('Response') != 'True':
+        CACHE_DICT.set(OMDB_ID_NAMESPACE, get_film_key(title, year), {'imdbID': None})
+        return omdb_resolver.NOT_FOUND
+    CACHE_DICT.set_many([(OMDB_ID_NAMESPACE, get_film_key(title, year), {'imdbID': response['imdbID']}),
+                         (OMDB_NAMESPACE, response['imdbID'], response)])
+    return response
+
+def submit_omdb_responses(Films):
+    ''' Reads the OMDB json of the cached films and starts resolving or fetching the others, each distinct
+    film once, without waiting for the fetches. A film whose imdbID is cached costs one cache lookup of its
+    json by id; an OMDB response cached by the earlier version for the title alone is kept if it is a movie
+    of the right year, and resolved again otherwise (see resolve_omdb_response).
+
+    Parameters
+    ----------
+    Films: list
+        a list of (title, year) tuples of box office rows, possibly with repetitions
+        (e.g. [('Bad Boys for Life', 2020), ('Captain Marvel', 2019)])
+
+    Returns
+    -------
+    dict
+        a dictionary whose keys are the (title, year) tuples and values are the OMDB json of the cached films
+        and the futures of the fetched ones (see collect_omdb_responses)
+    '''
+    CACHE_DICT = open_cache()
+    fetcher = open_fetcher()
+    Responses = {}
+    Entries = []
+    for film in Films:
+        if film in Responses:
+            continue
+        title, year = film
+        film_key = get_film_key(title, year)
+        resolved = CACHE_DICT.get(OMDB_ID_NAMESPACE, film_key)
+        legacy = None
+        response = None
+        if resolved is None:
+            legacy = CACHE_DICT.get(OMDB_NAMESPACE, title)
+            if legacy is not None and omdb_resolver.is_match(legacy, title, year):
+                resolved = {'imdbID': legacy['imdbID']}
+                response = legacy
+                Entries.append((OMDB_ID_NAMESPACE, film_key, resolved))
+                Entries.append((OMDB_NAMESPACE, legacy['imdbID'], legacy))
+        elif resolved['imdbID'] is None:
+            response = omdb_resolver.NOT_FOUND
         else:
-            print("Fetching")
-            CACHE_DICT[TimeInterval] = requests.get(BoxOfficeUrl_Q).text
-            response = CACHE_DICT[TimeInterval]
-            save_cache(CACHE_DICT)
-        Movie_Dicts = get_information_from_box_office_website(response)
-        for i in list(range(len(Movie_Dicts['Movie Year']))): ## All lists share the same length
-            single_tuple = a+i,Movie_Dicts['Movie Year'][i], TimeInterval, Movie_Dicts['Movie Name'][i], Movie_Dicts['Gross'][i], Movie_Dicts['Release'][i], Movie_Dicts['Cumulative Gross'][i], Movie_Dicts['Average Gross'][i]
-            AllBoxOffice_Quarter.append(single_tuple)
-        a = a + len(Movie_Dicts['Movie Year'])
-
-    AllBoxOffice_Month = []
-    b = len(AllBoxOffice_Quarter) + 1
-    for month in Month:
-        BoxOfficeUrl_M = "https://www.boxofficemojo.com/month/" + month + "/?grossesOption=calendarGrosses"
-        TimeInterval = month
-        CACHE_DICT = open_cache()
-        if TimeInterval in CACHE_DICT.keys():
+            response = CACHE_DICT.get(OMDB_NAMESPACE, resolved['imdbID'])
+        if response is not None:
             print("Using Cache")
-            response = CACHE_DICT[TimeInterval]
+            instrumentation.count('cache hits: ' + OMDB_NAMESPACE)
         else:
             print("Fetching")
-            CACHE_DICT[TimeInterval] = requests.get(BoxOfficeUrl_M).text
-            response = CACHE_DICT[TimeInterval]
-            save_cache(CACHE_DICT)
-        Movie_Dicts = get_information_from_box_office_website(response)
-        for i in list(range(len(Movie_Dicts['Movie Year']))): ## All lists share the same length
-            single_tuple = b+i,Movie_Dicts['Movie Year'][i], TimeInterval, Movie_Dicts['Movie Name'][i], Movie_Dicts['Gross'][i], Movie_Dicts['Release'][i], Movie_Dicts['Cumulative Gross'][i], Movie_Dicts['Average Gross'][i]
-            AllBoxOffice_Month.append(single_tuple)
-        b = b + len(Movie_Dicts['Movie Year'])
-
-    AllBoxOffice = AllBoxOffice_Quarter + AllBoxOffice_Month
-    return(AllBoxOffice)
-
-def get_detailed_information_tuples(AllBoxOffice):
+            instrumentation.count('cache misses: ' + OMDB_NAMESPACE)
+            if resolved is None:
+                response = fetcher.call(OMDB_ID_NAMESPACE + ':' + film_key, resolve_omdb_response, title, year, legacy)
+            else:
+                response = fetcher.call(OMDB_NAMESPACE + ':' + resolved['imdbID'], fetch_omdb_details, resolved['imdbID'])
+        Responses[film] = response
+    if len(Entries) > 0:
+        CACHE_DICT.set_many(Entries)
+    return Responses
+
+@timed('omdb resolution')
+def collect_omdb_responses(Responses):
+    ''' Waits for the fetches started by submit_omdb_responses (their json is saved to the cache by the fetcher threads).
+
+    Parameters
+    ----------
+    Responses: dict
+        the result of submit_omdb_responses
+
+    Returns
+    -------
+    dict
+        the same dictionary, with the OMDB json of every film
+    '''
+    for film in Responses:
+        if not isinstance(Responses[film], dict):
+            Responses[film] = Responses[film].result()
+    return Responses
+
+def get_omdb_responses(Films):
+    ''' get the OMDB json of every film. Films that are not cached are resolved concurrently,
+    each distinct film only once, and saved to the cache.
+
+    Parameters
+    ----------
+    Films: list
+        a list of (title, year) tuples, possibly with repetitions (e.g. [('Bad Boys for Life', 2020), ('Captain Marvel', 2019)])
+
+    Returns
+    -------
+    dict
+        a dictionary whose keys are the (title, year) tuples and values are the OMDB json of the films
+    '''
+    return collect_omdb_responses(submit_omdb_responses(Films))
+
+def iter_omdb_batches(BoxOfficeRows, batch_size=BATCH_SIZE):
+    ''' Groups box office rows into batches and looks up their films on OMDB, one batch ahead:
+    the fetches of the next batch run while the current batch is being used.
+
+    Parameters
+    ----------
+    BoxOfficeRows: iterable
+        box office tuples whose second field is the year and fourth field is the movie name
+    batch_size: int
+        the number of rows per batch
+
+    Returns
+    -------
+    generator
+        (rows, responses) tuples, where responses has the OMDB json of the (title, year) of the rows
+    '''
+    Previous = None
+    for Batch in batched(BoxOfficeRows, batch_size):
+        ## films of the previous batch are shared with it rather than looked up again
+        Shared = set()
+        if Previous is not None:
+            Shared = set((m[3], m[1]) for m in Batch if (m[3], m[1]) in Previous[1])
+        Submitted = submit_omdb_responses([(m[3], m[1]) for m in Batch if (m[3], m[1]) not in Shared])
+        if Previous is not None:
+            Responses = collect_omdb_responses(Previous[1])
+            for film in Shared:
+                Submitted[film] = Responses[film]
+            yield Previous[0], Responses
+        Previous = (Batch, Submitted)
+    if Previous is not None:
+        yield Previous[0], collect_omdb_responses(Previous[1])
+
+def get_movie_key(movie_name, year, response):
+    ''' Makes the canonical identity of a film: its lower-cased title and its year.
+    A film found on OMDB is identified by the OMDB title and year, so quarter and month rows
+    of the same film share one key. A film not found on OMDB is identified by its box office name
+    and the year of its box office row, so two unresolved films of the same name stay apart.
+
+    Parameters
+    ----------
+    movie_name: string
+        the name of the movie on the box office website (e.g. 'Bad Boys for Life')
+    year: int
+        the year of the box office row (e.g. 2020)
+    response: dict
+        the OMDB json of the movie
+
+    Returns
+    -------
+    string
+        the canonical key of the film (e.g. 'bad boys for life|2020')
+    '''
+    if response.get('Response') == 'True' and 'Title' in response:
+        title = response['Title']
+        year = response.get('Year', '')
+    else:
+        title = movie_name
+        year = str(year)
+    return ' '.join(title.split()).casefold() + '|' + year
+
+def get_movie_information(movie_name, year, response):
+    ''' Extracts the detailed information of one film from its OMDB json.
+
+    Parameters
+    ----------
+    movie_name: string
+        the name of the movie on the box office website (e.g. 'Bad Boys for Life')
+    year: int
+        the year of the box office row (e.g. 2020)
+    response: dict
+        the OMDB json of the movie
+
+    Returns
+    -------
+    tuple
+        the movie's canonical key, title, exact release date, runtime in minutes, genre, director,
+        rating values out of 100 from three websites(IMDB, Rotten Tomatoes, Metacritic)
+    '''
+    try:
+        title = response['Title']
+    except:
+        title = None
+    try:
+        release_date = response['Released']
+    except:
+        release_date = None
+    try:
+        runtime = parse_runtime(response['Runtime'])
+    except:
+        runtime = None
+    try:
+        genre = response['Genre']
+    except:
+        genre = None
+    try:
+        director = response['Director']
+    except:
+        director = None
+    ## OMDB leaves out the websites that have no rating, so ratings are matched by source rather than position
+    Ratings = {}
+    try:
+        for rating in response['Ratings']:
+            Ratings[rating['Source']] = rating['Value']
+    except:
+        pass
+    Internet_Movie_rating = parse_rating(Ratings.get('Internet Movie Database'))
+    Rotten_Tomatoes_rating = parse_rating(Ratings.get('Rotten Tomatoes'))
+    Metacritic_rating = parse_rating(Ratings.get('Metacritic'))
+    return get_movie_key(movie_name, year, response), title, release_date, runtime, genre, director, Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
+
+def iter_detailed_information(BoxOfficeRows, Responses=None, batch_size=BATCH_SIZE):
+    ''' Yields the detailed information of the movies of box office rows, looking up the titles of
+    batch_size rows on OMDB at a time. A film that is a champion of both a quarter and a month is
+    looked up and yielded only once; only the keys and ids of the films seen so far are kept.
+
+    Parameters
+    ----------
+    BoxOfficeRows: iterable
+        box office tuples whose first field is the id, second field is the year and fourth field is the movie name
+    Responses: dict
+        the OMDB json of the (title, year) of the rows if they have already been looked up (see get_omdb_responses)
+    batch_size: int
+        the number of rows whose titles are looked up together
+
+    Returns
+    -------
+    generator
+        (movie, (movie id, box office id)) tuples, where movie is the (id, canonical key, title, release date,
+        runtime, genre, director, IMDB rating, Rotten Tomatoes rating, Metacritic rating) tuple of a film
+        seen for the first time, or None if the film was already yielded
+    '''
+    Keys = {}
+    if Responses is None:
+        Batches = iter_omdb_batches(BoxOfficeRows, batch_size)
+    else:
+        Batches = ((Batch, Responses) for Batch in batched(BoxOfficeRows, batch_size))
+    for Batch, BatchResponses in Batches:
+        for m in Batch:
+            information = get_movie_information(m[3], m[1], BatchResponses[(m[3], m[1])])
+            movie = None
+            if information[0] not in Keys:
+                Keys[information[0]] = len(Keys) + 1
+                movie = (len(Keys),) + information
+            yield movie, (Keys[information[0]], m[0])
+
+def get_detailed_information_tuples(AllBoxOffice, Responses=None):
     ''' get the detailed information of movies of the highest box office from the OMDB website and make a list
-    of tuples to represent the informaion.
+    of tuples to represent the informaion, one tuple per distinct film. A film that is a champion of both
+    a quarter and a month is looked up and stored only once.
+
+    Parameters
+    ----------
+    AllBoxOffice: list
+        a list contains all movies of the highest box office in differnt time intervals (quarters/ months)
+    Responses: dict
+        the OMDB json of the (title, year) of the rows if they have already been looked up (see get_omdb_responses)
+
+    Returns
+    -------
+    tuple
+        (AllMovies, MovieIds)
+        AllMovies is a list of tuples that represent movies' detailed information obtained from the OMDB website.
+        The tuple includes a movie's id, canonical key, movie title, exact release date, runtime, genre, director,
+        rating values from three websites(IMDB, Rotten Tomatoes, Metacritic)
+        MovieIds is a list of (movie id, box office id) tuples linking every box office row to its movie
+    '''
+    AllMovies = []
+    MovieIds = []
+    for movie, movie_ids in iter_detailed_information(AllBoxOffice, Responses):
+        if movie is not None:
+            AllMovies.append(movie)
+        MovieIds.append(movie_ids)
+    return AllMovies, MovieIds
+
+BOX_OFFICE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS "BoxOffice"(
+        id integer PRIMARY KEY AUTOINCREMENT UNIQUE,
+        MovieYear integer NOT NULL, 
+        TimeInterval text NOT NULL, 
+        MovieName text NOT NULL, 
+        Gross integer, 
+        Release integer, 
+        CumulativeGross integer, 
+        AverageGross integer,
+        MovieId integer REFERENCES Movie(id))'''
+
+## one row per distinct film, keyed by its canonical title/year (see get_movie_key)
+MOVIE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS "Movie"(
+        id integer PRIMARY KEY AUTOINCREMENT UNIQUE,
+        MovieKey text NOT NULL UNIQUE,
+        title text, 
+        ReleaseDate text, 
+        runtime integer, 
+        genre text,
+        director text, 
+        Internet_Movie_rating real, 
+        Rotten_Tomatoes_rating real, 
+        Metacritic_rating real )'''
+
+## the detailed information of every box office row, read through the Movie table
+DETAILED_INFORMATION_VIEW_SQL = '''CREATE VIEW IF NOT EXISTS "MovieDetailedInformation" AS
+        SELECT BoxOffice.id AS id, title, ReleaseDate, runtime, genre, director,
+        Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
+        FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id'''
+
+## the hash of the page or OMDB record each part of the tables was last built from
+SOURCE_HASH_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS "SourceHash"(
+        source text PRIMARY KEY,
+        hash text NOT NULL)'''
+
+@timed('write BoxOffice')
+def create_box_office_table(AllBoxOffice):
+    ''' Constructs and executes SQL query to create a new table called BoxOffice showing 
+    all movies of the highest box office in different quarters/ months of the last fifty years in the US
+    
+    Parameters
+    ----------
+    AllBoxOffice: iterable
+        a list of tuples containing movies of the highest box office in differet quarters/ months of the last fifty years in US
+        (or a generator of them, which is inserted BATCH_SIZE rows at a time)
+    
+    Returns
+    -------
+    None
+    '''
+    conn = sqlite3.connect(DB_FILENAME)
+    c = conn.cursor()
+    # Drop table if exists
+    c.execute('''DROP TABLE IF EXISTS "BoxOffice"''')
+    # the source hashes no longer describe the table
+    c.execute('''DROP TABLE IF EXISTS "SourceHash"''')
+    # Create table
+    c.execute(BOX_OFFICE_TABLE_SQL)
+    # Insert several rows of data
+    for Batch in batched(AllBoxOffice, BATCH_SIZE):
+        c.executemany('INSERT INTO BoxOffice (id, MovieYear, TimeInterval, MovieName, Gross, Release, CumulativeGross, AverageGross) VALUES (?,?,?,?,?,?,?,?)', Batch)
+        instrumentation.count('rows written: BoxOffice', len(Batch))
+    movie_db.create_indexes(c)
+    movie_db.bump_database_version(c)
+    conn.commit() # Save (commit) the changes
+    # Be sure any changes have been committed or they will be lost.
+    conn.close()
+
+@timed('write Movie')
+def create_detailed_information_table(AllMovies, MovieIds):
+    ''' Constructs and executes SQL query to create a new table called Movie containing
+    the detailed information of movies obtained from the OMDB website, links every row of BoxOffice
+    to its movie and creates the MovieDetailedInformation view over both tables
+    
+    Parameters
+    ----------
+    AllMovies: list
+        a list of tuples comtaining movies and their detailed informaiton obtained from the OMDB website
+    MovieIds: list
+        a list of (movie id, box office id) tuples linking every box office row to its movie
+    
+    Returns
+    -------
+    None
+    '''
+    conn = sqlite3.connect(DB_FILENAME)
+    c = conn.cursor()
+    # Drop table if exists
+    drop_detailed_information(c)
+    c.execute('''DROP TABLE IF EXISTS "Movie"''')
+    # Create table
+    c.execute(MOVIE_TABLE_SQL)
+    c.execute(DETAILED_INFORMATION_VIEW_SQL)
+    # Insert several rows of data
+    for Batch in batched(AllMovies, BATCH_SIZE):
+        c.executemany('INSERT INTO Movie VALUES (?,?,?,?,?,?,?,?,?,?)', Batch)
+        instrumentation.count('rows written: Movie', len(Batch))
+    for Batch in batched(MovieIds, BATCH_SIZE):
+        c.executemany('UPDATE BoxOffice SET MovieId = ? WHERE id = ?', Batch)
+    movie_db.refresh_derived_tables(c)
+    movie_db.bump_database_version(c)
+    conn.commit() # Save (commit) the changes
+    # Be sure any changes have been committed or they will be lost.
+    conn.close()
+
+def drop_detailed_information(c):
+    ''' Drops MovieDetailedInformation, which is a view over Movie in this version
+    and a table of its own in databases built by the earlier version.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of Movies.sqlite
+
+    Returns
+    -------
+    None
+    '''
+    kind = c.execute('''SELECT type FROM sqlite_master WHERE name = 'MovieDetailedInformation' ''').fetchone()
+    if kind is not None and kind[0] == 'table':
+        c.execute('''DROP TABLE "MovieDetailedInformation"''')
+    elif kind is not None:
+        c.execute('''DROP VIEW "MovieDetailedInformation"''')
+
+def get_source_hash(source):
+    ''' Computes the content hash of a scraped page or an OMDB record.
+
+    Parameters
+    ----------
+    source: string or dict
+        the html of a page or the json of an OMDB response
+
+    Returns
+    -------
+    string
+        the sha1 hex digest of the content
+    '''
+    if not isinstance(source, str):
+        source = json.dumps(source, sort_keys=True)
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+def database_is_built():
+    ''' Checks whether Movies.sqlite already contains the tables, so the program can start without the set up.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    bool
+        True if BoxOffice, Movie and the summary and search tables exist
+    '''
+    conn = sqlite3.connect(DB_FILENAME)
+    c = conn.cursor()
+    tables = c.execute('''SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('BoxOffice', 'Movie')''').fetchall()
+    built = len(tables) == 2 and movie_db.derived_tables_exist(c)
+    conn.close()
+    return built
+
+def upgrade_tables(c, indexes=True):
+    ''' Creates missing tables and upgrades a database built by the earlier version, whose
+    MovieDetailedInformation was a table with one copy of the OMDB data per box office row.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of Movies.sqlite
+    indexes: bool
+        False to leave the indexes to the caller, which creates them after a bulk load
+
+    Returns
+    -------
+    None
+    '''
+    c.execute(BOX_OFFICE_TABLE_SQL)
+    c.execute(MOVIE_TABLE_SQL)
+    c.execute(SOURCE_HASH_TABLE_SQL)
+    columns = [column[1] for column in c.execute('PRAGMA table_info(BoxOffice)').fetchall()]
+    if 'MovieId' not in columns:
+        c.execute('ALTER TABLE BoxOffice ADD COLUMN MovieId integer REFERENCES Movie(id)')
+    drop_detailed_information(c)
+    upgrade_numeric_columns(c)
+    ## an earlier version keyed the films OMDB has no record of by name alone ('name|'), so films of the same
+    ## name shared a movie; their rows lose it and the OMDB step of the sync links them by name and year
+    c.execute('''UPDATE BoxOffice SET MovieId = NULL WHERE MovieId IN (SELECT id FROM Movie WHERE MovieKey LIKE '%|')''')
+    c.execute(DETAILED_INFORMATION_VIEW_SQL)
+    if indexes:
+        movie_db.create_indexes(c)
+
+def upgrade_numeric_columns(c):
+    ''' Rebuilds BoxOffice and Movie of a database built by an earlier version, where money,
+    release counts, runtimes and ratings were stored as strings (e.g. '$135,561,888', '124 min', '8.1/10').
+    The values are converted with the same functions used at ingestion and the ids are kept.
+    The MovieDetailedInformation view must be dropped before and created again after.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of Movies.sqlite
+
+    Returns
+    -------
+    None
+    '''
+    columns = dict((column[1], column[2].lower()) for column in c.execute('PRAGMA table_info(BoxOffice)').fetchall())
+    if columns['Gross'] != 'integer':
+        Rows = []
+        for m in c.execute('SELECT id, MovieYear, TimeInterval, MovieName, Gross, Release, CumulativeGross, AverageGross, MovieId FROM BoxOffice').fetchall():
+            Rows.append(m[:4] + tuple(parse_number(value) for value in m[4:8]) + m[8:])
+        c.execute(BOX_OFFICE_TABLE_SQL.replace('"BoxOffice"', '"BoxOffice_upgrade"'))
+        c.executemany('INSERT INTO BoxOffice_upgrade VALUES (?,?,?,?,?,?,?,?,?)', Rows)
+        c.execute('DROP TABLE BoxOffice')
+        c.execute('ALTER TABLE BoxOffice_upgrade RENAME TO BoxOffice')
+
+    columns = dict((column[1], column[2].lower()) for column in c.execute('PRAGMA table_info(Movie)').fetchall())
+    if columns['runtime'] != 'integer':
+        Rows = []
+        for m in c.execute('SELECT * FROM Movie').fetchall():
+            Rows.append(m[:4] + (parse_runtime(m[4]),) + m[5:7] + tuple(parse_rating(value) for value in m[7:10]))
+        c.execute(MOVIE_TABLE_SQL.replace('"Movie"', '"Movie_upgrade"'))
+        c.executemany('INSERT INTO Movie_upgrade VALUES (?,?,?,?,?,?,?,?,?,?)', Rows)
+        c.execute('DROP TABLE Movie')
+        c.execute('ALTER TABLE Movie_upgrade RENAME TO Movie')
+        # the earlier version read ratings by position, so every movie is extracted again from its OMDB record
+        c.execute('''DELETE FROM SourceHash WHERE source LIKE 'omdb:%' ''')
+    ## the earlier version kept the hash of the OMDB record of every title; it is now kept per title and year
+    c.execute('''DELETE FROM SourceHash WHERE source LIKE 'omdb:%' AND source NOT LIKE '%|%' ''')
+
+def get_source_hashes(c, Sources):
+    ''' Reads the stored content hashes of some sources.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of Movies.sqlite
+    Sources: list
+        the sources (e.g. ['omdb:Captain Marvel|2019', 'box office:june'])
+
+    Returns
+    -------
+    dict
+        the hash of every source that has one
+    '''
+    Hashes = {}
+    for Batch in batched(Sources, 500):
+        Hashes.update(c.execute('SELECT source, hash FROM SourceHash WHERE source IN (' + ','.join('?' * len(Batch)) + ')', Batch).fetchall())
+    return Hashes
+
+def iter_box_office_rows(c, batch_size=BATCH_SIZE):
+    ''' Reads the (id, year, time interval, movie name, movie id) of every row of BoxOffice in the order
+    of the ids, batch_size rows per query, so the table is never read into memory at once and
+    other statements of the cursor's connection can run between two batches.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of Movies.sqlite
+    batch_size: int
+        the number of rows per query
+
+    Returns
+    -------
+    generator
+        (id, year, time interval, movie name, movie id) tuples
+    '''
+    last_id = 0
+    while True:
+        Batch = c.connection.execute('SELECT id, MovieYear, TimeInterval, MovieName, MovieId FROM BoxOffice WHERE id > ? ORDER BY id LIMIT ?', (last_id, batch_size)).fetchall()
+        if len(Batch) == 0:
+            return
+        last_id = Batch[-1][0]
+        for m in Batch:
+            yield m
+
+def iter_changed_pages(c):
+    ''' Yields the Box Office Mojo pages whose content hash differs from the hash the tables were built from.
+    A page the website answered 304 Not Modified for keeps its hash, so it is neither read nor parsed again.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of Movies.sqlite
+
+    Returns
+    -------
+    generator
+        ((time interval, source, hash), html) tuples (e.g. (('june', 'box office:june', '9f86d0...'), '<html>...'))
+    '''
+    for TimeInterval, meta, response in iter_box_office_entries():
+        source = BOX_OFFICE_NAMESPACE + ':' + TimeInterval
+        ## the hash saved with the page spares reading and decompressing a page that did not change
+        source_hash = meta.get('hash')
+        if source_hash is None:
+            response = response or read_box_office_page(TimeInterval)
+            source_hash = get_source_hash(response)
+        if get_source_hashes(c, [source]).get(source) != source_hash:
+            yield (TimeInterval, source, source_hash), response or read_box_office_page(TimeInterval)
+
+def is_plausible_page(Rows, existing_count):
+    ''' Checks whether the rows parsed from a changed page can replace the rows stored for its time interval.
+    A page without rows, or with far fewer rows than are stored (see MIN_PAGE_ROWS_RATIO), is an error page
+    or a page cut short, not the years of the time interval.
+
+    Parameters
+    ----------
+    Rows: list
+        the rows parsed from the page
+    existing_count: int
+        the number of rows of BoxOffice for the time interval of the page
+
+    Returns
+    -------
+    bool
+        True if the rows of the page may be written and the years missing from it deleted
+    '''
+    return len(Rows) > 0 and len(Rows) >= existing_count * MIN_PAGE_ROWS_RATIO
+
+@timed('sync database')
+def sync_database(batch_size=BATCH_SIZE, workers=None, new_filename=None):
+    ''' Brings the tables up to date without rebuilding them. The content hash of every
+    Box Office Mojo page and OMDB record is compared with the hash the table was built from;
+    only the rows of a changed page are upserted (matched by time interval and year) and only
+    the movies of new rows or of a changed OMDB record are rewritten. A changed page that has no rows,
+    or far fewer than are stored for its time interval, is skipped and its stored rows are kept.
+    Starting from an empty database, this builds the tables with the same ids as a full build.
+    The work streams: one page at a time is parsed and written, then the box office rows are read
+    back batch_size at a time, their titles are looked up on OMDB together (the next batch is fetched
+    while one is written) and their movies are written with one executemany per batch, so memory
+    does not grow with the number of pages. With several workers the changed pages are parsed in
+    a pool of processes and written in their order.
+
+    Parameters
+    ----------
+    batch_size: int
+        the number of box office rows handled together in the OMDB step
+    workers: int
+        the number of processes parsing pages, by default PARSE_WORKERS
+    new_filename: string
+        a new file to build the tables in from scratch instead of DB_FILENAME (see build_database).
+        Nothing reads it until it is complete, so it is written without a journal or syncs,
+        one transaction per table, and the indexes are created after the rows are loaded
+
+    Returns
+    -------
+    dict
+        the number of changed pages, written box office rows and written movie rows
+        (e.g. {'pages': 1, 'box office rows': 44, 'movie rows': 2})
+    '''
+    if workers is None:
+        workers = PARSE_WORKERS
+    bulk_load = new_filename is not None
+    conn = sqlite3.connect(new_filename or DB_FILENAME)
+    c = conn.cursor()
+    if bulk_load:
+        c.execute('PRAGMA journal_mode=OFF')
+        c.execute('PRAGMA synchronous=OFF')
+        c.execute('PRAGMA cache_size=-65536')
+        c.execute('PRAGMA temp_store=MEMORY')
+    derived_tables_missing = not movie_db.derived_tables_exist(c)
+    upgrade_tables(c, indexes=not bulk_load)
+    Counts = {'pages': 0, 'box office rows': 0, 'movie rows': 0}
+
+    from box_office_parser import parse_pages
+    for (TimeInterval, source, source_hash), Rows in parse_pages(iter_changed_pages(c), workers):
+        Existing = {}
+        for m in c.execute('SELECT MovieYear, id, MovieName FROM BoxOffice WHERE TimeInterval = ?', (TimeInterval,)).fetchall():
+            Existing[m[0]] = m[1:]
+        if not is_plausible_page(Rows, len(Existing)):
+            ## its hash is not saved, so the next sync reads the page again
+            print("Keeping the " + str(len(Existing)) + " rows of " + TimeInterval + ": its page has " + str(len(Rows)) + " rows")
+            instrumentation.count('pages rejected')
+            continue
+        Counts['pages'] += 1
+        Rows = [normalize_box_office_row(row) for row in Rows]
+        Updates = []
+        Inserts = []
+        for row in Rows:
+            year = row[0]
+            values = row[1:]
+            if year in Existing:
+                box_office_id, movie_name = Existing.pop(year)
+                Updates.append(values + (box_office_id,))
+                if movie_name != values[0]:
+                    ## a row whose film changed loses its movie, so the OMDB step below links it again
+                    c.execute('UPDATE BoxOffice SET MovieId = NULL WHERE id = ?', (box_office_id,))
+            else:
+                Inserts.append((year, TimeInterval) + values)
+        c.executemany('UPDATE BoxOffice SET MovieName = ?, Gross = ?, Release = ?, CumulativeGross = ?, AverageGross = ? WHERE id = ?', Updates)
+        c.executemany('INSERT INTO BoxOffice (MovieYear, TimeInterval, MovieName, Gross, Release, CumulativeGross, AverageGross) VALUES (?,?,?,?,?,?,?)', Inserts)
+        ## the years that are no longer on the page
+        c.executemany('DELETE FROM BoxOffice WHERE id = ?', [(m[0],) for m in Existing.values()])
+        c.execute('INSERT OR REPLACE INTO SourceHash VALUES (?,?)', (source, source_hash))
+        Counts['box office rows'] += len(Rows)
+    if bulk_load:
+        conn.commit()
+
+    Checked = set()
+    ChangedFilms = set()
+    Written = {}
+    for Batch, Responses in iter_omdb_batches(iter_box_office_rows(c, batch_size), batch_size):
+        NewFilms = [film for film in Responses if film not in Checked]
+        Hashes = get_source_hashes(c, [OMDB_NAMESPACE + ':' + get_film_key(*film) for film in NewFilms])
+        SourceHashes = []
+        for film in NewFilms:
+            Checked.add(film)
+            source = OMDB_NAMESPACE + ':' + get_film_key(*film)
+            source_hash = get_source_hash(Responses[film])
+            if Hashes.get(source) != source_hash:
+                ChangedFilms.add(film)
+                SourceHashes.append((source, source_hash))
+        c.executemany('INSERT OR REPLACE INTO SourceHash VALUES (?,?)', SourceHashes)
+
+        NewMovies = {}
+        Links = []
+        for m in Batch:
+            if (m[3], m[1]) in ChangedFilms or m[4] is None:
+                information = get_movie_information(m[3], m[1], Responses[(m[3], m[1])])
+                if information[0] not in Written:
+                    NewMovies[information[0]] = information
+                Links.append((information[0], m[0]))
+        c.executemany('''INSERT INTO Movie (MovieKey, title, ReleaseDate, runtime, genre, director, Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating)
+            VALUES (?,?,?,?,?,?,?,?,?) ON CONFLICT(MovieKey) DO UPDATE SET title = excluded.title, ReleaseDate = excluded.ReleaseDate,
+            runtime = excluded.runtime, genre = excluded.genre, director = excluded.director, Internet_Movie_rating = excluded.Internet_Movie_rating,
+            Rotten_Tomatoes_rating = excluded.Rotten_Tomatoes_rating, Metacritic_rating = excluded.Metacritic_rating''', list(NewMovies.values()))
+        Keys = list(NewMovies)
+        Written.update(c.execute('SELECT MovieKey, id FROM Movie WHERE MovieKey IN (' + ','.join('?' * len(Keys)) + ')', Keys).fetchall())
+        c.executemany('UPDATE BoxOffice SET MovieId = ? WHERE id = ?', [(Written[key], box_office_id) for key, box_office_id in Links])
+    Counts['movie rows'] = len(Written)
+    instrumentation.count('rows written: BoxOffice', Counts['box office rows'])
+    instrumentation.count('rows written: Movie', Counts['movie rows'])
+    # films no box office row refers to any more
+    c.execute('DELETE FROM Movie WHERE id NOT IN (SELECT MovieId FROM BoxOffice WHERE MovieId IS NOT NULL)')
+    if bulk_load:
+        conn.commit()
+        movie_db.create_indexes(c)
+    if conn.total_changes > 0 or derived_tables_missing:
+        with instrumentation.span('refresh derived tables'):
+            movie_db.refresh_derived_tables(c)
+        movie_db.bump_database_version(c)
+    conn.commit()
+    conn.close()
+    return Counts
+
+@timed('build database')
+def build_database(batch_size=BATCH_SIZE, workers=None):
+    ''' Builds the tables again from scratch without touching Movies.sqlite while they are built.
+    The tables are built in a new file next to it (see sync_database), which then replaces
+    Movies.sqlite in one step, so a running website keeps answering from the old tables and
+    moves to the new ones on its next query, never seeing missing tables or half of the rows.
+    The version of the new database is higher than the old one, so rendered pages and datasets
+    of the old data are dropped.
 
     Parameters
     ----------
-    AllBoxOffice: list
-        a list contains all movies of the highest box office in differnt time intervals (quarters/ months)
+    batch_size: int
+        the number of box office rows handled together in the OMDB step
+    workers: int
+        the number of processes parsing pages, by default PARSE_WORKERS
 
     Returns
     -------
-    list
-        a list of tuples that represent movies' detailed information obtained from the OMDB website.
-        The tuple includes a movie's id, movie title, exact release date, runtime, genre, director,
-        rating values from three websites(IMDB, Rotten Tomatoes, Metacritic) 
-    '''
-    base_url = 'http://www.omdbapi.com/'
-    AllDetailedInformation = []
-    for m in AllBoxOffice:
-        params = { "apikey": api_key,'t':m[3]}
-        CACHE_DICT = open_cache()
-        if m[3] in CACHE_DICT.keys():
-            print("Using Cache")
-            response = CACHE_DICT[m[3]]
-        else:
-            print("Fetching")
-            CACHE_DICT[m[3]] = requests.get(base_url, params=params, auth=oauth).json()
-            response = CACHE_DICT[m[3]]
-            save_cache(CACHE_DICT)
-        try:
-            title = response['Title']
-        except:
-            title = None
-        try:
-            release_date = response['Released']
-        except:
-            release_date = None
-        try:
-            runtime = response['Runtime']
-        except:
-            runtime = None
-        try:
-            genre = response['Genre']
-        except:
-            genre = None
-        try:
-            director = response['Director']
-        except:
-            director = None
-        try:
-            Internet_Movie_rating = response['Ratings'][0]['Value']
-        except:
-            Internet_Movie_rating = None
-        try:
-            Rotten_Tomatoes_rating = response['Ratings'][1]['Value']
-        except:
-            Rotten_Tomatoes_rating = None
-        try:
-            Metacritic_rating = response['Ratings'][2]['Value']
-        except:
-            Metacritic_rating = None
-
-        single_tuple = m[0],title, release_date, runtime, genre, director, Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
-        AllDetailedInformation.append(single_tuple)
-    return AllDetailedInformation
+    dict
+        the number of parsed pages, written box office rows and written movie rows
+        (e.g. {'pages': 16, 'box office rows': 768, 'movie rows': 574})
+    '''
+    new_filename = DB_FILENAME + '.build'
+    if os.path.exists(new_filename):
+        ## left by a build that stopped half way
+        os.remove(new_filename)
+    version = 0
+    if os.path.exists(DB_FILENAME):
+        conn = sqlite3.connect(DB_FILENAME)
+        version = conn.execute('PRAGMA user_version').fetchone()[0] + 1
+        conn.close()
+    Counts = sync_database(batch_size, workers, new_filename)
+    conn = sqlite3.connect(new_filename)
+    version = max(version, conn.execute('PRAGMA user_version').fetchone()[0])
+    conn.execute('PRAGMA user_version = ' + str(version))
+    ## a rollback journal, so no -wal or -shm file is shared with the old database (see movie_db.replace_database)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+    movie_db.replace_database(new_filename, DB_FILENAME)
+    return Counts
+
+def get_dataset():
+    ''' Returns the in-memory dataset of the database (see movie_dataset.py), loading it when the database changed.
 
-def create_box_office_table(AllBoxOffice):
-    ''' Constructs and executes SQL query to create a new table called BoxOffice showing 
-    all movies of the highest box office in different quarters/ months of the last fifty years in the US
-    
     Parameters
     ----------
-    AllBoxOffice: list
-        a list of tuples containing movies of the highest box office in differet quarters/ months of the last fifty years in US
-    
+    None
+
     Returns
     -------
-    None
+    MovieDataset
+        the dataset, or None when USE_DATASET is off or numpy is not installed
     '''
-    conn = sqlite3.connect("Movies.sqlite")
-    c = conn.cursor()
-    # Drop table if exists
-    c.execute('''DROP TABLE IF EXISTS "BoxOffice"''')
-    # Create table
-    c.execute('''CREATE TABLE IF NOT EXISTS "BoxOffice"(
-        id integer PRIMARY KEY AUTOINCREMENT UNIQUE,
-        MovieYear integer NOT NULL, 
-        TimeInterval text NOT NULL, 
-        MovieName text NOT NULL, 
-        Gross real NOT NULL, 
-        Release real NOT NULL, 
-        CumulativeGross real NOT NULL, 
-        AverageGross real NOT NULL)''')
-    # Insert several rows of data
-    c.executemany('INSERT INTO BoxOffice VALUES (?,?,?,?,?,?,?,?)', AllBoxOffice)
-    conn.commit() # Save (commit) the changes
-    # Be sure any changes have been committed or they will be lost.
-    conn.close()
+    if not USE_DATASET:
+        return None
+    import movie_dataset
+    if not movie_dataset.is_available():
+        return None
+    return movie_dataset.get_dataset(DB_FILENAME)
+
+def get_interval_index():
+    ''' Returns the in-memory index of the champions and movie details (see interval_index.py), loading it when the database changed.
 
-def create_detailed_information_table(AllDetailedInformation):
-    ''' Constructs and executes SQL query to create a new table called MovieDetailedInformaiton containing
-    the detailed information of movies obtained from the OMDB website
-    
     Parameters
     ----------
-    AllDetailedInformaiton: list
-        a list of tuples comtaining movies and their detailed informaiton obtained from the OMDB website
-    
+    None
+
     Returns
     -------
-    None
+    IntervalIndex
+        the index, or None when USE_INDEX is off
     '''
-    conn = sqlite3.connect("Movies.sqlite")
-    c = conn.cursor()
-    # Drop table if exists
-    c.execute('''DROP TABLE IF EXISTS "MovieDetailedInformation"''')
-    # Create table
-    c.execute('''CREATE TABLE IF NOT EXISTS "MovieDetailedInformation"(
-        id integer PRIMARY KEY AUTOINCREMENT UNIQUE,
-        title text, 
-        ReleaseDate text, 
-        runtime real, 
-        genre text,
-        director text, 
-        Internet_Movie_rating real, 
-        Rotten_Tomatoes_rating real, 
-        Metacritic_rating real )''')
-    # Insert several rows of data
-    c.executemany('INSERT INTO MovieDetailedInformation VALUES (?,?,?,?,?,?,?,?,?)', AllDetailedInformation)
-    conn.commit() # Save (commit) the changes
-    # Be sure any changes have been committed or they will be lost.
-    conn.close()
+    if not USE_INDEX:
+        return None
+    return interval_index.get_index(DB_FILENAME)
 
+@timed('query time interval')
 def movie_box_office_search_time_interval(SearchTimeInterval):
     '''Constructs and executes SQL query to create movie instances that represent movies of the highest box office in one time interval selected by users.
 
@@ -365,15 +1406,44 @@ def movie_box_office_search_time_interval(SearchTimeInterval):
         a list of movie instances
     '''
     Movie_Instance_List = []
-    connection = sqlite3.connect("Movies.sqlite")
-    cursor = connection.cursor()
-    query =  "SELECT MovieYear, TimeInterval, MovieName, Gross, id FROM BoxOffice WHERE TimeInterval = " + SearchTimeInterval + " ORDER BY MovieYear DESC"
-    result = cursor.execute(query).fetchall()
+    index = get_interval_index()
+    if index is not None:
+        result = index.search_time_interval(SearchTimeInterval)
+    else:
+        result = movie_db.search_time_interval(SearchTimeInterval, DB_FILENAME)
     for m in result:
         Movie_Instance_List.append(Movie(m[0],m[1],m[2],m[3],m[4]))
-    connection.close()
     return Movie_Instance_List
 
+@timed('query champions page')
+def movie_box_office_champions(SearchTimeInterval, sort_by='year', first_year=None, last_year=None, page=1, page_size=PAGE_SIZE):
+    '''Reads one page of the box office champions of a time interval from the in-memory index,
+    sorted by year or gross (latest or highest first) and limited to some years.
+
+    Parameters
+    ----------
+    SearchTimeInterval: string
+            a string indicating a time interval (e.g. first quarter, january)
+    sort_by: string
+            'year' or 'gross'
+    first_year: int
+            the first year of the champions, or None
+    last_year: int
+            the last year of the champions, or None
+    page: int
+            the number of the page, from 1
+    page_size: int
+            the number of champions of a page
+
+    Returns
+    -------
+    tuple
+        (list of the movie instances of the page, the number of champions of all pages)
+    '''
+    Rows, total = interval_index.get_index(DB_FILENAME).get_champions(SearchTimeInterval, sort_by, True, first_year, last_year, page, page_size)
+    return [Movie(m[0],m[1],m[2],m[3],m[4]) for m in Rows], total
+
+@timed('query movie detail')
 def movie_detailed_search(movie_id):
     '''Constructs and executes SQL query to retrieve one movie's detailed information in a tuple format based on movie id.
     
@@ -387,35 +1457,112 @@ def movie_detailed_search(movie_id):
     list
         a list of tuples that represent the query result
     '''
-    connection = sqlite3.connect("Movies.sqlite")
-    cursor = connection.cursor()
-    query = '''SELECT MovieDetailedInformation.id, MovieName, ReleaseDate, runtime, genre, director, Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating FROM MovieDetailedInformation JOIN BoxOffice ON MovieDetailedInformation.id = BoxOffice.id WHERE MovieDetailedInformation.id = ''' + movie_id
-    result = cursor.execute(query).fetchall()
-    connection.close()
-    return result
-
-## the website in the recommendation part showing the detailed information of a movie
-@app.route('/')
-def recommend():
-    if result_movie[0][2] == None:
-        results = [('Sorry, not found',result_movie[0][1],'Sorry, not found','Sorry, not found','Sorry, not found','Sorry, not found','Sorry, not found','Sorry, not found','Sorry, not found')]
-        first_rating = 0
-        second_rating = 0
-        third_rating = 0
-    else:
-        results = result_movie
-        first_rating = float(str(result_movie[0][6]).split('/')[0])*10
-        second_rating = float(str(result_movie[0][7]).split('%')[0])
-        third_rating = float(str(result_movie[0][8]).split('/')[0])
-    x_vals = ['IMDB','Rotten Tomatoes','Metacritic']
-    y_vals = [first_rating, second_rating, third_rating]
-    bars_data = go.Bar(x=x_vals, y=y_vals)
-    basic_layout = go.Layout(height=600, width=500)
-    fig = go.Figure(data=bars_data)
-    div = fig.to_html(full_html=False)
-    return render_template('recommendation.html', results = results, plot_div = div)
+    index = get_interval_index()
+    if index is not None:
+        return index.search_movie_detail(movie_id)
+    return movie_db.search_movie_detail(movie_id, DB_FILENAME)
+
+@timed('query search')
+def movie_search(text, limit=10):
+    '''Searches the movies by title, director or genre, allowing misspellings.
+
+    Parameters
+    ----------
+    text: string
+            the search (e.g. 'lion king', 'spielberg')
+    limit: int
+            the maximum number of movies
+
+    Returns
+    -------
+    list
+        a list of (id, title, year, director, genre) tuples, best match first,
+        where id is the id used by movie_detailed_search and the /movie/<id> page
+    '''
+    return movie_db.search_movies(text, limit, DB_FILENAME)
+
+def get_api_url(path, **params):
+    ''' Makes the address of a path of the json API (see api_server.py) for the pages to fetch their data from.
+
+    Parameters
+    ----------
+    path: string
+        the path in the API (e.g. '/api/comparison')
+    params: dict
+        the query string (e.g. interval='june')
+
+    Returns
+    -------
+    string
+        the address, relative to the website unless API_BASE_URL is set (e.g. '/api/comparison?interval=june&variable=gross')
+    '''
+    url = API_BASE_URL.rstrip('/') + path
+    if len(params) > 0:
+        url = url + '?' + urlencode(params)
+    return url
+
+def get_plotly_js():
+    ''' Reads the plotly.js bundle shipped with the plotly package, once. The pages load it from
+    a url containing its hash, so browsers can cache it for good and fetch it again only when it changes.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    tuple
+        the url path of the bundle (e.g. '/assets/plotly-0123456789abcdef.min.js'), its ETag and its content
+    '''
+    global PLOTLY_JS
+    if PLOTLY_JS is None:
+        plotly_dir = importlib.util.find_spec('plotly').submodule_search_locations[0]
+        with open(os.path.join(plotly_dir, 'package_data', 'plotly.min.js'), 'rb') as js_file:
+            body = js_file.read()
+        etag = hashlib.sha1(body).hexdigest()[:16]
+        PLOTLY_JS = ('/assets/plotly-' + etag + '.min.js', etag, body)
+    return PLOTLY_JS
 
+def plotly_js(etag):
+    ''' Serves the plotly.js bundle as an immutable static file, answering 304 to a matching If-None-Match.
+    '''
+    from flask import Response, abort, request
+    path, current_etag, body = get_plotly_js()
+    if etag != current_etag:
+        abort(404)
+    response = Response(body, mimetype='application/javascript')
+    response.set_etag(current_etag)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response.make_conditional(request)
+
+@timed('render movie page')
+def render_movie_page(movie_id):
+    ''' Renders the page of the detailed information and the ratings chart of a movie. The page only
+    holds the address of the movie in the API, and the browser fetches the information from it.
+
+    Parameters
+    ----------
+    movie_id: int
+        the id of the movie (e.g. 1)
+
+    Returns
+    -------
+    string
+        the html of the page
+    '''
+    from flask import render_template
+    return render_template('recommendation.html', data_url = get_api_url('/api/movie/' + str(movie_id)), plotly_src = get_plotly_js()[0])
+
+## the page in the recommendation part showing the detailed information of a movie
+def recommend(movie_id):
+    from flask import abort
+    result_movie = movie_detailed_search(str(movie_id))
+    if len(result_movie) == 0:
+        abort(404)
+    return RENDER_CACHE.get(('movie', movie_id), lambda: render_movie_page(movie_id))
 
+
+@timed('query comparison')
 def get_results(select_movies, compare_variable, select_time_interval):
     '''Constructs and executes SQL query to retrieve the information of movies based on the response of a survey.
     
@@ -424,7 +1571,8 @@ def get_results(select_movies, compare_variable, select_time_interval):
     select_movies: string
             a string indicating whether users choose to compare among all movies or movies of the highest box office (box office champions). (e.g. AllMovives/ Champions)
     compare_variable: string
-            a string indicating the variable a user want to compare (e.g. gross, cumulative gross, IMDB rating)
+            a string indicating the variable a user want to compare (e.g. gross, cumulative gross, IMDB rating),
+            one of the keys of movie_db.COMPARE_COLUMNS
     select_time_interval: string
             a string indicating a time interval when users want to compare (e.g. first quarter, january)
     
@@ -433,70 +1581,532 @@ def get_results(select_movies, compare_variable, select_time_interval):
     list
         a list of tuples that represent the query result
     '''
-    connection = sqlite3.connect("Movies.sqlite")
-    cursor = connection.cursor()
-
-    select_time_interval = '"' + select_time_interval + '"'
-    if compare_variable == 'cumulative gross':
-        select_column = 'CumulativeGross'
-    elif compare_variable == 'average gross':
-        select_column = 'AverageGross'
-    elif compare_variable == 'gross':
-        select_column = 'Gross'
-    elif compare_variable == 'IMDB rating':
-        select_column = 'Internet_Movie_Rating'
-    elif compare_variable == 'Rotten Tomatoes rating':
-        select_column = 'Rotten_Tomatoes_rating'
-    elif compare_variable == 'Metacritic rating':
-        select_column = 'Metacritic_rating'
-    
-    query = '''SELECT MovieYear, ''' + select_column + ''', MovieName FROM BoxOffice JOIN MovieDetailedInformation ON BoxOffice.id = MovieDetailedInformation.id WHERE TimeInterval = ''' + select_time_interval + ''' ORDER BY MovieYear DESC'''
-
-    result = cursor.execute(query).fetchall()
-    connection.close()
-    return result
+    dataset = get_dataset()
+    if dataset is not None:
+        return dataset.search_comparison(compare_variable, select_time_interval)
+    return movie_db.search_comparison(compare_variable, select_time_interval, DB_FILENAME)
 
 ## the website in the comparison part. Users can select the type of movies and variables (gross, rating) which they want to compare.
-@App.route('/')
 def index():
+    from flask import render_template
     return render_template('comparison_index.html')
 
 
-@App.route('/results', methods=['POST'])
 def results():
-    select_movies = request.form['movies']
-    select_time_interval = request.form['interval']
+    from flask import abort, request
+    select_movies = request.form.get('movies')
+    select_time_interval = request.form.get('interval')
+    ## only the choices of the form reach the render cache, which keeps a page per choice
+    if select_movies not in COMPARISON_FORM or select_time_interval not in TIME_INTERVALS:
+        abort(400)
+    compare_variable = request.form.get(select_movies.lower())
+    if compare_variable not in COMPARISON_FORM[select_movies]:
+        abort(400)
+    return RENDER_CACHE.get((select_movies, compare_variable, select_time_interval),
+                            lambda: render_results_page(select_movies, compare_variable, select_time_interval))
+
+@timed('render results page')
+def render_results_page(select_movies, compare_variable, select_time_interval):
+    ''' Renders the page comparing one variable of movies in one time interval across the years.
+    The browser fetches the values from the API and draws the chart and the table.
+
+    Parameters
+    ----------
+    select_movies: string
+        the kind of movies (AllMovies/ Champions)
+    compare_variable: string
+        the variable to compare (e.g. gross, IMDB rating)
+    select_time_interval: string
+        the time interval (e.g. first quarter, january)
+
+    Returns
+    -------
+    string
+        the html of the page
+    '''
     if select_movies == 'AllMovies':
-        compare_variable = request.form['allmovies']
         MovieKind = 'all movies'
     else:
-        compare_variable = request.form['champions']
         MovieKind = 'box office champions'
     if 'quarter' in select_time_interval:
         time = 'the ' + select_time_interval
     else:
         time = select_time_interval 
-    results = get_results(select_movies, compare_variable, select_time_interval)
-    x_vals = []
-    y_vals = []
-    for e in results:
-        y_vals.append(e[1])
-        x_vals.append(e[0])
-    bars_data = go.Bar(x=x_vals, y=y_vals)
-    fig = go.Figure(data=bars_data)
-    div = fig.to_html(full_html=False)
-    return render_template('comparison_results.html', plot_div = div , results = results, variable = compare_variable, movie_kind = MovieKind, Time = time)
+    data_url = get_api_url('/api/comparison', interval = select_time_interval, variable = compare_variable)
+    from flask import render_template
+    return render_template('comparison_results.html', data_url = data_url, plotly_src = get_plotly_js()[0], variable = compare_variable, movie_kind = MovieKind, Time = time)
+
+## the summaries of the comparison website and their titles
+ANALYSES = {'decades': 'Box office champions by decade',
+            'rolling': 'Gross of the box office champions and its rolling average',
+            'genres': 'Total gross of the box office champions by genre',
+            'directors': 'Total gross of the box office champions by director',
+            'correlation': 'Correlation between the ratings and the gross of the box office champions'}
+
+@timed('query analytics')
+def get_analytics(analysis, select_time_interval, window=5, limit=20):
+    '''Retrieves one summary of the box office champions of a time interval from the summary tables.
+
+    Parameters
+    ----------
+    analysis: string
+            one of the keys of ANALYSES (e.g. decades, rolling, genres)
+    select_time_interval: string
+            a string indicating a time interval (e.g. first quarter, january)
+    window: int
+            the number of years of the rolling average
+    limit: int
+            the maximum number of genres or directors
+
+    Returns
+    -------
+    dict
+        the analysis, the time interval, the names of the columns and the rows of the summary
+    '''
+    if analysis == 'decades':
+        columns = ['decade', 'champions', 'total gross', 'average gross', 'average cumulative gross',
+                   'IMDB rating', 'Rotten Tomatoes rating', 'Metacritic rating']
+        rows = movie_db.search_decades(select_time_interval, DB_FILENAME)
+    elif analysis == 'rolling':
+        columns = ['year', 'gross', 'rolling average gross']
+        rows = movie_db.search_rolling_gross(select_time_interval, window, DB_FILENAME)
+    elif analysis == 'genres':
+        columns = ['genre', 'champions', 'total gross', 'IMDB rating']
+        rows = movie_db.search_genres(select_time_interval, limit, DB_FILENAME)
+    elif analysis == 'directors':
+        columns = ['director', 'champions', 'total gross', 'IMDB rating']
+        rows = movie_db.search_directors(select_time_interval, limit, DB_FILENAME)
+    elif analysis == 'correlation':
+        columns = ['rating', 'movies', 'correlation with gross']
+        rows = movie_db.search_rating_correlation(select_time_interval, DB_FILENAME)
+    else:
+        raise ValueError('Unknown analysis: ' + str(analysis))
+    return {'analysis': analysis, 'interval': select_time_interval, 'columns': columns, 'rows': [list(row) for row in rows]}
+
+def get_analytics_arguments():
+    ''' Reads and checks the analysis, time interval, window and limit of an analytics request, answering 400 if one is invalid.
+    The window and the limit are capped at ANALYTICS_MAX_WINDOW and ANALYTICS_MAX_LIMIT.
+    '''
+    from flask import abort, request
+    analysis = request.args.get('analysis', 'decades')
+    select_time_interval = request.args.get('interval', 'first quarter')
+    if analysis not in ANALYSES or select_time_interval not in TIME_INTERVALS:
+        abort(400)
+    try:
+        window = int(request.args.get('window', 5))
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        abort(400)
+    if window < 1 or limit < 1:
+        abort(400)
+    ## capped before they reach SQLite (a huge window overflows its integers) and the render cache keys
+    return analysis, select_time_interval, min(window, ANALYTICS_MAX_WINDOW), min(limit, ANALYTICS_MAX_LIMIT)
+
+## the summaries as json (e.g. /api/analytics?analysis=genres&interval=june&limit=10)
+def analytics_api():
+    return get_analytics(*get_analytics_arguments())
+
+## the movies matching what is typed in the search box (e.g. /api/search?q=lion%20ki), at most SEARCH_MAX_LIMIT of them
+def search_api():
+    from flask import abort, request
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        abort(400)
+    ## SQLite reads a negative LIMIT as no limit at all
+    limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
+    Hits = []
+    for movie_id, title, year, director, genre in movie_search(request.args.get('q', ''), limit):
+        Hits.append({'id': movie_id, 'title': title, 'year': year, 'director': director, 'genre': genre, 'url': '/movie/' + str(movie_id)})
+    return {'hits': Hits}
+
+## the page of the comparison website drawing one summary
+def analytics():
+    arguments = get_analytics_arguments()
+    return RENDER_CACHE.get(('analytics',) + arguments, lambda: render_analytics_page(*arguments))
+
+@timed('render analytics page')
+def render_analytics_page(analysis, select_time_interval, window, limit):
+    ''' Renders the page drawing one summary of the box office champions of a time interval.
+
+    Parameters
+    ----------
+    analysis: string
+        one of the keys of ANALYSES
+    select_time_interval: string
+        the time interval (e.g. first quarter, january)
+    window: int
+        the number of years of the rolling average
+    limit: int
+        the maximum number of genres or directors
+
+    Returns
+    -------
+    string
+        the html of the page
+    '''
+    summary = get_analytics(analysis, select_time_interval, window, limit)
+    x_vals = [row[0] for row in summary['rows']]
+    if analysis == 'decades':
+        traces = [{'type': 'bar', 'name': 'average gross', 'x': x_vals, 'y': [row[3] for row in summary['rows']]}]
+    elif analysis == 'rolling':
+        traces = [{'type': 'bar', 'name': 'gross', 'x': x_vals, 'y': [row[1] for row in summary['rows']]},
+                  {'type': 'scatter', 'mode': 'lines', 'name': str(window) + ' year average', 'x': x_vals, 'y': [row[2] for row in summary['rows']]}]
+    elif analysis == 'correlation':
+        traces = [{'type': 'bar', 'name': 'correlation', 'x': x_vals, 'y': [row[2] for row in summary['rows']]}]
+    else:
+        traces = [{'type': 'bar', 'name': 'total gross', 'x': x_vals, 'y': [row[2] for row in summary['rows']]}]
+    if 'quarter' in select_time_interval:
+        time = 'the ' + select_time_interval
+    else:
+        time = select_time_interval
+    from flask import render_template
+    return render_template('analytics.html', title = ANALYSES[analysis] + ' in ' + time, traces = traces,
+                           plotly_src = get_plotly_js()[0], columns = summary['columns'], rows = summary['rows'])
+
+def get_api():
+    ''' Returns the json API of the database (see api_server.py), created again when DB_FILENAME changes.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    api_server.Api
+        the API of DB_FILENAME
+    '''
+    global API
+    if API is None or API.db_filename != DB_FILENAME:
+        import api_server
+        API = api_server.Api(DB_FILENAME)
+    return API
+
+## the json API of the pages, answered by the website itself (e.g. /api/comparison?interval=june&variable=gross,
+## /api/intervals/june, /api/movie/1), with the same ETag and Last-Modified answers as api_server.py
+def data_api(path):
+    from flask import Response, request
+    headers = dict((name.lower(), value) for name, value in request.headers.items())
+    status, Headers, body = get_api().respond(request.method, request.full_path, headers)
+    return Response(body, status, Headers)
+
+## the counters and span timings of the instrumentation, served only when it is turned on with --metrics
+def metrics():
+    snapshot = instrumentation.METRICS.snapshot()
+    snapshot['render cache'] = {'hits': RENDER_CACHE.hits, 'misses': RENDER_CACHE.misses, 'pages': len(RENDER_CACHE.pages)}
+    return snapshot
+
+def get_app():
+    ''' Creates the website once and keeps it in APP. Flask is only imported here, the first time
+    a page is served or rendered, so the command line queries start without it. /metrics exists
+    only when the instrumentation is turned on (--metrics), since it shows how the site is used.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    Flask
+        the website
+    '''
+    global APP
+    if APP is None:
+        from flask import Flask
+        APP = Flask(__name__)
+        instrumentation.instrument_app(APP)
+        APP.add_url_rule('/assets/plotly-<etag>.min.js', 'plotly_js', plotly_js)
+        APP.add_url_rule('/movie/<int:movie_id>', 'recommend', recommend)
+        APP.add_url_rule('/', 'index', index)
+        APP.add_url_rule('/results', 'results', results, methods=['POST'])
+        APP.add_url_rule('/api/analytics', 'analytics_api', analytics_api)
+        APP.add_url_rule('/api/search', 'search_api', search_api)
+        APP.add_url_rule('/api/<path:path>', 'data_api', data_api)
+        APP.add_url_rule('/analytics', 'analytics', analytics)
+        if instrumentation.ENABLED:
+            APP.add_url_rule('/metrics', 'metrics', metrics)
+    return APP
+
+def get_command():
+    ''' Reads the subcommand of the command line (e.g. 'query' for python Final_Project_Code_zhuxiaoy.py query june).
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    string
+        the subcommand, 'serve' for the older --serve option, or 'browse' if none is given
+    '''
+    if len(sys.argv) > 1 and not sys.argv[1].startswith('--'):
+        return sys.argv[1]
+    if '--serve' in sys.argv:
+        return 'serve'
+    return 'browse'
+
+def run_query(Arguments, as_json=False):
+    ''' Prints the answer of one lookup, for scripts and cron jobs. Only SQLite is read: no OMDB key,
+    no website and no numpy are needed.
+
+    Parameters
+    ----------
+    Arguments: list
+        the lookup and its values, one of
+        ['interval', time interval] the box office champions of a time interval (e.g. ['interval', 'first quarter']),
+        ['movie', id] the detailed information of a movie (e.g. ['movie', '1']),
+        ['search', text] the movies matching a title, director or genre (e.g. ['search', 'lion', 'king']),
+        ['compare', variable, time interval] one variable of the champions of a time interval (e.g. ['compare', 'IMDB rating', 'june'])
+    as_json: bool
+        whether to print json instead of lines of text
+
+    Returns
+    -------
+    int
+        the exit status: 0, or 1 if the lookup is invalid or finds nothing
+    '''
+    global USE_DATASET, USE_INDEX
+    USE_DATASET = False
+    USE_INDEX = False
+    lookup = Arguments[0] if len(Arguments) > 0 else None
+    if lookup == 'interval' and ' '.join(Arguments[1:]).lower() in TIME_INTERVALS:
+        time_interval = ' '.join(Arguments[1:]).lower()
+        Movies = movie_box_office_search_time_interval(time_interval)
+        Result = [{'id': m.id, 'year': m.year, 'name': m.name, 'gross': m.gross} for m in Movies]
+        Lines = ['[' + str(m.id) + '] ' + m.info() for m in Movies]
+    elif lookup == 'movie' and len(Arguments) == 2 and Arguments[1].isnumeric():
+        Rows = movie_detailed_search(Arguments[1])
+        if len(Rows) == 0:
+            print('No movie ' + Arguments[1])
+            return 1
+        Names = ['id', 'name', 'release date', 'runtime', 'genre', 'director', 'IMDB rating', 'Rotten Tomatoes rating', 'Metacritic rating']
+        Result = dict(zip(Names, Rows[0]))
+        Lines = [name + ': ' + ('N/A' if value is None else str(value)) for name, value in Result.items()]
+    elif lookup == 'search' and len(Arguments) > 1:
+        Hits = movie_search(' '.join(Arguments[1:]))
+        Result = [{'id': movie_id, 'title': title, 'year': year, 'director': director, 'genre': genre}
+                  for movie_id, title, year, director, genre in Hits]
+        Lines = ['[' + str(hit['id']) + '] ' + str(hit['title']) + ' (' + str(hit['year']) + ')' for hit in Result]
+    elif lookup == 'compare' and len(Arguments) > 2 and Arguments[1] in movie_db.COMPARE_COLUMNS and ' '.join(Arguments[2:]).lower() in TIME_INTERVALS:
+        Rows = get_results('Champions', Arguments[1], ' '.join(Arguments[2:]).lower())
+        Result = [{'year': year, 'value': value, 'name': name} for year, value, name in Rows]
+        Lines = [str(year) + ' ' + ('N/A' if value is None else str(value)) + ' ' + name for year, value, name in Rows]
+    else:
+        print('Usage: query interval <time interval> | movie <id> | search <text> | compare <variable> <time interval> [--json]')
+        print('Time intervals: ' + ', '.join(TIME_INTERVALS))
+        print('Variables: ' + ', '.join(movie_db.COMPARE_COLUMNS))
+        return 1
+    if as_json:
+        print(json.dumps(Result))
+    else:
+        print('\n'.join(Lines))
+    return 0
 
+def get_option(name):
+    ''' Reads the value of a command line option given as name=value (e.g. --profile=run.prof).
+
+    Parameters
+    ----------
+    name: string
+        the name of the option (e.g. '--profile')
+
+    Returns
+    -------
+    string
+        the value of the option, '' if it is given without a value, or None if it is not given
+    '''
+    for argument in sys.argv[1:]:
+        if argument == name:
+            return ''
+        if argument.startswith(name + '='):
+            return argument[len(name) + 1:]
+    return None
+
+def warm_render_cache():
+    ''' Renders every page the comparison form can ask for, so the first visitors are served from the cache.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    int
+        the number of rendered pages
+    '''
+    count = 0
+    with get_app().app_context():
+        for select_movies, variables in COMPARISON_FORM.items():
+            for compare_variable in variables:
+                for select_time_interval in TIME_INTERVALS:
+                    RENDER_CACHE.get((select_movies, compare_variable, select_time_interval),
+                                     lambda: render_results_page(select_movies, compare_variable, select_time_interval))
+                    count = count + 1
+    return count
+
+
+def serve():
+    ''' Runs the website with the waitress WSGI server, which handles SERVER_THREADS requests at the same time.
+    Falls back to the threaded Flask development server if waitress is not installed.
+
+    Parameters
+    ----------
+    None
+
+    Returns
+    -------
+    None
+    '''
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        print('waitress is not installed, using the Flask development server')
+        get_app().run(host=HOST, port=PORT, threaded=True)
+        return
+    waitress_serve(get_app(), host=HOST, port=PORT, threads=SERVER_THREADS)
+
+def open_page(path):
+    ''' Opens a page of the website in the browser. The server is started once, in a background
+    thread, the first time a page is opened, and keeps running until the program exits.
+
+    Parameters
+    ----------
+    path: string
+        the path of the page (e.g. '/', '/movie/1')
+
+    Returns
+    -------
+    None
+    '''
+    import webbrowser
+    global SERVER_THREAD
+    if SERVER_THREAD is None:
+        SERVER_THREAD = threading.Thread(target=serve, daemon=True)
+        SERVER_THREAD.start()
+    url = 'http://' + HOST + ':' + str(PORT) + path
+    print('Opening ' + url)
+    webbrowser.open(url)
+
+def browse_champions(SearchTimeInterval):
+    ''' Lists the box office champions of a time interval PAGE_SIZE at a time and opens the page of
+    each movie the user chooses, until the user inputs back or exit. Besides the number of a movie,
+    the user can input next or previous to turn the page, sort gross or sort year to order the champions,
+    and years followed by two years (e.g. years 1990 1999) or years all to choose the years listed.
+
+    Parameters
+    ----------
+    SearchTimeInterval: string
+        a time interval (e.g. 'first quarter', 'january')
+
+    Returns
+    -------
+    string
+        'back' or 'exit'
+    '''
+    sort_by = 'year'
+    first_year = None
+    last_year = None
+    page = 1
+    show = True
+    while True:
+        if show:
+            Movies, total = movie_box_office_champions(SearchTimeInterval, sort_by, first_year, last_year, page)
+            first = (page - 1) * PAGE_SIZE + 1
+            for i in range(len(Movies)):
+                print("[" + str(first + i) + "] " + Movies[i].info())
+            print('Page ' + str(page) + ' of ' + str(max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)) + ', ' + str(total) + ' champions by ' + sort_by)
+            show = False
+        print()
+        print('-' * 60)
+        Words = input('''Choose the number for detail search or next/ previous/ sort gross/ sort year/ years 1990 1999/ years all/ back/ exit: ''').lower().split()
+        command = ' '.join(Words)
+        if command in ['back', 'exit']:
+            return command
+        elif command == 'next' and page * PAGE_SIZE < total:
+            page = page + 1
+            show = True
+        elif command == 'previous' and page > 1:
+            page = page - 1
+            show = True
+        elif len(Words) == 2 and Words[0] == 'sort' and Words[1] in interval_index.SORT_ORDERS:
+            sort_by = Words[1]
+            page = 1
+            show = True
+        elif command == 'years all':
+            first_year = None
+            last_year = None
+            page = 1
+            show = True
+        elif len(Words) == 3 and Words[0] == 'years' and Words[1].isnumeric() and Words[2].isnumeric():
+            first_year = min(int(Words[1]), int(Words[2]))
+            last_year = max(int(Words[1]), int(Words[2]))
+            page = 1
+            show = True
+        elif command.isnumeric() and first <= int(command) < first + len(Movies):
+            open_page('/movie/' + str(Movies[int(command) - first].id))
+        else:
+            print("[Error] Invalid input")
 
 if __name__ == "__main__":
 
+    ## python Final_Project_Code_zhuxiaoy.py [build | serve | browse | query ...] [options]
+    ##     build   build Movies.sqlite, or update the rows whose page or OMDB record changed, and exit (e.g. from cron)
+    ##     serve   only run the website (e.g. on a server), without the command line program (also --serve)
+    ##     browse  the command line program, setting up Movies.sqlite only when it has no tables (the default)
+    ##     query   print one lookup and exit, e.g. query interval june, query movie 1, query search lion king,
+    ##             query compare 'IMDB rating' june; add --json for json. It needs neither an OMDB key nor flask
+    command = get_command()
+    if command not in COMMANDS:
+        print('Usage: python Final_Project_Code_zhuxiaoy.py [' + ' | '.join(COMMANDS) + '] [options]')
+        sys.exit(1)
+    if command == 'query':
+        if not database_is_built():
+            print(DB_FILENAME + ' has no tables yet: run python Final_Project_Code_zhuxiaoy.py build first')
+            sys.exit(1)
+        sys.exit(run_query([argument for argument in sys.argv[2:] if argument != '--json'], '--json' in sys.argv))
+
     ########   SET UP    ########
-    AllBoxOffice = get_box_office_tuples()
-    # create the table of boxoffice
-    create_box_office_table(AllBoxOffice) 
-    # create the table of detailed informaiton from OMDB
-    AllDetailedInformation = get_detailed_information_tuples(AllBoxOffice)
-    create_detailed_information_table(AllDetailedInformation)
+    ## python Final_Project_Code_zhuxiaoy.py --metrics[=metrics.log]  time the stages and count cache hits, fetched bytes
+    ##     and written rows (shown at /metrics); with a file name every span is also written to it as a json line
+    ## python Final_Project_Code_zhuxiaoy.py --profile[=run.prof]  write a cProfile profile of this run (python -m pstats run.prof)
+    ## python Final_Project_Code_zhuxiaoy.py --sample-profile[=run.stacks]  write the stacks of a sampling profiler instead
+    metrics_log = get_option('--metrics')
+    if metrics_log is not None:
+        instrumentation.enable(metrics_log or None)
+    if get_option('--profile') is not None:
+        instrumentation.profile_run(get_option('--profile') or 'run.prof')
+    elif get_option('--sample-profile') is not None:
+        instrumentation.profile_run(get_option('--sample-profile') or 'run.stacks', sampling=True)
+    ## python Final_Project_Code_zhuxiaoy.py            start against the existing Movies.sqlite (set up only when it has no tables)
+    ## python Final_Project_Code_zhuxiaoy.py --sync     update only the rows whose page or OMDB record changed
+    ## python Final_Project_Code_zhuxiaoy.py --rebuild  build the tables again in a new file and swap it in (see build_database)
+    ## python Final_Project_Code_zhuxiaoy.py --parse-workers=4  parse the Box Office Mojo pages of a build or sync in 4 processes
+    if get_option('--parse-workers'):
+        PARSE_WORKERS = int(get_option('--parse-workers'))
+    ## python Final_Project_Code_zhuxiaoy.py --import[=Movies.npz]  build Movies.sqlite from a snapshot instead of the cache and OMDB
+    if get_option('--import') is not None:
+        import snapshot
+        print('Imported ' + str(snapshot.import_snapshot(get_option('--import') or snapshot.SNAPSHOT_FILENAME, DB_FILENAME)))
+    if '--rebuild' in sys.argv:
+        print(build_database())
+    elif '--sync' in sys.argv or not database_is_built() or (command == 'build' and get_option('--import') is None):
+        print(sync_database())
+    ## python Final_Project_Code_zhuxiaoy.py --export[=Movies.npz]  write a snapshot of the tables for other machines
+    if get_option('--export') is not None:
+        import snapshot
+        print('Exported ' + str(snapshot.export_snapshot(DB_FILENAME, get_option('--export') or snapshot.SNAPSHOT_FILENAME)))
+    if command == 'build':
+        sys.exit()
+    ## python Final_Project_Code_zhuxiaoy.py --api-url=https://api.example.com  have the pages read the json API
+    ##     served on its own (python api_server.py) instead of the website's /api/ (before --warm-cache, whose pages embed it)
+    if get_option('--api-url'):
+        API_BASE_URL = get_option('--api-url')
+    ## python Final_Project_Code_zhuxiaoy.py --warm-cache  render every comparison page before the websites start
+    if '--warm-cache' in sys.argv:
+        print('Rendered ' + str(warm_render_cache()) + ' comparison pages')
+    if command == 'serve':
+        serve()
+        sys.exit()
 
     Quarter = ['first quarter', 'second quarter', 'third quarter', 'fourth quarter']
     Month = ['january','february','march','april','may','june','july','august','september','october','november','december']
@@ -510,7 +2120,7 @@ if __name__ == "__main__":
     print('In the comparison part, a website will show up where you can select the movie kind, a time interval, and a variable to compare. There are many options available.')
     print('Now, please enjoy it!')
     print("-" * 80)
-    input_R_C = input('Do you want a recommendation or comparison or exit? Please input r for recommendation or c for comparison or exit for exit:')
+    input_R_C = input('Do you want a recommendation or comparison or search or exit? Please input r for recommendation or c for comparison or s for search or exit for exit:')
     while True:
         if input_R_C.lower() == 'r':
             print('''Do you want to see quarterly or monthly box office champions in the US of the last fifty years?''')
@@ -532,34 +2142,11 @@ if __name__ == "__main__":
                             print('-' * 60)
                             print("List of Box Office Champions in the " + SearchTimeInterval + " of the last fifty years in the US")
                             print('-' * 60)
-                            SearchTimeInterval = '"' + SearchTimeInterval + '"'
-                            AllMovieInstances = movie_box_office_search_time_interval(SearchTimeInterval)
-                            for i in list(range(len(AllMovieInstances))):
-                                print("[" + str(i+1) + "] " + AllMovieInstances[i].info())
-
-                            print()
-                            print('-' * 60)
-                            search_detail = input('''Choose the number for detail search or exit or back: ''')
-                            while True:
-                                if search_detail.isalpha() and search_detail.lower() == 'back':
-                                    print()
-                                    input_quarter = input('''Choose the quarter you want to see or exit or back. For quarter search, please input numbers from 1 to 4 indicating the corresponding quarter:''')
-                                    break
-                                elif search_detail.isalpha() and search_detail.lower() == 'exit':
-                                    input_quarter = 'exit'
-                                    break
-                                elif search_detail.isnumeric() and int(search_detail) in list(range(1,len(AllMovieInstances)+1)):
-                                    selected_movie_id = AllMovieInstances[int(search_detail)-1].id
-                                    result_movie = movie_detailed_search(str(selected_movie_id))
-                                    app.run()
-                                    print()
-                                    print('-' * 60)
-                                    search_detail = input('''Choose the number for detail search or exit or back: ''')
-                                else:
-                                    print("[Error] Invalid input")
-                                    print()
-                                    print('-' * 60)
-                                    search_detail = input('''Choose the number for detail search or exit or back: ''')
+                            if browse_champions(SearchTimeInterval) == 'back':
+                                print()
+                                input_quarter = input('''Choose the quarter you want to see or exit or back. For quarter search, please input numbers from 1 to 4 indicating the corresponding quarter:''')
+                            else:
+                                input_quarter = 'exit'
 
 
                         elif input_quarter.isalpha() and input_quarter.lower() == 'back':
@@ -584,34 +2171,11 @@ if __name__ == "__main__":
                             print('-' * 60)
                             print("List of Box Office Champions in " + SearchTimeInterval + " of the last fifty years in the US")
                             print('-' * 60)
-                            SearchTimeInterval = '"' + SearchTimeInterval + '"'
-                            AllMovieInstances = movie_box_office_search_time_interval(SearchTimeInterval)
-                            for i in list(range(len(AllMovieInstances))):
-                                print("[" + str(i+1) + "] " + AllMovieInstances[i].info())
-                            
-                            print()
-                            print('-' * 60)
-                            search_detail = input('''Choose the number for detail search or exit or back: ''')
-                            while True:
-                                if search_detail.isalpha() and search_detail.lower() == 'back':
-                                    print()
-                                    input_month = input('''Choose the month you want to see or exit or back. For month search, please type the month (e.g. january):''')
-                                    break
-                                elif search_detail.isalpha() and search_detail.lower() == 'exit':
-                                    input_month = 'exit'
-                                    break
-                                elif search_detail.isnumeric() and int(search_detail) in list(range(1,len(AllMovieInstances)+1)):
-                                    selected_movie_id = AllMovieInstances[int(search_detail)-1].id
-                                    result_movie = movie_detailed_search(str(selected_movie_id))
-                                    app.run()
-                                    print()
-                                    print('-' * 60)
-                                    search_detail = input('''Choose the number for detail search or exit or back: ''')
-                                else:
-                                    print("[Error] Invalid input")
-                                    print()
-                                    print('-' * 60)
-                                    search_detail = input('''Choose the number for detail search or exit or back: ''')
+                            if browse_champions(SearchTimeInterval) == 'back':
+                                print()
+                                input_month = input('''Choose the month you want to see or exit or back. For month search, please type the month (e.g. january):''')
+                            else:
+                                input_month = 'exit'
 
                         elif input_month.lower() == 'back':
                             input_time_interval = input('''Please input quarter to see quarterly champions or month to see monthly champions or back or exit:''')
@@ -625,7 +2189,7 @@ if __name__ == "__main__":
                             input_month = input('''Choose the month you want to see or exit or back. For month search, please type the month (e.g. january):''')
                         
                 elif input_time_interval.lower() == 'back':
-                    input_R_C = input('Do you want a recommendation or comparison or exit? Please input r for recommendation or c for comparison or exit for exit:')
+                    input_R_C = input('Do you want a recommendation or comparison or search or exit? Please input r for recommendation or c for comparison or s for search or exit for exit:')
                     break
                 elif input_time_interval.lower() == 'exit':
                     input_R_C = 'exit'
@@ -637,12 +2201,51 @@ if __name__ == "__main__":
 
 
         elif input_R_C.lower() == 'c':
-            App.run()
-            input_R_C = input('Do you want a recommendation or comparison or exit? Please input r for recommendation or c for comparison or exit for exit:')
+            open_page('/')
+            input_R_C = input('Do you want a recommendation or comparison or search or exit? Please input r for recommendation or c for comparison or s for search or exit for exit:')
+
+        elif input_R_C.lower() == 's':
+            print()
+            input_search = input('''Input a title, director or genre to search (e.g. lion king, spielberg) or back or exit:''')
+            while True:
+                if input_search.lower() == 'back':
+                    input_R_C = input('Do you want a recommendation or comparison or search or exit? Please input r for recommendation or c for comparison or s for search or exit for exit:')
+                    break
+                elif input_search.lower() == 'exit':
+                    input_R_C = 'exit'
+                    break
+                SearchResults = movie_search(input_search)
+                if len(SearchResults) == 0:
+                    print('Sorry, no movie matches ' + input_search)
+                    print()
+                    input_search = input('''Input a title, director or genre to search (e.g. lion king, spielberg) or back or exit:''')
+                    continue
+                print('-' * 60)
+                print('Movies matching ' + input_search)
+                print('-' * 60)
+                for i in list(range(len(SearchResults))):
+                    movie_id, title, year, director, genre = SearchResults[i]
+                    if director is None:
+                        print("[" + str(i+1) + "] " + str(title) + " (" + str(year) + ")")
+                    else:
+                        print("[" + str(i+1) + "] " + str(title) + " (" + str(year) + "), directed by " + director)
+                print()
+                print('-' * 60)
+                search_detail = input('''Choose the number for detail search or input another search or back or exit: ''')
+                if search_detail.isnumeric() and int(search_detail) in list(range(1,len(SearchResults)+1)):
+                    open_page('/movie/' + str(SearchResults[int(search_detail)-1][0]))
+                    print()
+                    input_search = input('''Input a title, director or genre to search (e.g. lion king, spielberg) or back or exit:''')
+                elif search_detail.isnumeric():
+                    print("[Error] Invalid input")
+                    print()
+                    input_search = input('''Input a title, director or genre to search (e.g. lion king, spielberg) or back or exit:''')
+                else:
+                    input_search = search_detail
 
         elif input_R_C.lower() == 'exit':
             break
         else:
-            print('Please input valid words. (e.g. r for recommendation or c for comparison or exit for exit)')
-            input_R_C = input('Do you want a recommendation or comparison or exit? Please input r for recommendation or c for comparison or exit for exit:')
+            print('Please input valid words. (e.g. r for recommendation or c for comparison or s for search or exit for exit)')
+            input_R_C = input('Do you want a recommendation or comparison or search or exit? Please input r for recommendation or c for comparison or s for search or exit for exit:')
 
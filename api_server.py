@@ -0,0 +1,433 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## A JSON API for the pages of both websites (the champions of a time interval, the comparison of one
+## variable, the champions ranked by one variable and the details of a movie), served by an asyncio event loop so many dashboards can keep
+## connections open at once. Database reads run in a pool of threads so they never block the event loop,
+## and every answer carries an ETag and a Last-Modified date tied to the version of Movies.sqlite, so a
+## browser asking again gets an empty 304 answer until a build or sync changes the data.
+## The website answers the same paths itself (see data_api in Final_Project_Code_zhuxiaoy.py), so its pages
+## ask their own site. Run the API alone with python api_server.py [port], e.g. behind a reverse proxy,
+## and point the pages at it with --api-url.
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import instrumentation
+import interval_index
+import movie_db
+from cache_store import TIME_INTERVALS
+## movie_dataset (and numpy) is imported by the comparison and ranking queries, so the website's
+## /api/ and the detail and listing routes start without loading numpy
+
+API_HOST = '127.0.0.1'
+API_PORT = 5001
+## the number of database reads running at the same time
+API_WORKERS = 8
+## the number of champions /api/rank answers by default and at most
+RANK_DEFAULT_LIMIT = 10
+RANK_MAX_LIMIT = 100
+## the longest request or header line, and the most header lines, a request may have
+MAX_LINE_BYTES = 8192
+MAX_HEADERS = 100
+
+RATING_SOURCES = ['IMDB', 'Rotten Tomatoes', 'Metacritic']
+
+class ApiError(Exception):
+    '''an answer other than 200, e.g. ApiError(404, 'No movie 9999')'''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def get_interval(params):
+    time_interval = params.get('interval')
+    if time_interval not in TIME_INTERVALS:
+        raise ApiError(400, 'interval must be one of ' + ', '.join(TIME_INTERVALS))
+    return time_interval
+
+def get_number(params, name, smallest=None):
+    value = params.get(name)
+    if value is None:
+        return None
+    if not value.isdigit() or (smallest is not None and int(value) < smallest):
+        raise ApiError(400, name + ' must be a whole number' + ('' if smallest is None else ' from ' + str(smallest)))
+    return int(value)
+
+def get_champions(db_filename, time_interval, params):
+    ''' Reads the box office champions of a time interval from the in-memory index (see interval_index.py),
+    latest year first. The query string can sort them by gross (sort=gross), lowest or earliest first (order=asc),
+    keep some years (from=1990&to=1999) and ask for one page of them (page=2&per_page=10).
+
+    Returns
+    -------
+    dict
+        e.g. {'interval': 'june', 'total': 46, 'movies': [{'id': 400, 'year': 2020, 'name': 'Becky', 'gross': 878305}, ...]}
+    '''
+    if time_interval not in TIME_INTERVALS:
+        raise ApiError(404, 'No time interval ' + time_interval)
+    sort_by = params.get('sort', 'year')
+    if sort_by not in interval_index.SORT_ORDERS:
+        raise ApiError(400, 'sort must be one of ' + ', '.join(interval_index.SORT_ORDERS))
+    order = params.get('order', 'desc')
+    if order not in ['asc', 'desc']:
+        raise ApiError(400, 'order must be asc or desc')
+    page = get_number(params, 'page', 1) or 1
+    Rows, total = interval_index.get_index(db_filename).get_champions(time_interval, sort_by, order == 'desc', get_number(params, 'from'),
+                                                                     get_number(params, 'to'), page, get_number(params, 'per_page', 1))
+    return {'interval': time_interval, 'total': total,
+            'movies': [{'id': m[4], 'year': m[0], 'name': m[2], 'gross': m[3]} for m in Rows]}
+
+def get_comparison(db_filename, params):
+    ''' Reads one variable of the box office champions of a time interval, latest year first
+    (the query string holds interval and variable, e.g. ?interval=june&variable=IMDB+rating).
+
+    Returns
+    -------
+    dict
+        e.g. {'interval': 'june', 'variable': 'gross', 'rows': [{'year': 2020, 'value': 878305, 'name': 'Becky'}, ...]}
+    '''
+    time_interval = get_interval(params)
+    variable = params.get('variable')
+    if variable not in movie_db.COMPARE_COLUMNS:
+        raise ApiError(400, 'variable must be one of ' + ', '.join(movie_db.COMPARE_COLUMNS))
+    import movie_dataset
+    if movie_dataset.is_available():
+        Rows = movie_dataset.get_dataset(db_filename).search_comparison(variable, time_interval)
+    else:
+        Rows = movie_db.search_comparison(variable, time_interval, db_filename)
+    return {'interval': time_interval, 'variable': variable,
+            'rows': [{'year': m[0], 'value': m[1], 'name': m[2]} for m in Rows]}
+
+def get_ranking(db_filename, params):
+    ''' Ranks the box office champions by one variable with the in-memory dataset (see movie_dataset.rank),
+    or SQLite when numpy is not installed. The query string holds the variable and can keep one time interval
+    (interval=june), some years (from=1990&to=1999), put the lowest first (order=asc) and set the number of
+    champions (limit=20, at most RANK_MAX_LIMIT).
+
+    Returns
+    -------
+    dict
+        e.g. {'variable': 'IMDB rating', 'interval': 'june', 'movies': [{'id': 412, 'year': 2008, 'interval': 'june',
+        'name': 'WALL-E', 'value': 84.0}, ...]}
+    '''
+    variable = params.get('variable')
+    if variable not in movie_db.COMPARE_COLUMNS:
+        raise ApiError(400, 'variable must be one of ' + ', '.join(movie_db.COMPARE_COLUMNS))
+    time_interval = params.get('interval')
+    if time_interval is not None:
+        time_interval = get_interval(params)
+    order = params.get('order', 'desc')
+    if order not in ['asc', 'desc']:
+        raise ApiError(400, 'order must be asc or desc')
+    limit = min(get_number(params, 'limit', 1) or RANK_DEFAULT_LIMIT, RANK_MAX_LIMIT)
+    Arguments = (variable, time_interval, get_number(params, 'from'), get_number(params, 'to'), limit, order == 'asc')
+    import movie_dataset
+    if movie_dataset.is_available():
+        Rows = movie_dataset.get_dataset(db_filename).rank(*Arguments)
+    else:
+        Rows = movie_db.search_ranking(*Arguments, filename=db_filename)
+    return {'variable': variable, 'interval': time_interval,
+            'movies': [{'id': m[0], 'year': m[1], 'interval': m[2], 'name': m[3], 'value': m[4]} for m in Rows]}
+
+def get_movie(db_filename, movie_id):
+    ''' Reads the details of the movie of one box office row. A movie OMDB has no record of has no release date.
+
+    Returns
+    -------
+    dict
+        e.g. {'id': 1, 'name': 'Bad Boys for Life', 'release_date': '17 Jan 2020', 'runtime': 124, 'genre': '...',
+        'director': '...', 'ratings': {'IMDB': 66.0, 'Rotten Tomatoes': 77.0, 'Metacritic': 59.0}}
+    '''
+    if not movie_id.isdigit():
+        raise ApiError(404, 'No movie ' + movie_id)
+    Rows = interval_index.get_index(db_filename).search_movie_detail(movie_id)
+    if len(Rows) == 0:
+        raise ApiError(404, 'No movie ' + movie_id)
+    movie = Rows[0]
+    return {'id': movie[0], 'name': movie[1], 'release_date': movie[2], 'runtime': movie[3], 'genre': movie[4],
+            'director': movie[5], 'ratings': dict(zip(RATING_SOURCES, movie[6:9]))}
+
+class Api:
+    '''the JSON API of one database, answering the requests of any server (see ApiServer and data_api)
+
+    Instance Attributes
+    -------------------
+    db_filename: string
+        the path of the database (e.g. 'Movies.sqlite')
+
+    modified: dict
+        the Last-Modified time of every version of the database seen so far
+
+    allow_origin: string
+        the origin of the website allowed to read the API from another origin (e.g. 'https://movies.example.com'),
+        or None when the pages are served from the same origin (see data_api)
+    '''
+    def __init__(self, db_filename=movie_db.DB_FILENAME, allow_origin=None):
+        self.db_filename = db_filename
+        self.allow_origin = allow_origin
+        self.modified = {}
+        self.lock = threading.Lock()
+
+    def get_last_modified(self, version):
+        ''' Returns the time a version of the database was written: the modification time of the
+        database files when the version is first seen (the same after a restart), and always later than
+        the time of the versions seen before, so If-Modified-Since never matches a newer version.
+        '''
+        with self.lock:
+            if version not in self.modified:
+                Times = [os.path.getmtime(filename) for filename in [self.db_filename, self.db_filename + '-wal']
+                         if os.path.exists(filename)]
+                last_modified = int(max(Times + [0]))
+                if len(self.modified) > 0:
+                    last_modified = max(last_modified, max(self.modified.values()) + 1)
+                self.modified[version] = last_modified
+            return self.modified[version]
+
+    def route(self, path, params):
+        ''' Finds the data of a path (e.g. '/api/movie/1').
+        '''
+        if path == '/api/comparison':
+            return get_comparison(self.db_filename, params)
+        if path == '/api/rank':
+            return get_ranking(self.db_filename, params)
+        if path.startswith('/api/intervals/'):
+            return get_champions(self.db_filename, unquote(path[len('/api/intervals/'):]), params)
+        if path.startswith('/api/movie/'):
+            return get_movie(self.db_filename, path[len('/api/movie/'):])
+        raise ApiError(404, 'No such API: ' + path)
+
+    def respond(self, method, target, headers):
+        ''' Makes the answer to one request. Reads the database, so it runs on a thread of the server.
+
+        Parameters
+        ----------
+        method: string
+            the method of the request (GET and HEAD are answered, and OPTIONS when allow_origin is set)
+        target: string
+            the path and query of the request (e.g. '/api/comparison?interval=june&variable=gross')
+        headers: dict
+            the headers of the request, with lower-case names
+
+        Returns
+        -------
+        tuple
+            (status, dict of headers, body bytes)
+        '''
+        Headers = {'Content-Type': 'application/json'}
+        if self.allow_origin is not None:
+            ## the pages of the website read the API from another origin, and revalidate with its ETag
+            Headers.update({'Access-Control-Allow-Origin': self.allow_origin, 'Vary': 'Origin',
+                            'Access-Control-Expose-Headers': 'ETag, Last-Modified'})
+            if method == 'OPTIONS':
+                Headers.update({'Access-Control-Allow-Methods': 'GET, HEAD', 'Access-Control-Allow-Headers': 'If-None-Match, If-Modified-Since',
+                                'Access-Control-Max-Age': '86400'})
+                return 204, Headers, b''
+        if method not in ['GET', 'HEAD']:
+            Headers['Allow'] = 'GET, HEAD'
+            return 405, Headers, json.dumps({'error': 'Only GET and HEAD are allowed'}).encode('utf-8')
+        url = urlsplit(target)
+        with instrumentation.span('api ' + url.path.rsplit('/', 1)[0]):
+            version = movie_db.get_database_version(self.db_filename)
+            last_modified = self.get_last_modified(version)
+            etag = '"' + str(version) + '"'
+            ## clients revalidate every time, which costs a 304 until the data changes
+            try:
+                ## route first, so a missing movie or a bad parameter is an error even with the current ETag
+                data = self.route(url.path, dict(parse_qsl(url.query)))
+            except ApiError as e:
+                return e.status, Headers, json.dumps({'error': str(e)}).encode('utf-8')
+            Headers.update({'ETag': etag, 'Last-Modified': formatdate(last_modified, usegmt=True), 'Cache-Control': 'no-cache'})
+            if is_not_modified(headers, etag, last_modified):
+                instrumentation.count('api not modified')
+                return 304, Headers, b''
+            return 200, Headers, json.dumps(data).encode('utf-8')
+
+class ApiServer(Api):
+    '''the JSON API of one database, answering on an asyncio event loop
+
+    Instance Attributes
+    -------------------
+    executor: ThreadPoolExecutor
+        the threads running the database reads (each keeps its own connection, see movie_db.get_connection)
+
+    port: int
+        the port the server listens on, once it is started
+    '''
+    def __init__(self, db_filename=movie_db.DB_FILENAME, workers=API_WORKERS, allow_origin=None):
+        super().__init__(db_filename, allow_origin)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.loop = None
+        self.server = None
+        self.port = None
+
+    async def read_head(self, reader):
+        ''' Reads the request line and the headers of one request. The API only answers GET and HEAD,
+        so a request with a body (Content-Length or Transfer-Encoding) is refused rather than read.
+
+        Returns
+        -------
+        tuple
+            (the request line split in method, target and protocol, or None when the connection closed,
+            the headers with lower-case names, the status refusing the request or None)
+        '''
+        request_line = await reader.readline()
+        if not request_line:
+            return None, {}, None
+        parts = request_line.decode('latin-1').split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in [b'\r\n', b'\n', b'']:
+                break
+            if len(headers) >= MAX_HEADERS:
+                return parts, headers, 431
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if len(parts) != 3:
+            return parts, headers, 400
+        if 'transfer-encoding' in headers or headers.get('content-length', '0') != '0':
+            return parts, headers, 400 if not headers.get('content-length', '0').isdigit() else 413
+        return parts, headers, None
+
+    async def handle(self, reader, writer):
+        ''' Answers the requests of one connection, keeping it open between requests (HTTP/1.1 keep-alive).
+        A request line or header line longer than MAX_LINE_BYTES, more than MAX_HEADERS headers or a request
+        with a body is answered with an error and the connection is closed, since the rest of it cannot be trusted.
+        '''
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    parts, headers, error = await self.read_head(reader)
+                except ValueError:
+                    ## a line longer than the limit of the stream
+                    parts, headers, error = [], {}, 431
+                if parts is None:
+                    break
+                if error is not None:
+                    body = json.dumps({'error': HTTPStatus(error).phrase}).encode('utf-8')
+                    writer.write(make_response(error, {'Content-Type': 'application/json'}, body, False, False))
+                    await writer.drain()
+                    break
+                method, target, protocol = parts
+                try:
+                    status, Headers, body = await loop.run_in_executor(self.executor, self.respond, method, target, headers)
+                except Exception as e:
+                    status, Headers, body = 500, {'Content-Type': 'application/json'}, json.dumps({'error': str(e)}).encode('utf-8')
+                keep_alive = protocol == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(make_response(status, Headers, body, method == 'HEAD', keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=API_HOST, port=API_PORT):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle, host, port, backlog=1024, limit=MAX_LINE_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        ''' Stops a server started by start_api_server.
+        '''
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
+
+def is_not_modified(headers, etag, last_modified):
+    ''' Checks the conditional headers of a request: If-None-Match wins over If-Modified-Since.
+    '''
+    if 'if-none-match' in headers:
+        Tags = [tag.strip() for tag in headers['if-none-match'].split(',')]
+        return '*' in Tags or etag in Tags or 'W/' + etag in Tags
+    if 'if-modified-since' in headers:
+        try:
+            return parsedate_to_datetime(headers['if-modified-since']).timestamp() >= last_modified
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def make_response(status, Headers, body, head, keep_alive):
+    ''' Makes the bytes of an HTTP/1.1 answer.
+    '''
+    lines = ['HTTP/1.1 ' + str(status) + ' ' + HTTPStatus(status).phrase]
+    Headers = dict(Headers)
+    if status != 304:
+        Headers['Content-Length'] = str(len(body))
+    Headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+    for name, value in Headers.items():
+        lines.append(name + ': ' + value)
+    head_bytes = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    if head or status == 304:
+        return head_bytes
+    return head_bytes + body
+
+def start_api_server(db_filename=movie_db.DB_FILENAME, host=API_HOST, port=API_PORT, workers=API_WORKERS, allow_origin=None):
+    ''' Starts the API in a background thread running its own event loop.
+
+    Parameters
+    ----------
+    db_filename: string
+        the path of the database
+    host: string
+        the address to listen on
+    port: int
+        the port to listen on (0 picks a free one)
+    workers: int
+        the number of threads running database reads
+    allow_origin: string
+        the origin of the website whose pages read the API (e.g. 'https://movies.example.com'), or None
+
+    Returns
+    -------
+    ApiServer
+        the running server (server.port is the port it listens on)
+    '''
+    server = ApiServer(db_filename, workers, allow_origin)
+    started = threading.Event()
+    Errors = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(server.start(host, port))
+        except OSError as e:
+            Errors.append(e)
+            started.set()
+            return
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+    if len(Errors) > 0:
+        raise Errors[0]
+    return server
+
+if __name__ == "__main__":
+    ## python api_server.py [port] [Movies.sqlite] [--allow-origin=https://movies.example.com]
+    ## --allow-origin is the origin of the website started with --api-url pointing at this API
+    Arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    allow_origin = None
+    for argument in sys.argv[1:]:
+        if argument.startswith('--allow-origin='):
+            allow_origin = argument[len('--allow-origin='):]
+    port = int(Arguments[0]) if len(Arguments) > 0 else API_PORT
+    db_filename = Arguments[1] if len(Arguments) > 1 else movie_db.DB_FILENAME
+    api = start_api_server(db_filename, API_HOST, port, allow_origin=allow_origin)
+    print('Serving the API of ' + db_filename + ' on http://' + API_HOST + ':' + str(api.port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
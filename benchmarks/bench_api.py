@@ -0,0 +1,79 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Measures the json API under many dashboards at once: every client keeps one connection open and asks
+## for comparisons, time intervals and movies in turn, first without and then with the ETag of its
+## last answer (as a browser revalidating its cache does). Runs on a temporary copy of Movies.sqlite.
+## Run from the project directory: python benchmarks/bench_api.py [clients] [requests per client]
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import api_server
+import movie_db
+from cache_store import TIME_INTERVALS
+
+def get_path(i):
+    variables = list(movie_db.COMPARE_COLUMNS)
+    if i % 3 == 0:
+        return '/api/comparison?interval=' + TIME_INTERVALS[i % 16].replace(' ', '+') + '&variable=' + variables[i % 6].replace(' ', '+')
+    if i % 3 == 1:
+        return '/api/intervals/' + TIME_INTERVALS[i % 16].replace(' ', '%20')
+    return '/api/movie/' + str(i % 700 + 1)
+
+async def run_client(port, client, requests, revalidate, Latencies, Statuses):
+    ''' Sends requests on one keep-alive connection and records the latency and status of each answer.
+    '''
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    Etags = {}
+    for i in range(requests):
+        ## a dashboard goes back and forth between a few views
+        path = get_path(client * 7 + i % 5)
+        request = 'GET ' + path + ' HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+        if revalidate and path in Etags:
+            request = request + 'If-None-Match: ' + Etags[path] + '\r\n'
+        start = time.perf_counter()
+        writer.write((request + '\r\n').encode('latin-1'))
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line == '\r\n':
+                break
+            name, _, value = line.partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+            elif name.lower() == 'etag':
+                Etags[path] = value.strip()
+        await reader.readexactly(length)
+        Latencies.append((time.perf_counter() - start) * 1000)
+        Statuses[status] = Statuses.get(status, 0) + 1
+    writer.close()
+
+async def run_clients(port, clients, requests, revalidate):
+    Latencies = []
+    Statuses = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[run_client(port, client, requests, revalidate, Latencies, Statuses) for client in range(clients)])
+    return time.perf_counter() - start, sorted(Latencies), Statuses
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    directory = tempfile.mkdtemp()
+    db_filename = os.path.join(directory, 'Movies.sqlite')
+    shutil.copy(movie_db.DB_FILENAME, db_filename)
+    server = api_server.start_api_server(db_filename, '127.0.0.1', 0)
+    print(str(clients) + ' clients, ' + str(requests) + ' requests each, ' + str(api_server.API_WORKERS) + ' database workers')
+    print('%-14s %10s %10s %10s %10s  %s' % ('requests', 'seconds', 'req/s', 'p50 ms', 'p99 ms', 'statuses'))
+    for name, revalidate in [('first visit', False), ('revalidating', True)]:
+        elapsed, Latencies, Statuses = asyncio.run(run_clients(server.port, clients, requests, revalidate))
+        print('%-14s %10.3f %10.0f %10.2f %10.2f  %s' % (name, elapsed, len(Latencies) / elapsed, Latencies[len(Latencies) // 2],
+                                                        Latencies[int(len(Latencies) * 0.99)], Statuses))
+    server.stop()
+    shutil.rmtree(directory)
@@ -0,0 +1,58 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Measures how parsing a large backfill of Box Office Mojo pages scales with the number of parsing processes.
+## The 16 pages of cache.json are repeated to stand in for a backfill of many more pages, and each number
+## of workers must give the same rows with the same contiguous ids as one process.
+## Run from the project directory: python benchmarks/bench_backfill.py [repeats of the 16 pages] [worker counts...]
+import json
+import os
+import sys
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_DIR)
+import Final_Project_Code_zhuxiaoy as program
+from box_office_parser import parse_pages, parse_box_office_rows_lxml, parse_box_office_rows_soup, etree
+from cache_store import TIME_INTERVALS
+
+def time_backfill(Pages, workers, parser):
+    ''' Parses every page with `workers` processes and numbers the rows as iter_box_office_tuples does.
+
+    Returns
+    -------
+    tuple
+        (seconds, list of (id, time interval, row) tuples)
+    '''
+    start = time.perf_counter()
+    Tuples = []
+    a = 1
+    for TimeInterval, Rows in parse_pages(Pages, workers, parser):
+        for row in Rows:
+            Tuples.append((a, TimeInterval) + program.normalize_box_office_row(row))
+            a = a + 1
+    return time.perf_counter() - start, Tuples
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    cpus = os.cpu_count() or 1
+    Workers = [int(workers) for workers in sys.argv[2:]] or sorted(set([1, 2, 4, cpus]))
+    with open(os.path.join(PROJECT_DIR, 'cache.json'), 'r') as cache_file:
+        cache_dict = json.load(cache_file)
+    Pages = [(interval, cache_dict[interval]) for interval in TIME_INTERVALS] * repeats
+
+    Parsers = [('BeautifulSoup', parse_box_office_rows_soup)]
+    if etree is not None:
+        Parsers.append(('lxml', parse_box_office_rows_lxml))
+    print(str(len(Pages)) + ' pages, ' + str(cpus) + ' CPUs')
+    print('%-14s %8s %10s %10s %9s' % ('parser', 'workers', 'seconds', 'pages/s', 'speed-up'))
+    for name, parser in Parsers:
+        base_time, base_tuples = None, None
+        for workers in Workers:
+            elapsed, Tuples = time_backfill(Pages, workers, parser)
+            if base_tuples is None:
+                base_time, base_tuples = elapsed, Tuples
+            elif Tuples != base_tuples:
+                sys.exit(str(workers) + ' workers read different rows or ids than one worker')
+            print('%-14s %8d %10.3f %10.1f %8.2fx' % (name, workers, elapsed, len(Pages) / elapsed, base_time / elapsed))
@@ -0,0 +1,45 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Compares the single-pass lxml parser with the BeautifulSoup tree parser on the 16 pages in cache.json.
+## Run from the project directory: python benchmarks/bench_parser.py [repeats]
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from box_office_parser import parse_box_office_rows_lxml, parse_box_office_rows_soup, etree
+from cache_store import TIME_INTERVALS
+
+def time_parser(parser, pages, repeats):
+    ''' Parses every page `repeats` times and returns the best total time in seconds and the rows of the last run.
+    '''
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = [parser(page) for page in pages]
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, rows
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with open('cache.json', 'r') as cache_file:
+        cache_dict = json.load(cache_file)
+    pages = [cache_dict[interval] for interval in TIME_INTERVALS]
+    if etree is None:
+        sys.exit('lxml is not installed')
+
+    soup_time, soup_rows = time_parser(parse_box_office_rows_soup, pages, repeats)
+    lxml_time, lxml_rows = time_parser(parse_box_office_rows_lxml, pages, repeats)
+    if soup_rows != lxml_rows:
+        sys.exit('the two parsers read different rows')
+
+    row_count = sum(len(rows) for rows in lxml_rows)
+    print(str(len(pages)) + ' pages, ' + str(row_count) + ' rows, best of ' + str(repeats))
+    print('BeautifulSoup (html.parser): %8.1f ms' % (soup_time * 1000))
+    print('lxml single pass:            %8.1f ms' % (lxml_time * 1000))
+    print('speed-up:                    %8.1fx' % (soup_time / lxml_time))
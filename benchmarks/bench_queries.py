@@ -0,0 +1,67 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Measures the latency of the three queries of the program on Movies.sqlite, with a new connection
+## and string-built SQL per call (as the program used to do) and through the pooled movie_db layer.
+## Run from the project directory: python benchmarks/bench_queries.py [iterations]
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import movie_db
+
+TIME_INTERVALS = ['first quarter', 'second quarter', 'third quarter', 'fourth quarter',
+                  'january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+                  'september', 'october', 'november', 'december']
+
+def connect_per_call(query):
+    connection = sqlite3.connect(movie_db.DB_FILENAME)
+    result = connection.execute(query).fetchall()
+    connection.close()
+    return result
+
+def time_interval_per_call(i):
+    return connect_per_call("SELECT MovieYear, TimeInterval, MovieName, Gross, id FROM BoxOffice WHERE TimeInterval = " + '"' + TIME_INTERVALS[i % 16] + '"' + " ORDER BY MovieYear DESC")
+
+def movie_detail_per_call(i):
+    return connect_per_call('''SELECT BoxOffice.id, MovieName, ReleaseDate, runtime, genre, director, Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id WHERE BoxOffice.id = ''' + str(i % 700 + 1))
+
+def comparison_per_call(i):
+    variables = list(movie_db.COMPARE_COLUMNS)
+    return connect_per_call('''SELECT MovieYear, ''' + movie_db.COMPARE_COLUMNS[variables[i % 6]] + ''', MovieName FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id WHERE TimeInterval = ''' + '"' + TIME_INTERVALS[i % 16] + '"' + ''' ORDER BY MovieYear DESC''')
+
+def time_interval_pooled(i):
+    return movie_db.search_time_interval(TIME_INTERVALS[i % 16])
+
+def movie_detail_pooled(i):
+    return movie_db.search_movie_detail(i % 700 + 1)
+
+def comparison_pooled(i):
+    variables = list(movie_db.COMPARE_COLUMNS)
+    return movie_db.search_comparison(variables[i % 6], TIME_INTERVALS[i % 16])
+
+def measure(function, iterations):
+    ''' Calls function(i) for i in range(iterations) and returns the p50 and p99 latency in microseconds.
+    '''
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        function(i)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print('%-22s %22s %22s' % ('query', 'connect per call p50/p99', 'pooled p50/p99 (us)'))
+    for name, per_call, pooled in [('time interval listing', time_interval_per_call, time_interval_pooled),
+                                   ('movie detail', movie_detail_per_call, movie_detail_pooled),
+                                   ('comparison results', comparison_per_call, comparison_pooled)]:
+        if per_call(0) != pooled(0):
+            sys.exit(name + ': the two ways return different rows')
+        old = measure(per_call, iterations)
+        new = measure(pooled, iterations)
+        print('%-22s %11.1f / %8.1f %11.1f / %8.1f' % (name, old[0], old[1], new[0], new[1]))
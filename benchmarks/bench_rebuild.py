@@ -0,0 +1,126 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Measures a rebuild of Movies.sqlite while the website reads it: reader threads keep querying time
+## intervals, movies and comparisons (each on its own connection, as the website's threads do) while the
+## tables are built again, first in place as --rebuild did before (drop the tables, then sync) and then
+## in a new file swapped in by build_database. Prints the rebuild time and the reader latencies, errors
+## and empty answers. The pages and OMDB records come from the local stub server, loaded once into the cache.
+## Run from the project directory: python benchmarks/bench_rebuild.py [readers] [rebuilds]
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+## the stub server ignores the key, so no real OMDB key is needed
+os.environ.setdefault('OMDB_API_KEY', 'benchmark')
+import Final_Project_Code_zhuxiaoy as program
+import cache_store
+import movie_db
+from stub_server import start_stub_server
+
+def drop_tables():
+    ''' Drops every table in Movies.sqlite, as --rebuild did before the next sync built them again.
+    '''
+    conn = sqlite3.connect(program.DB_FILENAME)
+    c = conn.cursor()
+    program.drop_detailed_information(c)
+    for table in ['BoxOffice', 'Movie', 'SourceHash'] + movie_db.DERIVED_TABLES:
+        c.execute('DROP TABLE IF EXISTS "' + table + '"')
+    movie_db.bump_database_version(c)
+    conn.commit()
+    conn.close()
+
+def rebuild_in_place():
+    drop_tables()
+    program.sync_database()
+
+def read(i):
+    ''' Runs the i-th query of a reader and returns its rows.
+    '''
+    if i % 3 == 0:
+        return movie_db.search_time_interval(cache_store.TIME_INTERVALS[i % 16], program.DB_FILENAME)
+    if i % 3 == 1:
+        return movie_db.search_movie_detail(i % 500 + 1, program.DB_FILENAME)
+    return movie_db.search_comparison('IMDB rating', cache_store.TIME_INTERVALS[i % 16], program.DB_FILENAME)
+
+def run_reader(stop, Latencies, Failures):
+    ''' Queries until stop is set, with a short pause between queries as a website under steady load.
+    '''
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            if len(read(i)) == 0:
+                Failures['empty'] += 1
+        except sqlite3.Error:
+            Failures['errors'] += 1
+        Latencies.append((start, (time.perf_counter() - start) * 1000))
+        i = i + 1
+        time.sleep(0.001)
+    movie_db.close_connections()
+
+def time_rebuild(rebuild, readers):
+    ''' Rebuilds the tables while `readers` threads query them.
+
+    Returns
+    -------
+    tuple
+        (seconds of the rebuild, sorted latencies in ms of the queries started during the rebuild,
+        {'errors': n, 'empty': n})
+    '''
+    stop = threading.Event()
+    Latencies = []
+    Failures = {'errors': 0, 'empty': 0}
+    Threads = [threading.Thread(target=run_reader, args=(stop, Latencies, Failures)) for i in range(readers)]
+    for thread in Threads:
+        thread.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rebuild()
+    end = time.perf_counter()
+    time.sleep(0.2)
+    stop.set()
+    for thread in Threads:
+        thread.join()
+    return end - start, sorted(latency for started, latency in Latencies if start <= started <= end), Failures
+
+if __name__ == "__main__":
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    rebuilds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    directory = tempfile.mkdtemp()
+    server = start_stub_server(os.path.join(PROJECT_DIR, 'cache.json'))
+    program.DB_FILENAME = os.path.join(directory, 'Movies.sqlite')
+    program.CACHE_FILENAME = os.path.join(directory, 'no_cache.json')
+    program.BOX_OFFICE_BASE_URL = server.base_url
+    program.OMDB_BASE_URL = server.base_url + '/'
+    program.RATE_LIMITS = {'127.0.0.1:' + str(server.server_port): 1000}
+    program.FETCHER = None
+    program.CACHE_DICT = cache_store.CacheStore(os.path.join(directory, 'cache.sqlite'), compress=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        program.sync_database()
+
+    print(str(readers) + ' readers, ' + str(rebuilds) + ' rebuilds of each kind')
+    ## the queries are the ones started during the rebuilds, the errors and empty answers those of the whole run
+    print('%-28s %9s %9s %9s %9s %9s %7s %7s' % ('rebuild', 'alone s', 'read s', 'queries', 'p50 ms', 'p99 ms', 'errors', 'empty'))
+    for name, rebuild in [('in place (drop, then sync)', rebuild_in_place), ('new file (build_database)', program.build_database)]:
+        Alone = [time_rebuild(rebuild, 0)[0] for i in range(rebuilds)]
+        Runs = [time_rebuild(rebuild, readers) for i in range(rebuilds)]
+        Latencies = sorted(latency for run in Runs for latency in run[1])
+        print('%-28s %9.3f %9.3f %9d %9.2f %9.2f %7d %7d' % (name, min(Alone), min(run[0] for run in Runs), len(Latencies),
+              Latencies[len(Latencies) // 2], Latencies[int(len(Latencies) * 0.99)],
+              sum(run[2]['errors'] for run in Runs), sum(run[2]['empty'] for run in Runs)))
+    print('version after the rebuilds: ' + str(movie_db.get_database_version(program.DB_FILENAME)))
+    program.CACHE_DICT.close()
+    server.shutdown()
+    shutil.rmtree(directory)
@@ -0,0 +1,78 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Measures a daily refresh of the 16 Box Office Mojo pages against the local stub server: a first sync
+## downloads every page, then the pages expire and are refreshed with conditional requests (nothing changed,
+## then one page changed), and once more without their ETag and Last-Modified, as the earlier version did.
+## Also prints how much smaller the pages are in the compressed cache than in cache.json.
+## Run from the project directory: python benchmarks/bench_revalidate.py
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+## the stub server ignores the key, so no real OMDB key is needed
+os.environ.setdefault('OMDB_API_KEY', 'benchmark')
+import Final_Project_Code_zhuxiaoy as program
+import cache_store
+from stub_server import start_stub_server
+
+def expire_pages(store, keep_validators=True):
+    ''' Makes every cached page expire, as a day later.
+    '''
+    with store.lock:
+        store.connection.execute('UPDATE Cache SET expires_at = 0' + ('' if keep_validators else ', meta = NULL') + ' WHERE namespace = ?',
+                                 (cache_store.BOX_OFFICE_NAMESPACE,))
+        store.connection.commit()
+
+def refresh(server, name):
+    ''' Runs one sync and prints the page bytes it downloaded and the pages it parsed.
+    '''
+    server.bytes_sent = 0
+    server.request_count = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Counts = program.sync_database()
+    elapsed = time.perf_counter() - start
+    print('%-34s %9d %9d %9d %9.3f' % (name, server.request_count, server.bytes_sent, Counts['pages'], elapsed))
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    cache_json = os.path.join(PROJECT_DIR, 'cache.json')
+    server = start_stub_server(cache_json)
+    program.DB_FILENAME = os.path.join(directory, 'Movies.sqlite')
+    program.CACHE_FILENAME = os.path.join(directory, 'no_cache.json')
+    program.BOX_OFFICE_BASE_URL = server.base_url
+    program.OMDB_BASE_URL = server.base_url + '/'
+    program.RATE_LIMITS = {'127.0.0.1:' + str(server.server_port): 1000}
+    program.FETCHER = None
+    store = cache_store.CacheStore(os.path.join(directory, 'cache.sqlite'), compress=True)
+    program.CACHE_DICT = store
+
+    print('%-34s %9s %9s %9s %9s' % ('sync', 'requests', 'bytes', 'parsed', 'seconds'))
+    refresh(server, 'first sync (empty cache)')
+    expire_pages(store)
+    refresh(server, 'refresh, nothing changed')
+    server.cache_dict['june'] = server.cache_dict['june'].replace('</body>', '<!-- updated --></body>')
+    expire_pages(store)
+    refresh(server, 'refresh, one page changed')
+    expire_pages(store, keep_validators=False)
+    refresh(server, 'refresh without validators')
+
+    with open(cache_json, 'r') as cache_file:
+        cache_dict = json.load(cache_file)
+    json_bytes = sum(len(json.dumps(cache_dict[interval])) for interval in cache_store.TIME_INTERVALS)
+    stored_bytes = store.connection.execute('SELECT SUM(size) FROM Cache WHERE namespace = ?', (cache_store.BOX_OFFICE_NAMESPACE,)).fetchone()[0]
+    print('pages: ' + str(json_bytes) + ' bytes in cache.json, ' + str(stored_bytes) + ' bytes compressed in the cache (' +
+          str(round(json_bytes / stored_bytes, 1)) + 'x smaller)')
+    store.close()
+    server.shutdown()
+    shutil.rmtree(directory)
@@ -0,0 +1,70 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Measures how long the program takes to start and answer one query from the command line, as a script
+## or cron job would run it, next to the bare interpreter. Each command runs in a new process on a
+## temporary copy of Movies.sqlite, without an OMDB key. Exits with status 1 when a query takes longer
+## than the limit or loads flask, requests, bs4 or numpy.
+## Run from the project directory: python benchmarks/bench_startup.py [runs] [limit in seconds]
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+PROGRAM = os.path.join(PROJECT_DIR, 'Final_Project_Code_zhuxiaoy.py')
+## the packages only building or serving needs
+HEAVY_MODULES = ['flask', 'requests', 'requests_oauthlib', 'bs4', 'numpy', 'lxml']
+
+COMMANDS = [
+    ('python (nothing)', ['-c', 'pass']),
+    ('import program', ['-c', 'import Final_Project_Code_zhuxiaoy']),
+    ('import api_server', ['-c', 'import api_server']),
+    ('query interval', [PROGRAM, 'query', 'interval', 'june']),
+    ('query movie', [PROGRAM, 'query', 'movie', '1']),
+    ('query search', [PROGRAM, 'query', 'search', 'lion', 'king']),
+    ('query compare', [PROGRAM, 'query', 'compare', 'IMDB rating', 'june', '--json']),
+]
+
+## runs a query in a process and prints the heavy packages it imported
+## (api_server is imported by the website's /api/ and must not load numpy for a movie or a listing either)
+LOADED_CHECK = '''import sys
+import Final_Project_Code_zhuxiaoy as program
+import api_server
+program.run_query(['interval', 'june'])
+program.run_query(['search', 'lion', 'king'])
+print('LOADED ' + ','.join(m for m in {modules!r} if m in sys.modules))'''
+
+def run(arguments, directory, environment):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable] + arguments, cwd=directory, env=environment, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(' '.join(arguments) + ' failed: ' + result.stderr)
+    return elapsed, result.stdout
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    limit = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    directory = tempfile.mkdtemp()
+    shutil.copy(os.path.join(PROJECT_DIR, 'Movies.sqlite'), directory)
+    environment = dict(os.environ, PYTHONPATH=PROJECT_DIR)
+    environment.pop('OMDB_API_KEY', None)
+    failed = False
+    print('%-18s %10s %10s' % ('command', 'p50 ms', 'max ms'))
+    for name, arguments in COMMANDS:
+        Times = [run(arguments, directory, environment)[0] * 1000 for i in range(runs)]
+        print('%-18s %10.1f %10.1f' % (name, statistics.median(Times), max(Times)))
+        if name.startswith('query') and statistics.median(Times) > limit * 1000:
+            print('  slower than ' + str(limit) + ' s')
+            failed = True
+    output = run(['-c', LOADED_CHECK.format(modules=HEAVY_MODULES)], directory, environment)[1]
+    Loaded = [module for module in output.split('LOADED ')[-1].strip().split(',') if module != '']
+    print('heavy packages loaded by a query: ' + (', '.join(Loaded) or 'none'))
+    shutil.rmtree(directory)
+    if failed or len(Loaded) > 0:
+        sys.exit(1)
@@ -0,0 +1,340 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Times the ingest, parse, query and render paths of the program offline, against the bundled cache.json
+## and Movies.sqlite and a local stub server standing in for Box Office Mojo and OMDB.
+## Reports throughput, p50/p99 latency and peak memory, and exits with status 1 when a benchmark
+## regresses against the saved baseline. Baselines belong to the machine they were saved on and are not
+## committed; timings are compared after scaling the baseline by how fast a fixed calibration loop ran
+## then and now, so a slower or busier machine does not show up as regressions.
+##
+## Run from the project directory:
+##   python benchmarks/bench_suite.py                  compare with benchmarks/baseline.json if it exists
+##   python benchmarks/bench_suite.py --save-baseline  save the results as this machine's baseline
+##   python benchmarks/bench_suite.py --tolerance 0.3 --only query
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_DIR)
+## the stub server ignores the key, so no real OMDB key is needed
+os.environ.setdefault('OMDB_API_KEY', 'benchmark')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import Final_Project_Code_zhuxiaoy as program
+import cache_store
+import interval_index
+import api_server
+import movie_dataset
+import snapshot
+from stub_server import start_stub_server
+
+BASELINE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+## differences below these are never reported as regressions
+NOISE_FLOOR = {'p50_ms': 0.05, 'peak_kb': 64}
+## the number of times the calibration loop is timed (the median is kept)
+CALIBRATION_ROUNDS = 7
+
+BENCHMARKS = []
+
+def benchmark(name, iterations, setup=None):
+    ''' Registers a benchmark. The function is called with the iteration number;
+    setup, if given, is called before every iteration and is not timed.
+    '''
+    def register(function):
+        BENCHMARKS.append((name, function, iterations, setup))
+        return function
+    return register
+
+class Environment:
+    '''the temporary copies of the cache and database the benchmarks run against
+
+    Instance Attributes
+    -------------------
+    directory: string
+        the temporary directory holding the copies
+
+    server: StubServer
+        the stub server answering Box Office Mojo and OMDB requests
+
+    pages: list
+        the html of the 16 Box Office Mojo pages in cache.json
+    '''
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='movie-bench-')
+        self.cache_json = os.path.join(PROJECT_DIR, 'cache.json')
+        self.server = start_stub_server(self.cache_json)
+        with open(self.cache_json, 'r') as cache_file:
+            cache_dict = json.load(cache_file)
+        self.pages = [cache_dict[interval] for interval in cache_store.TIME_INTERVALS]
+        self.database = os.path.join(self.directory, 'Movies.sqlite')
+        shutil.copy(os.path.join(PROJECT_DIR, 'Movies.sqlite'), self.database)
+        self.warm_cache = os.path.join(self.directory, 'warm_cache.sqlite')
+        store = cache_store.CacheStore(self.warm_cache)
+        cache_store.migrate_json_cache(self.cache_json, store)
+        store.close()
+        self.cold_count = 0
+
+        program.DB_FILENAME = self.database
+        program.CACHE_FILENAME = os.path.join(self.directory, 'no_cache.json')
+        program.BOX_OFFICE_BASE_URL = self.server.base_url
+        program.OMDB_BASE_URL = self.server.base_url + '/'
+        program.RATE_LIMITS = {'127.0.0.1:' + str(self.server.server_port): 1000}
+        program.FETCHER = None
+        self.use_warm_cache()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.all_box_office = program.get_box_office_tuples()
+            self.all_movies, self.movie_ids = program.get_detailed_information_tuples(self.all_box_office)
+
+    def use_warm_cache(self):
+        program.CACHE_DICT = cache_store.CacheStore(self.warm_cache)
+
+    def use_cold_cache(self, keep_pages=False):
+        ''' Points the program at a new, empty cache store (holding only the pages if keep_pages).
+        '''
+        self.cold_count += 1
+        store = cache_store.CacheStore(os.path.join(self.directory, 'cold_cache_' + str(self.cold_count) + '.sqlite'))
+        if keep_pages:
+            for interval, page in zip(cache_store.TIME_INTERVALS, self.pages):
+                store.set(cache_store.BOX_OFFICE_NAMESPACE, interval, page)
+        program.CACHE_DICT = store
+
+    def close(self):
+        self.server.shutdown()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+ENV = None
+
+@benchmark('parse get_information_from_box_office_website', 64)
+def parse_page(i):
+    program.get_information_from_box_office_website(ENV.pages[i % 16])
+
+@benchmark('ingest get_box_office_tuples (cached)', 5, setup=lambda: ENV.use_warm_cache())
+def box_office_tuples_warm(i):
+    program.get_box_office_tuples()
+
+@benchmark('ingest get_box_office_tuples (stub server)', 3, setup=lambda: ENV.use_cold_cache())
+def box_office_tuples_cold(i):
+    program.get_box_office_tuples()
+
+@benchmark('ingest get_detailed_information_tuples (cached)', 5, setup=lambda: ENV.use_warm_cache())
+def detailed_information_tuples_warm(i):
+    program.get_detailed_information_tuples(ENV.all_box_office)
+
+@benchmark('ingest get_detailed_information_tuples (stub server)', 3, setup=lambda: ENV.use_cold_cache(keep_pages=True))
+def detailed_information_tuples_cold(i):
+    program.get_detailed_information_tuples(ENV.all_box_office)
+
+@benchmark('load create_box_office_table', 5)
+def box_office_table(i):
+    program.create_box_office_table(ENV.all_box_office)
+
+@benchmark('load create_detailed_information_table', 5)
+def detailed_information_table(i):
+    program.create_detailed_information_table(ENV.all_movies, ENV.movie_ids)
+
+@benchmark('load export_snapshot', 5)
+def snapshot_export(i):
+    snapshot.export_snapshot(ENV.database, os.path.join(ENV.directory, 'Movies.npz'))
+
+@benchmark('load import_snapshot', 5)
+def snapshot_import(i):
+    snapshot.import_snapshot(os.path.join(ENV.directory, 'Movies.npz'), os.path.join(ENV.directory, 'Imported.sqlite'))
+
+@benchmark('query movie_box_office_search_time_interval', 500)
+def query_time_interval(i):
+    program.movie_box_office_search_time_interval(cache_store.TIME_INTERVALS[i % 16])
+
+@benchmark('query movie_detailed_search', 500)
+def query_movie_detail(i):
+    program.movie_detailed_search(str(i % 700 + 1))
+
+@benchmark('query movie_box_office_champions page', 500)
+def query_champions_page(i):
+    program.movie_box_office_champions(cache_store.TIME_INTERVALS[i % 16], interval_index.SORT_ORDERS[i % 2], 1970 + i % 30, 2000 + i % 20, i % 3 + 1)
+
+@benchmark('load interval_index', 20)
+def index_load(i):
+    interval_index.load_index(ENV.database)
+
+@benchmark('query get_results', 500)
+def query_results(i):
+    variables = program.COMPARISON_FORM['AllMovies'] + program.COMPARISON_FORM['Champions']
+    program.get_results('Champions', variables[i % 6], cache_store.TIME_INTERVALS[i % 16])
+
+@benchmark('query get_analytics', 500)
+def query_analytics(i):
+    analyses = list(program.ANALYSES)
+    program.get_analytics(analyses[i % 5], cache_store.TIME_INTERVALS[i % 16])
+
+@benchmark('query movie_search', 500)
+def query_search(i):
+    program.movie_search(['lion ki', 'spielberg', 'frozzen', 'avngers endgme', 'star wars'][i % 5])
+
+@benchmark('load movie_dataset', 20)
+def dataset_load(i):
+    movie_dataset.load_dataset(ENV.database)
+
+@benchmark('query movie_dataset rank', 500)
+def query_dataset_rank(i):
+    variables = list(program.movie_db.COMPARE_COLUMNS)
+    intervals = cache_store.TIME_INTERVALS + [None]
+    movie_dataset.get_dataset(ENV.database).rank(variables[i % 6], intervals[i % 17], limit=10)
+
+@benchmark('query movie_db search_ranking', 500)
+def query_sql_ranking(i):
+    variables = list(program.movie_db.COMPARE_COLUMNS)
+    intervals = cache_store.TIME_INTERVALS + [None]
+    program.movie_db.search_ranking(variables[i % 6], intervals[i % 17], limit=10, filename=ENV.database)
+
+def post_results(i):
+    with program.get_app().test_client() as client:
+        response = client.post('/results', data={'movies': 'Champions', 'interval': cache_store.TIME_INTERVALS[i % 16],
+                                                 'allmovies': 'NA', 'champions': 'gross'})
+    assert response.status_code == 200
+
+def get_movie(i):
+    with program.get_app().test_client() as client:
+        response = client.get('/movie/' + str(i % 700 + 1))
+    assert response.status_code == 200
+
+benchmark('render /results', 200, setup=lambda: program.RENDER_CACHE.clear())(post_results)
+benchmark('render /results (render cache)', 200)(post_results)
+benchmark('render /movie/<id>', 200, setup=lambda: program.RENDER_CACHE.clear())(get_movie)
+
+API = []
+
+def api_respond(i):
+    ## the work of one API request on a database worker, without the sockets (benchmarks/bench_api.py times those)
+    if len(API) == 0:
+        API.append(api_server.Api(ENV.database))
+    variables = list(program.movie_db.COMPARE_COLUMNS)
+    Paths = ['/api/comparison?interval=' + cache_store.TIME_INTERVALS[i % 16] + '&variable=' + variables[i % 6],
+             '/api/intervals/' + cache_store.TIME_INTERVALS[i % 16], '/api/movie/' + str(i % 700 + 1)]
+    status, Headers, body = API[0].respond('GET', Paths[i % 3], {})
+    assert status == 200
+
+benchmark('api respond', 500)(api_respond)
+
+def run_benchmark(function, iterations, setup):
+    ''' Runs one benchmark and returns its throughput, p50/p99 latency and peak memory.
+    Memory is traced in one extra iteration so tracing does not slow the timed ones.
+    '''
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(iterations):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            function(i)
+            latencies.append(time.perf_counter() - start)
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        function(iterations)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    ordered = sorted(latencies)
+    return {'throughput': iterations / sum(latencies),
+            'p50_ms': ordered[len(ordered) // 2] * 1000,
+            'p99_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            'peak_kb': peak / 1024}
+
+def calibrate():
+    ''' Times a fixed piece of pure Python work (building, sorting and hashing strings, filling a dict), the kind
+    of work the benchmarks do, to measure how fast this machine is right now.
+
+    Returns
+    -------
+    float
+        the median time of the work over CALIBRATION_ROUNDS rounds, in milliseconds
+    '''
+    times = []
+    for i in range(CALIBRATION_ROUNDS):
+        start = time.perf_counter()
+        Words = [str(j * 7919 % 10007) for j in range(20000)]
+        Counts = {}
+        for word in sorted(Words):
+            Counts[word] = Counts.get(word, 0) + len(word)
+        hashlib.sha1(''.join(Words).encode('utf-8')).hexdigest()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+def find_regressions(name, result, baseline, tolerance, speed=1.0):
+    ''' Compares the p50 latency and peak memory of a benchmark with its baseline.
+
+    Parameters
+    ----------
+    speed: float
+        the calibration time now divided by the calibration time of the baseline (e.g. 2.0 on a machine
+        twice as slow); baseline latencies are multiplied by it, memory is compared as it is
+
+    Returns
+    -------
+    list
+        a message for every metric more than `tolerance` (a fraction) worse than the baseline
+    '''
+    messages = []
+    if name not in baseline:
+        return messages
+    for metric in ['p50_ms', 'peak_kb']:
+        old = baseline[name][metric] * (speed if metric == 'p50_ms' else 1.0)
+        new = result[metric]
+        if new > old * (1 + tolerance) and new - old > NOISE_FLOOR[metric]:
+            messages.append('%s: %s %.2f -> %.2f (+%.0f%%)' % (name, metric, old, new, (new / old - 1) * 100))
+    return messages
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks of the ingest, parse, query and render paths.')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE_FILENAME, help='the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown as a fraction (default 0.5)')
+    parser.add_argument('--only', default='', help='only run benchmarks whose name contains this text')
+    args = parser.parse_args()
+
+    os.chdir(PROJECT_DIR)
+    calibration_ms = calibrate()
+    ENV = Environment()
+    baseline = {}
+    speed = 1.0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as baseline_file:
+            saved = json.load(baseline_file)
+        baseline = saved.get('benchmarks', {})
+        if 'calibration_ms' in saved:
+            speed = calibration_ms / saved['calibration_ms']
+    print('calibration loop: %.2f ms (%.2fx the baseline machine)' % (calibration_ms, speed))
+
+    results = {}
+    regressions = []
+    print('%-55s %10s %10s %10s %10s' % ('benchmark', 'ops/s', 'p50 ms', 'p99 ms', 'peak KB'))
+    try:
+        for name, function, iterations, setup in BENCHMARKS:
+            if args.only not in name:
+                continue
+            result = run_benchmark(function, iterations, setup)
+            results[name] = result
+            print('%-55s %10.1f %10.3f %10.3f %10.0f' % (name, result['throughput'], result['p50_ms'], result['p99_ms'], result['peak_kb']))
+            regressions.extend(find_regressions(name, result, baseline, args.tolerance, speed))
+    finally:
+        ENV.close()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'calibration_ms': calibration_ms, 'benchmarks': results}, baseline_file, indent=2, sort_keys=True)
+        print('Saved the baseline to ' + args.baseline)
+    elif regressions:
+        print()
+        print('Regressions against ' + args.baseline + ':')
+        for message in regressions:
+            print('  ' + message)
+        sys.exit(1)
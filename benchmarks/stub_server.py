@@ -0,0 +1,152 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## A local HTTP server standing in for Box Office Mojo and OMDB, answering from the entries of cache.json.
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+QUARTER_NAMES = {'q1': 'first quarter', 'q2': 'second quarter', 'q3': 'third quarter', 'q4': 'fourth quarter'}
+
+class StubServer(ThreadingHTTPServer):
+    '''a threaded HTTP server answering Box Office Mojo page urls (e.g. /quarter/q1/) with the cached html
+    and OMDB lookups (e.g. /?t=Captain+Marvel&y=2019, /?s=Captain+Marvel or /?i=tt4154664) with the cached json.
+
+    Instance Attributes
+    -------------------
+    cache_dict: dict
+        the entries of cache.json
+
+    delay: float
+        the number of seconds every answer is delayed, to imitate the network
+
+    request_count: int
+        the number of requests answered so far
+
+    bytes_sent: int
+        the number of body bytes answered so far
+
+    page_times: dict
+        the time each version of a page was first served, sent as its Last-Modified date
+
+    errors: list
+        the status codes (e.g. 503, 429) answered, one each, to the next requests before they are served again
+    '''
+    daemon_threads = True
+
+    def __init__(self, cache_dict, delay=0.0):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.cache_dict = cache_dict
+        self.delay = delay
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.page_times = {}
+        self.errors = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:' + str(self.server_port)
+
+    def answer_omdb(self, query):
+        ''' Answers an OMDB lookup by title (t=, with an optional y=), a search (s=) or a lookup by id (i=)
+        from the OMDB responses of cache.json.
+        '''
+        Records = [value for value in self.cache_dict.values() if isinstance(value, dict) and value.get('Response') == 'True']
+        if 'i' in query:
+            for record in Records:
+                if record.get('imdbID') == query['i'][0]:
+                    return record
+        elif 's' in query:
+            text = query['s'][0].casefold()
+            Results = [dict((field, record.get(field)) for field in ['Title', 'Year', 'imdbID', 'Type', 'Poster'])
+                       for record in Records if text in record.get('Title', '').casefold()]
+            if len(Results) > 0:
+                return {'Search': Results, 'totalResults': str(len(Results)), 'Response': 'True'}
+        else:
+            record = self.cache_dict.get(query.get('t', [''])[0])
+            if record is not None and ('y' not in query or record.get('Year', '').startswith(query['y'][0])):
+                return record
+        return {'Response': 'False', 'Error': 'Movie not found!'}
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.request_count += 1
+            status = self.server.errors.pop(0) if self.server.errors else None
+        if status is not None:
+            self.send_error(status)
+            return
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if len(parts) == 2 and parts[0] in ['quarter', 'month']:
+            key = QUARTER_NAMES.get(parts[1], parts[1])
+            if key not in self.server.cache_dict:
+                self.send_error(404)
+                return
+            body = self.server.cache_dict[key].encode('utf-8')
+            content_type = 'text/html; charset=utf-8'
+            ## pages carry an ETag (changing with their html) and a Last-Modified date, and a conditional
+            ## request for a page that did not change is answered 304 Not Modified, as Box Office Mojo does
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            with self.server.lock:
+                modified_at = int(self.server.page_times.setdefault((key, etag), time.time()))
+            last_modified = formatdate(modified_at, usegmt=True)
+            if self.is_not_modified(etag, modified_at):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                return
+        else:
+            response = self.server.answer_omdb(parse_qs(url.query))
+            body = json.dumps(response).encode('utf-8')
+            content_type = 'application/json'
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if content_type.startswith('text/html'):
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.bytes_sent += len(body)
+
+    def is_not_modified(self, etag, modified_at):
+        if self.headers.get('If-None-Match') is not None:
+            return self.headers['If-None-Match'] == etag
+        if self.headers.get('If-Modified-Since') is not None:
+            return parsedate_to_datetime(self.headers['If-Modified-Since']).timestamp() >= modified_at
+        return False
+
+def start_stub_server(cache_filename='cache.json', delay=0.0):
+    ''' Starts a stub server in a background thread.
+
+    Parameters
+    ----------
+    cache_filename: string
+        the path of the json cache whose entries are served
+    delay: float
+        the number of seconds every answer is delayed
+
+    Returns
+    -------
+    StubServer
+        the running server (its base_url is the url to point the program at)
+    '''
+    with open(cache_filename, 'r') as cache_file:
+        cache_dict = json.load(cache_file)
+    server = StubServer(cache_dict, delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,190 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+## the exact class attribute of the cells that hold each field of a table row
+TABLE_CLASS = 'a-section imdb-scroll-table-inner'
+YEAR_CLASS = 'a-text-left mojo-header-column mojo-truncate mojo-field-type-year mojo-sort-column'
+NAME_CLASS = 'a-text-left mojo-field-type-release mojo-cell-wide'
+MONEY_CLASS = 'a-text-right mojo-field-type-money'
+RELEASE_CLASS = 'a-text-right mojo-field-type-positive_integer'
+CELL_FIELDS = {YEAR_CLASS: 'year', NAME_CLASS: 'name', MONEY_CLASS: 'money', RELEASE_CLASS: 'release'}
+
+class BoxOfficeTableTarget:
+    '''a parser target that reads the table of a Box Office Mojo page in a single pass.
+    The parser calls start/end/data for every tag and piece of text, and one row record
+    is kept for every table row that has a year cell. Only the first table is read.
+
+    Instance Attributes
+    -------------------
+    rows: list
+        the (year, movie name, gross, release, cumulative gross, average gross) tuples of the rows read so far
+
+    depth: int
+        the number of divs open inside the table div (0 outside the table)
+
+    field: string
+        the field of the cell being read (e.g. 'year', 'money'), or None outside those cells
+    '''
+    def __init__(self):
+        self.rows = []
+        self.depth = 0
+        self.done = False
+        self.field = None
+        self.text = []
+        self.row = {}
+
+    def start(self, tag, attrib):
+        if self.done:
+            return
+        if tag == 'div':
+            if self.depth > 0:
+                self.depth += 1
+            elif attrib.get('class') == TABLE_CLASS:
+                self.depth = 1
+        elif self.depth > 0 and tag == 'tr':
+            self.row = {'money': []}
+        elif self.depth > 0 and tag == 'td':
+            self.field = CELL_FIELDS.get(attrib.get('class'))
+            self.text = []
+
+    def end(self, tag):
+        if self.done or self.depth == 0:
+            return
+        if tag == 'div':
+            self.depth -= 1
+            if self.depth == 0:
+                self.done = True
+        elif tag == 'td' and self.field is not None:
+            if self.field == 'money':
+                self.row['money'].append(''.join(self.text))
+            else:
+                self.row[self.field] = ''.join(self.text)
+            self.field = None
+        elif tag == 'tr' and 'year' in self.row:
+            money = self.row['money']
+            ## the money cells of a row are the cumulative gross, the average gross and the gross of the #1 release
+            self.rows.append((self.row['year'], self.row.get('name'), money[2], self.row.get('release'), money[0], money[1]))
+            self.row = {}
+
+    def data(self, data):
+        if self.field is not None:
+            self.text.append(data)
+
+    def close(self):
+        return self.rows
+
+def parse_box_office_rows_lxml(response):
+    ''' Reads the rows of a Box Office Mojo page with lxml's event parser, without building a tree.
+
+    Parameters
+    ----------
+    response: string
+        the html of a Box Office Mojo page
+
+    Returns
+    -------
+    list
+        a list of (year, movie name, gross, release, cumulative gross, average gross) tuples of strings
+        (e.g. [('2020', 'Bad Boys for Life', '$204,417,855', '246', '$1,789,195,274', '$7,273,151'), ......])
+    '''
+    parser = etree.HTMLParser(target=BoxOfficeTableTarget())
+    parser.feed(response)
+    return parser.close()
+
+def parse_box_office_rows_soup(response):
+    ''' Reads the rows of a Box Office Mojo page by building a BeautifulSoup tree.
+    This is the slower pure-Python parser, used when lxml is not installed.
+
+    Parameters
+    ----------
+    response: string
+        the html of a Box Office Mojo page
+
+    Returns
+    -------
+    list
+        a list of (year, movie name, gross, release, cumulative gross, average gross) tuples of strings
+    '''
+    ## bs4 is only imported when lxml is not installed (or by the benchmarks comparing the parsers)
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(response, 'html.parser')
+    SearchTable = soup.find('div', class_=TABLE_CLASS)
+    Movie_Year = [movie.text for movie in SearchTable.find_all('td', class_=YEAR_CLASS)]
+    Movie_Name = [movie.text for movie in SearchTable.find_all('td', class_=NAME_CLASS)]
+    All_Gross = [movie.text for movie in SearchTable.find_all('td', class_=MONEY_CLASS)]
+    Release = [movie.text for movie in SearchTable.find_all('td', class_=RELEASE_CLASS)]
+    Cumulative_G = All_Gross[0::3]
+    Average_G = All_Gross[1::3]
+    Gross = All_Gross[2::3]
+    return list(zip(Movie_Year, Movie_Name, Gross, Release, Cumulative_G, Average_G))
+
+def parse_box_office_rows(response):
+    ''' Reads the rows of a Box Office Mojo page, with lxml if it is installed
+    and with BeautifulSoup otherwise.
+
+    Parameters
+    ----------
+    response: string
+        the html of a Box Office Mojo page
+
+    Returns
+    -------
+    list
+        a list of (year, movie name, gross, release, cumulative gross, average gross) tuples of strings
+    '''
+    if etree is not None:
+        return parse_box_office_rows_lxml(response)
+    return parse_box_office_rows_soup(response)
+
+def parse_pages(Pages, workers=1, parser=parse_box_office_rows):
+    ''' Parses pages and yields their rows in the order of the pages. With more than one worker the pages
+    are parsed in a pool of processes, so parsing uses several cores: at most two pages per worker are
+    handed out ahead of the page being yielded, so pages are read as they are needed and the rows come
+    back in order however long each page takes.
+
+    Parameters
+    ----------
+    Pages: iterable
+        (key, html) tuples, where key is anything identifying the page (e.g. ('june', '<html>...'))
+    workers: int
+        the number of processes parsing pages (1 parses in this process)
+    parser: function
+        the function reading the rows of one page (a module-level function, so it can be sent to the processes)
+
+    Returns
+    -------
+    generator
+        (key, rows) tuples, where rows is the list the parser read from the page
+    '''
+    if workers <= 1:
+        for key, page in Pages:
+            with instrumentation.span('parse box office'):
+                Rows = parser(page)
+            yield key, Rows
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        Pending = deque()
+        for key, page in Pages:
+            Pending.append((key, executor.submit(parser, page)))
+            if len(Pending) >= 2 * workers:
+                key, future = Pending.popleft()
+                ## the time spent waiting for the processes
+                with instrumentation.span('parse box office'):
+                    Rows = future.result()
+                yield key, Rows
+        while len(Pending) > 0:
+            key, future = Pending.popleft()
+            with instrumentation.span('parse box office'):
+                Rows = future.result()
+            yield key, Rows
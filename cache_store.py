@@ -0,0 +1,397 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import json
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+CACHE_DB_FILENAME = "cache.sqlite"
+BOX_OFFICE_NAMESPACE = "box office"
+OMDB_NAMESPACE = "omdb"
+## the imdbID each (title, year) of the box office website resolved to
+OMDB_ID_NAMESPACE = "omdb id"
+
+## the keys of cache.json that hold the html of Box Office Mojo pages; every other key is an OMDB title
+TIME_INTERVALS = ['first quarter', 'second quarter', 'third quarter', 'fourth quarter',
+                  'january', 'february', 'march', 'april', 'may', 'june', 'july', 'august',
+                  'september', 'october', 'november', 'december']
+
+DAY = 24 * 60 * 60
+## payloads shorter than this many bytes are stored as they are even when compression is on
+COMPRESS_MIN_BYTES = 1024
+
+def is_omdb_failure(value):
+    ''' Checks whether an OMDB response is a failed lookup (e.g. {'Response': 'False', 'Error': 'Movie not found!'}).
+    '''
+    return isinstance(value, dict) and value.get('Response') == 'False'
+
+def is_unresolved(value):
+    ''' Checks whether a resolved id is a film OMDB has no record of (e.g. {'imdbID': None}).
+    '''
+    return isinstance(value, dict) and value.get('imdbID') is None
+
+class CachePolicy:
+    '''how long the entries of one namespace stay fresh
+
+    Instance Attributes
+    -------------------
+    ttl: float
+        the number of seconds an entry is used before it is fetched again (None to keep it forever)
+
+    negative_ttl: float
+        the number of seconds a failed lookup is used before it is tried again (e.g. one day)
+
+    is_negative: function
+        a function telling whether a value is a failed lookup, or None if the namespace has none
+
+    revalidate: bool
+        whether expired entries are kept (not removed by prune) so they can be revalidated with a
+        conditional request and renewed if they did not change
+    '''
+    def __init__(self, ttl=None, negative_ttl=None, is_negative=None, revalidate=False):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.is_negative = is_negative
+        self.revalidate = revalidate
+
+    def get_ttl(self, value):
+        if self.is_negative is not None and self.is_negative(value):
+            return self.negative_ttl
+        return self.ttl
+
+## Box Office Mojo tables change every week, OMDB details rarely, and a title OMDB did not find is tried again after a day;
+## the film a (title, year) resolved to never changes, so only an unresolved one is tried again.
+## An expired page is kept with its ETag and Last-Modified, so it is asked for again with a conditional request
+DEFAULT_POLICIES = {
+    BOX_OFFICE_NAMESPACE: CachePolicy(ttl=DAY, revalidate=True),
+    OMDB_NAMESPACE: CachePolicy(ttl=30 * DAY, negative_ttl=DAY, is_negative=is_omdb_failure),
+    OMDB_ID_NAMESPACE: CachePolicy(ttl=None, negative_ttl=DAY, is_negative=is_unresolved),
+}
+
+class CacheStore:
+    '''a key/value cache of scraped pages and OMDB responses kept in one SQLite file.
+    The file is opened once and each entry is looked up by its primary key, so a lookup
+    never parses the other entries. A new entry is written as its own row; the other
+    rows are only touched to record when they were last read.
+    Every entry expires after the ttl of the policy of its namespace, and when the payloads
+    take more than max_bytes the least recently used entries are removed. Payloads can be
+    stored compressed with zlib, and are only decompressed when they are read. Every entry can
+    also keep a small dict of metadata (e.g. the ETag of a page), read without its payload.
+
+    Instance Attributes
+    -------------------
+    filename: string
+        the path of the SQLite file (e.g. 'cache.sqlite')
+
+    connection: sqlite3.Connection
+        the connection shared by all lookups (guarded by a lock so fetch threads can write)
+
+    policies: dict
+        the CachePolicy of every namespace (namespaces without one never expire)
+
+    max_bytes: int
+        the maximum total size of the stored payloads, or None for no limit
+
+    compress: bool
+        whether new payloads are compressed
+
+    total_bytes: int
+        the total size of the stored payloads
+    '''
+    def __init__(self, filename=CACHE_DB_FILENAME, policies=None, max_bytes=None, compress=False):
+        self.filename = filename
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.lock = threading.Lock()
+        ## the last access time of the entries read since the last write, saved with the next write
+        self.accessed = {}
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''CREATE TABLE IF NOT EXISTS "Cache"(
+            namespace text NOT NULL,
+            key text NOT NULL,
+            value text NOT NULL,
+            PRIMARY KEY (namespace, key)) WITHOUT ROWID''')
+        self.upgrade()
+        self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM Cache').fetchone()[0]
+        self.connection.commit()
+
+    def upgrade(self):
+        ''' Adds the expiry, access time and size columns to a cache file written by the earlier version.
+        Its entries count as stored now.
+        '''
+        columns = [column[1] for column in self.connection.execute('PRAGMA table_info(Cache)').fetchall()]
+        if 'meta' not in columns:
+            self.connection.execute('ALTER TABLE Cache ADD COLUMN meta text')
+        if 'expires_at' not in columns:
+            self.connection.execute('ALTER TABLE Cache ADD COLUMN expires_at real')
+            self.connection.execute('ALTER TABLE Cache ADD COLUMN accessed_at real NOT NULL DEFAULT 0')
+            self.connection.execute('ALTER TABLE Cache ADD COLUMN size integer NOT NULL DEFAULT 0')
+            now = time.time()
+            Rows = []
+            for namespace, key, value in self.connection.execute('SELECT namespace, key, value FROM Cache').fetchall():
+                Rows.append((self.get_expiry(namespace, json.loads(value), now), now, len(value), namespace, key))
+            self.connection.executemany('UPDATE Cache SET expires_at = ?, accessed_at = ?, size = ? WHERE namespace = ? AND key = ?', Rows)
+        self.connection.execute('CREATE INDEX IF NOT EXISTS "Cache_accessed_at" ON Cache(accessed_at)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS "Cache_expires_at" ON Cache(expires_at)')
+
+    def get_expiry(self, namespace, value, now):
+        policy = self.policies.get(namespace)
+        if policy is None:
+            return None
+        ttl = policy.get_ttl(value)
+        if ttl is None:
+            return None
+        return now + ttl
+
+    def encode(self, value):
+        payload = json.dumps(value)
+        if self.compress and len(payload) >= COMPRESS_MIN_BYTES:
+            ## compressed payloads are stored as blobs, plain ones as text
+            return zlib.compress(payload.encode('utf-8'))
+        return payload
+
+    def decode(self, payload):
+        if isinstance(payload, bytes):
+            payload = zlib.decompress(payload).decode('utf-8')
+        return json.loads(payload)
+
+    def get(self, namespace, key, default=None, allow_expired=False):
+        ''' Looks up one entry of the cache. An expired entry counts as not cached, unless allow_expired.
+
+        Parameters
+        ----------
+        namespace: string
+            the kind of entry (BOX_OFFICE_NAMESPACE, OMDB_NAMESPACE or OMDB_ID_NAMESPACE)
+        key: string
+            a time interval (e.g. 'first quarter'), an imdbID (e.g. 'tt1502397'), a movie title
+            (e.g. 'Bad Boys for Life') or a title and year (e.g. 'Bad Boys for Life|2020')
+        default: any
+            the value returned when the key is not cached
+        allow_expired: bool
+            whether an expired entry that is still stored is returned (e.g. a page kept to be revalidated)
+
+        Returns
+        -------
+        the cached value (a string of html or a dict of OMDB json), or default
+        '''
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute('SELECT value, expires_at FROM Cache WHERE namespace = ? AND key = ?',
+                                          (namespace, key)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now and not allow_expired):
+                return default
+            self.accessed[(namespace, key)] = now
+        return self.decode(row[0])
+
+    def get_meta(self, namespace, key):
+        ''' Reads the metadata of one entry without reading its payload.
+
+        Parameters
+        ----------
+        namespace: string
+            the kind of entry (e.g. BOX_OFFICE_NAMESPACE)
+        key: string
+            a time interval (e.g. 'june')
+
+        Returns
+        -------
+        tuple
+            (the metadata, or {} if the entry has none, whether the entry has not expired),
+            or None if the entry is not stored (e.g. ({'ETag': '"5f2b..."', 'hash': '9f86d0...'}, False))
+        '''
+        with self.lock:
+            row = self.connection.execute('SELECT meta, expires_at FROM Cache WHERE namespace = ? AND key = ?',
+                                          (namespace, key)).fetchone()
+        if row is None:
+            return None
+        meta = {} if row[0] is None else json.loads(row[0])
+        return meta, row[1] is None or row[1] > time.time()
+
+    def refresh(self, namespace, key, meta=None):
+        ''' Renews the expiry of one entry whose source did not change (e.g. after a 304 Not Modified),
+        without rewriting its payload.
+
+        Parameters
+        ----------
+        namespace: string
+            the kind of entry (e.g. BOX_OFFICE_NAMESPACE)
+        key: string
+            a time interval (e.g. 'june')
+        meta: dict
+            the new metadata of the entry, or None to keep it
+
+        Returns
+        -------
+        None
+        '''
+        now = time.time()
+        with self.lock:
+            self.connection.execute('UPDATE Cache SET expires_at = ?, accessed_at = ?, meta = COALESCE(?, meta) WHERE namespace = ? AND key = ?',
+                                    (self.get_expiry(namespace, None, now), now, None if meta is None else json.dumps(meta), namespace, key))
+            self.connection.commit()
+
+    def contains(self, namespace, key):
+        ''' Checks whether one entry is cached and has not expired.
+
+        Parameters
+        ----------
+        namespace: string
+            the kind of entry (BOX_OFFICE_NAMESPACE or OMDB_NAMESPACE)
+        key: string
+            a time interval or a movie title
+
+        Returns
+        -------
+        bool
+            True if the entry is cached
+        '''
+        with self.lock:
+            row = self.connection.execute('SELECT 1 FROM Cache WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                                          (namespace, key, time.time())).fetchone()
+        return row is not None
+
+    def set(self, namespace, key, value, meta=None):
+        ''' Writes one entry to the cache. Only the row of this key is written, then the least recently
+        used entries are removed if the cache is larger than max_bytes.
+
+        Parameters
+        ----------
+        namespace: string
+            the kind of entry (BOX_OFFICE_NAMESPACE or OMDB_NAMESPACE)
+        key: string
+            a time interval or a movie title
+        value: string or dict
+            the html of a page or the json of an OMDB response
+        meta: dict
+            the metadata of the entry (e.g. {'ETag': '"5f2b..."', 'Last-Modified': '...', 'hash': '9f86d0...'}), or None
+
+        Returns
+        -------
+        None
+        '''
+        self.set_many([(namespace, key, value, meta)])
+
+    def set_many(self, Entries):
+        ''' Writes several entries to the cache in one transaction.
+
+        Parameters
+        ----------
+        Entries: list
+            a list of (namespace, key, value) or (namespace, key, value, meta) tuples
+
+        Returns
+        -------
+        None
+        '''
+        now = time.time()
+        Rows = []
+        for entry in Entries:
+            namespace, key, value = entry[:3]
+            meta = entry[3] if len(entry) > 3 and entry[3] is not None else None
+            payload = self.encode(value)
+            Rows.append((namespace, key, payload, self.get_expiry(namespace, value, now), now, len(payload),
+                         None if meta is None else json.dumps(meta)))
+        with self.lock:
+            c = self.connection.cursor()
+            for row in Rows:
+                old = c.execute('SELECT size FROM Cache WHERE namespace = ? AND key = ?', row[:2]).fetchone()
+                if old is not None:
+                    self.total_bytes -= old[0]
+                c.execute('INSERT OR REPLACE INTO Cache (namespace, key, value, expires_at, accessed_at, size, meta) VALUES (?,?,?,?,?,?,?)', row)
+                self.total_bytes += row[5]
+            self.save_accessed(c)
+            self.evict(c)
+            self.connection.commit()
+
+    def save_accessed(self, c):
+        c.executemany('UPDATE Cache SET accessed_at = ? WHERE namespace = ? AND key = ?',
+                      [(accessed_at, namespace, key) for (namespace, key), accessed_at in self.accessed.items()])
+        self.accessed.clear()
+
+    def evict(self, c):
+        ''' Removes the least recently used entries until the payloads fit in max_bytes. The lock must be held.
+        '''
+        if self.max_bytes is None or self.total_bytes <= self.max_bytes:
+            return
+        for namespace, key, size in c.execute('SELECT namespace, key, size FROM Cache ORDER BY accessed_at').fetchall():
+            if self.total_bytes <= self.max_bytes:
+                break
+            c.execute('DELETE FROM Cache WHERE namespace = ? AND key = ?', (namespace, key))
+            self.total_bytes -= size
+        ## give the freed pages back to the file system
+        c.execute('PRAGMA incremental_vacuum').fetchall()
+
+    def prune(self):
+        ''' Removes the expired entries, except those of the namespaces whose policy revalidates them.
+
+        Returns
+        -------
+        int
+            the number of removed entries
+        '''
+        with self.lock:
+            c = self.connection.cursor()
+            self.save_accessed(c)
+            Kept = [namespace for namespace, policy in self.policies.items() if policy.revalidate]
+            c.execute('DELETE FROM Cache WHERE expires_at <= ? AND namespace NOT IN (' + ','.join('?' * len(Kept)) + ')',
+                      [time.time()] + Kept)
+            removed = c.rowcount
+            self.total_bytes = c.execute('SELECT COALESCE(SUM(size), 0) FROM Cache').fetchone()[0]
+            c.execute('PRAGMA incremental_vacuum').fetchall()
+            self.connection.commit()
+        return removed
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM Cache').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.save_accessed(self.connection.cursor())
+            self.connection.commit()
+            self.connection.close()
+
+def migrate_json_cache(json_filename, store):
+    ''' Copies every entry of an old cache.json into the cache store in one transaction.
+    The html of Box Office Mojo pages is kept under time interval keys (e.g. 'first quarter')
+    and the OMDB json is kept under movie titles.
+
+    Parameters
+    ----------
+    json_filename: string
+        the path of the old cache file (e.g. 'cache.json')
+    store: CacheStore
+        the cache store to fill
+
+    Returns
+    -------
+    int
+        the number of migrated entries
+    '''
+    with open(json_filename, 'r') as cache_file:
+        cache_dict = json.load(cache_file)
+    Entries = []
+    for key, value in cache_dict.items():
+        if key in TIME_INTERVALS:
+            namespace = BOX_OFFICE_NAMESPACE
+        else:
+            namespace = OMDB_NAMESPACE
+        Entries.append((namespace, key, value))
+    store.set_many(Entries)
+    return len(Entries)
+
+if __name__ == "__main__":
+    ## one-shot migration: python cache_store.py [cache.json] [cache.sqlite]
+    json_filename = sys.argv[1] if len(sys.argv) > 1 else "cache.json"
+    db_filename = sys.argv[2] if len(sys.argv) > 2 else CACHE_DB_FILENAME
+    store = CacheStore(db_filename)
+    print("Migrated " + str(migrate_json_cache(json_filename, store)) + " entries into " + db_filename)
+    store.close()
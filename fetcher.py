@@ -0,0 +1,189 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentation
+
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+class HostRateLimiter:
+    '''spaces out the requests sent to one host so that at most `rate` requests start per second
+
+    Instance Attributes
+    -------------------
+    interval: float
+        the number of seconds between two requests to the host (e.g. 0.5 for 2 requests per second)
+
+    next_time: float
+        the earliest time.monotonic() at which the next request may start
+    '''
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class Fetcher:
+    '''a bounded pool of threads sharing one connection-pooled requests.Session.
+    Requests are spaced out per host, retried with exponential backoff, and a request
+    submitted under a key that is already being fetched shares the running request.
+
+    Instance Attributes
+    -------------------
+    session: requests.Session
+        the session whose connection pool is shared by all threads
+
+    executor: ThreadPoolExecutor
+        the pool of at most max_workers threads doing the requests
+
+    rate_limits: dict
+        the maximum number of requests per second for each host (e.g. {'www.omdbapi.com': 10})
+
+    max_retries: int
+        the number of times a failed request is retried
+
+    backoff: float
+        the number of seconds to wait before the first retry, doubled for each later retry
+    '''
+    def __init__(self, max_workers=8, rate_limits=None, max_retries=3, backoff=0.5, timeout=30):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.rate_limits = rate_limits or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiters = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+
+    def limiter(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.limiters:
+                self.limiters[host] = HostRateLimiter(self.rate_limits.get(host, 1000))
+            return self.limiters[host]
+
+    def get(self, url, params=None, auth=None, headers=None):
+        ''' Sends one GET request, retrying connection errors and 429/5xx responses with backoff.
+        Any other response but 200 OK (or 304 Not Modified) raises requests.HTTPError.
+
+        Parameters
+        ----------
+        url: string
+            the url to fetch
+        params: dict
+            the query parameters of the request
+        auth: requests auth object
+            the authentication of the request (e.g. OAuth1)
+        headers: dict
+            extra headers of the request (e.g. {'If-None-Match': '"5f2b..."'} to revalidate a cached page)
+
+        Returns
+        -------
+        requests.Response
+            the successful response (a 304 Not Modified answer to a conditional request counts as one)
+        '''
+        limiter = self.limiter(url)
+        attempt = 0
+        while True:
+            limiter.wait()
+            try:
+                response = self.session.get(url, params=params, auth=auth, headers=headers, timeout=self.timeout)
+                instrumentation.count('requests sent')
+                instrumentation.count('bytes fetched', len(response.content))
+                if response.status_code not in RETRY_STATUS_CODES:
+                    ## any other error (e.g. 403, 404 or 410) is not retried, and is never taken for a page
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(str(response.status_code) + ' from ' + url, response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt >= self.max_retries:
+                raise error
+            instrumentation.count('requests retried')
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt = attempt + 1
+
+    def submit(self, key, url, params=None, auth=None, as_json=False):
+        ''' Schedules one GET request on the thread pool. If a request with the same key is
+        still running, its future is returned instead of sending a second request.
+
+        Parameters
+        ----------
+        key: string
+            the key identifying the request (e.g. a movie title)
+        url: string
+            the url to fetch
+        params: dict
+            the query parameters of the request
+        auth: requests auth object
+            the authentication of the request
+        as_json: bool
+            whether the future resolves to the decoded json instead of the text of the response
+
+        Returns
+        -------
+        concurrent.futures.Future
+            the future of the response text or json
+        '''
+        return self.call(key, self.fetch, url, params, auth, as_json)
+
+    def call(self, key, function, *args):
+        ''' Schedules a function doing one or several requests on the thread pool (e.g. a lookup that
+        falls back to a search). If a call with the same key is still running, its future is returned.
+
+        Parameters
+        ----------
+        key: string
+            the key identifying the call
+        function: function
+            the function to call
+        args: any
+            the arguments of the function
+
+        Returns
+        -------
+        concurrent.futures.Future
+            the future of the function's result
+        '''
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+            future = self.executor.submit(function, *args)
+            self.in_flight[key] = future
+        future.add_done_callback(lambda f: self.forget(key, f))
+        return future
+
+    def fetch(self, url, params, auth, as_json):
+        response = self.get(url, params=params, auth=auth)
+        if as_json:
+            return response.json()
+        return response.text
+
+    def forget(self, key, future):
+        with self.lock:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,249 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Opt-in timing spans and counters for the stages of the program (cache load, page parse,
+## OMDB resolution, table writes, queries, page renders and routes), and switches to profile one run.
+## Nothing is recorded until enable() is called, so the stages cost one flag check when it is off.
+import atexit
+import cProfile
+import functools
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+ENABLED = False
+LOG_FILE = None
+LOG_LOCK = threading.Lock()
+
+class Metrics:
+    '''the counters and span timings recorded since the program started
+
+    Instance Attributes
+    -------------------
+    counters: Counter
+        the value of every counter (e.g. {'cache hits: omdb': 575, 'bytes fetched': 4823111})
+
+    spans: dict
+        the number of calls, total and longest time in milliseconds of every span
+        (e.g. {'parse box office': {'count': 16, 'total_ms': 39.1, 'max_ms': 4.2}})
+    '''
+    def __init__(self):
+        self.counters = Counter()
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def record(self, name, milliseconds):
+        with self.lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            span['count'] += 1
+            span['total_ms'] += milliseconds
+            span['max_ms'] = max(span['max_ms'], milliseconds)
+
+    def snapshot(self):
+        ''' Returns a copy of the counters and spans that can be dumped to json.
+        '''
+        with self.lock:
+            return {'enabled': ENABLED, 'counters': dict(self.counters),
+                    'spans': {name: dict(span) for name, span in self.spans.items()}}
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.spans.clear()
+
+METRICS = Metrics()
+
+def enable(log_filename=None):
+    ''' Starts recording spans and counters. If log_filename is given, every span is also
+    written to it as one json object per line, and the final metrics are written at exit.
+
+    Parameters
+    ----------
+    log_filename: string
+        the path of the json log (e.g. 'metrics.log'), or None for no log
+
+    Returns
+    -------
+    None
+    '''
+    global ENABLED, LOG_FILE
+    ENABLED = True
+    if log_filename is not None and LOG_FILE is None:
+        LOG_FILE = open(log_filename, 'a')
+        atexit.register(close_log)
+
+def log_event(event):
+    ''' Writes one event to the json log, if there is one.
+    '''
+    if LOG_FILE is None:
+        return
+    event['time'] = time.time()
+    line = json.dumps(event)
+    with LOG_LOCK:
+        LOG_FILE.write(line + '\n')
+
+def close_log():
+    global LOG_FILE
+    log_event({'event': 'metrics', 'metrics': METRICS.snapshot()})
+    with LOG_LOCK:
+        LOG_FILE.close()
+        LOG_FILE = None
+
+def count(name, amount=1):
+    ''' Adds amount to a counter (e.g. count('bytes fetched', 5120)), if instrumentation is on.
+    '''
+    if ENABLED:
+        METRICS.count(name, amount)
+
+@contextmanager
+def span(name, **fields):
+    ''' Times the code inside the with block as one call of the span `name`.
+    Extra keyword fields are added to the json log line (e.g. span('parse box office', interval='june')).
+    '''
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        milliseconds = (time.perf_counter() - start) * 1000
+        METRICS.record(name, milliseconds)
+        if LOG_FILE is not None:
+            fields.update({'event': 'span', 'name': name, 'ms': round(milliseconds, 3)})
+            log_event(fields)
+
+def timed(name):
+    ''' Decorator timing every call of a function as the span `name`.
+    '''
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def instrument_app(app):
+    ''' Times every request of a Flask app as the span 'route <endpoint>' and counts the responses by status.
+
+    Parameters
+    ----------
+    app: Flask
+        the website
+
+    Returns
+    -------
+    None
+    '''
+    from flask import g, request
+
+    @app.before_request
+    def start_request_span():
+        if ENABLED:
+            g.instrumentation_start = time.perf_counter()
+
+    @app.after_request
+    def end_request_span(response):
+        start = g.pop('instrumentation_start', None)
+        if start is not None:
+            milliseconds = (time.perf_counter() - start) * 1000
+            name = 'route ' + str(request.endpoint)
+            METRICS.record(name, milliseconds)
+            METRICS.count('responses ' + str(response.status_code))
+            if LOG_FILE is not None:
+                log_event({'event': 'span', 'name': name, 'ms': round(milliseconds, 3),
+                           'path': request.path, 'status': response.status_code})
+        return response
+
+class SamplingProfiler:
+    '''a profiler that looks at the stack of every thread every `interval` seconds from a background thread.
+    It slows the program down much less than cProfile, and writes the stacks in the collapsed format
+    read by flame graph tools (one 'outer;inner;innermost count' line per stack).
+
+    Instance Attributes
+    -------------------
+    interval: float
+        the number of seconds between two samples (e.g. 0.005)
+
+    stacks: Counter
+        the number of samples of every collapsed stack
+    '''
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        own_id = threading.get_ident()
+        while self.running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                Names = []
+                while frame is not None:
+                    code = frame.f_code
+                    Names.append(code.co_name + ' (' + code.co_filename + ':' + str(code.co_firstlineno) + ')')
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(Names))] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def dump(self, filename):
+        with open(filename, 'w') as profile_file:
+            for stack, samples in self.stacks.most_common():
+                profile_file.write(stack + ' ' + str(samples) + '\n')
+
+def profile_run(filename, sampling=False):
+    ''' Profiles the rest of the run and writes the profile to filename when the program exits:
+    cProfile stats (read them with python -m pstats) or, with sampling, collapsed stacks.
+
+    Parameters
+    ----------
+    filename: string
+        the path of the profile (e.g. 'run.prof')
+    sampling: bool
+        whether to use the sampling profiler instead of cProfile
+
+    Returns
+    -------
+    None
+    '''
+    if sampling:
+        profiler = SamplingProfiler()
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    def write_profile():
+        if sampling:
+            profiler.stop()
+            profiler.dump(filename)
+        else:
+            profiler.disable()
+            profiler.dump_stats(filename)
+        print('Wrote the profile to ' + filename)
+
+    atexit.register(write_profile)
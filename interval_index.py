@@ -0,0 +1,147 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## A read-only, in-memory index of the box office champions of every time interval and of the details
+## of their movies, for browsing: the champions of a time interval are kept latest year first and by
+## gross, so a page of them, sorted and limited to some years, is a slice of a list instead of a query,
+## and the details of a movie are one dict lookup. It needs nothing but Python, so the command line
+## program uses it too.
+import bisect
+
+import movie_db
+
+## the orders the champions can be sorted in
+SORT_ORDERS = ['year', 'gross']
+
+CHAMPIONS_QUERY = '''SELECT MovieYear, TimeInterval, MovieName, Gross, id FROM BoxOffice
+    ORDER BY TimeInterval, MovieYear DESC'''
+
+DETAILS_QUERY = '''SELECT BoxOffice.id, MovieName, ReleaseDate, runtime, genre, director,
+    Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
+    FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id'''
+
+class IntervalIndex:
+    '''the box office champions of every time interval and the details of their movies
+
+    Instance Attributes
+    -------------------
+    intervals: dict
+        the (year, time interval, movie name, gross, id) tuples of every time interval, latest year first
+        (e.g. {'june': [(2020, 'june', 'Becky', 878305, 400), ...]})
+
+    years: dict
+        the years of every time interval as negative numbers, in the order of intervals, for bisect
+
+    by_gross: dict
+        the same tuples of every time interval, highest gross first (the latest year first for the same gross)
+
+    details: dict
+        the detail row of every box office id, as movie_db.search_movie_detail returns it
+        (e.g. {1: (1, 'Bad Boys for Life', '17 Jan 2020', 124, 'Action, Comedy, Crime, Thriller', 'Adil El Arbi, Bilall Fallah', 66.0, 77.0, 59.0)})
+    '''
+    def __init__(self, Champions, Details):
+        self.intervals = {}
+        for m in Champions:
+            self.intervals.setdefault(m[1], []).append(m)
+        self.years = {}
+        self.by_gross = {}
+        for time_interval, Rows in self.intervals.items():
+            self.years[time_interval] = [-m[0] for m in Rows]
+            ## a stable sort keeps the latest year first among equal grosses
+            self.by_gross[time_interval] = sorted(Rows, key=lambda m: -1 if m[3] is None else m[3], reverse=True)
+        self.details = {m[0]: m for m in Details}
+
+    def search_time_interval(self, time_interval):
+        ''' Returns the box office champions of one time interval, latest year first,
+        as movie_db.search_time_interval does.
+
+        Returns
+        -------
+        list
+            a list of (year, time interval, movie name, gross, id) tuples
+        '''
+        return list(self.intervals.get(time_interval, []))
+
+    def search_movie_detail(self, movie_id):
+        ''' Returns the details of the movie of one box office row, as movie_db.search_movie_detail does.
+
+        Returns
+        -------
+        list
+            a list with the detail tuple of the movie, or an empty list if there is no such movie
+        '''
+        movie = self.details.get(int(movie_id))
+        return [] if movie is None else [movie]
+
+    def get_champions(self, time_interval, sort_by='year', descending=True, first_year=None, last_year=None, page=1, page_size=None):
+        ''' Returns one page of the box office champions of a time interval, sorted and limited to some years.
+
+        Parameters
+        ----------
+        time_interval: string
+            a time interval (e.g. 'june')
+        sort_by: string
+            one of SORT_ORDERS: 'year' or 'gross'
+        descending: bool
+            whether the latest year or the highest gross comes first
+        first_year: int
+            the first year of the champions, or None
+        last_year: int
+            the last year of the champions, or None
+        page: int
+            the number of the page, from 1
+        page_size: int
+            the number of champions of a page, or None for all of them on one page
+
+        Returns
+        -------
+        tuple
+            (list of (year, time interval, movie name, gross, id) tuples of the page,
+            the number of champions of all pages)
+        '''
+        if sort_by not in SORT_ORDERS:
+            raise ValueError('Unknown order: ' + str(sort_by))
+        if page < 1 or (page_size is not None and page_size < 1):
+            raise ValueError('Pages and page sizes start from 1')
+        Rows = self.intervals.get(time_interval, [])
+        if sort_by == 'year':
+            ## the years are in order, so the champions of some years are one slice
+            Years = self.years.get(time_interval, [])
+            start = 0 if last_year is None else bisect.bisect_left(Years, -last_year)
+            stop = len(Rows) if first_year is None else bisect.bisect_right(Years, -first_year)
+            Rows = Rows[start:stop]
+        else:
+            Rows = self.by_gross.get(time_interval, [])
+            if first_year is not None or last_year is not None:
+                Rows = [m for m in Rows if (first_year is None or m[0] >= first_year) and (last_year is None or m[0] <= last_year)]
+        if not descending:
+            Rows = Rows[::-1]
+        if page_size is None:
+            return list(Rows), len(Rows)
+        start = (page - 1) * page_size
+        return Rows[start:start + page_size], len(Rows)
+
+def load_index(filename=movie_db.DB_FILENAME):
+    ''' Reads the box office champions and the details of their movies from a database into an IntervalIndex.
+
+    Parameters
+    ----------
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    IntervalIndex
+        the index
+    '''
+    connection = movie_db.get_connection(filename)
+    return IntervalIndex(connection.execute(CHAMPIONS_QUERY).fetchall(), connection.execute(DETAILS_QUERY).fetchall())
+
+## the index of every database, loaded again when its version changes
+INDEXES = movie_db.VersionedLoader(load_index)
+
+def get_index(filename=movie_db.DB_FILENAME):
+    ''' Returns the index of a database, loaded once and again whenever its version changes.
+    '''
+    return INDEXES.get(filename)
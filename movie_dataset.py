@@ -0,0 +1,235 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## An in-memory, column by column copy of the box office rows joined with their films, for
+## comparing and ranking many movies at once. Each column is one NumPy array, the rows are sorted
+## by time interval and latest year first, so the rows of a time interval are one slice and a
+## comparison is a slice, a mask and (for a ranking) one argsort instead of a query.
+import movie_db
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+## the columns of the dataset and their type: 'int' (int64), 'float' (float64) or 'text' (Python strings)
+COLUMNS = [
+    ('id', 'int'), ('MovieYear', 'int'), ('TimeInterval', 'text'), ('MovieName', 'text'),
+    ('Gross', 'int'), ('Release', 'int'), ('CumulativeGross', 'int'), ('AverageGross', 'int'),
+    ('MovieId', 'int'), ('title', 'text'), ('ReleaseDate', 'text'), ('runtime', 'int'), ('genre', 'text'), ('director', 'text'),
+    ('Internet_Movie_rating', 'float'), ('Rotten_Tomatoes_rating', 'float'), ('Metacritic_rating', 'float'),
+]
+
+DATASET_QUERY = '''SELECT BoxOffice.id, MovieYear, TimeInterval, MovieName, Gross, Release, CumulativeGross, AverageGross,
+    MovieId, title, ReleaseDate, runtime, genre, director, Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
+    FROM BoxOffice LEFT JOIN Movie ON BoxOffice.MovieId = Movie.id ORDER BY TimeInterval, MovieYear DESC'''
+
+def is_available():
+    ''' Checks whether NumPy is installed (without it the program queries SQLite instead).
+    '''
+    return np is not None
+
+def make_column(values, kind, portable=False):
+    ''' Makes the array of one column and the mask of its missing values.
+
+    Parameters
+    ----------
+    values: tuple
+        the values of the column, None for NULL
+    kind: string
+        'int', 'float' or 'text'
+    portable: bool
+        whether text is kept in a NumPy string array ('' for NULL), which a snapshot can save
+        without pickling (see snapshot.py), instead of an array of Python strings
+
+    Returns
+    -------
+    tuple
+        (array, mask), where mask is a boolean array that is True for the NULL values,
+        or None if the column has none
+    '''
+    nulls = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    if kind == 'text' and portable:
+        array = np.array(['' if value is None else str(value) for value in values], dtype=str)
+    elif kind == 'text':
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+    elif kind == 'float':
+        array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    else:
+        array = np.array([0 if value is None else value for value in values], dtype=np.int64)
+    if not nulls.any():
+        nulls = None
+    return array, nulls
+
+class MovieDataset:
+    '''the box office rows joined with their films, one NumPy array per column
+
+    Instance Attributes
+    -------------------
+    columns: dict
+        the array of every column of COLUMNS, in the order of the time interval, then the latest year first
+
+    nulls: dict
+        the mask of the NULL values of every column that has some (e.g. MovieId of the rows not found on OMDB)
+
+    intervals: dict
+        the (start, stop) slice of the rows of every time interval (e.g. {'june': (416, 460)})
+    '''
+    def __init__(self, Rows):
+        self.columns = {}
+        self.nulls = {}
+        Values = list(zip(*Rows)) if len(Rows) > 0 else [()] * len(COLUMNS)
+        for (name, kind), values in zip(COLUMNS, Values):
+            self.columns[name], nulls = make_column(values, kind)
+            if nulls is not None:
+                self.nulls[name] = nulls
+        ## the rows are sorted by time interval, so each time interval starts where its name first appears
+        self.intervals = {}
+        Names = self.columns['TimeInterval']
+        if len(Names) > 0:
+            Starts = np.flatnonzero(np.concatenate(([True], Names[1:] != Names[:-1])))
+            Stops = np.append(Starts[1:], len(Names))
+            for start, stop in zip(Starts.tolist(), Stops.tolist()):
+                self.intervals[Names[start]] = (start, stop)
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def get_rows(self, time_interval):
+        ''' Returns the positions of the rows of a time interval, latest year first.
+        '''
+        start, stop = self.intervals.get(time_interval, (0, 0))
+        return np.arange(start, stop)
+
+    def get_values(self, name, Rows):
+        ''' Reads one column at some positions as a list of Python values, with None for NULL.
+
+        Parameters
+        ----------
+        name: string
+            the name of the column (e.g. 'Gross')
+        Rows: numpy.ndarray
+            the positions of the rows
+
+        Returns
+        -------
+        list
+            the values (e.g. [858373000, 623357910])
+        '''
+        values = self.columns[name][Rows]
+        nulls = self.nulls.get(name)
+        if nulls is None or not nulls[Rows].any():
+            return values.tolist()
+        values = values.astype(object)
+        values[nulls[Rows]] = None
+        return values.tolist()
+
+    def get_tuples(self, names, Rows):
+        ''' Reads some columns at some positions as a list of row tuples.
+        '''
+        return list(zip(*[self.get_values(name, Rows) for name in names]))
+
+    def has_movie(self, Rows):
+        ''' Returns the mask of the rows that are linked to a film.
+        '''
+        nulls = self.nulls.get('MovieId')
+        if nulls is None:
+            return np.ones(len(Rows), dtype=bool)
+        return ~nulls[Rows]
+
+    def search_time_interval(self, time_interval):
+        ''' Returns the box office champions of one time interval, latest year first,
+        as movie_db.search_time_interval does.
+
+        Returns
+        -------
+        list
+            a list of (year, time interval, movie name, gross, id) tuples
+        '''
+        return self.get_tuples(['MovieYear', 'TimeInterval', 'MovieName', 'Gross', 'id'], self.get_rows(time_interval))
+
+    def search_comparison(self, compare_variable, time_interval):
+        ''' Returns one variable of the box office champions of one time interval, latest year first,
+        as movie_db.search_comparison does.
+
+        Returns
+        -------
+        list
+            a list of (year, value, movie name) tuples
+        '''
+        if compare_variable not in movie_db.COMPARE_COLUMNS:
+            raise ValueError('Unknown variable to compare: ' + str(compare_variable))
+        Rows = self.get_rows(time_interval)
+        Rows = Rows[self.has_movie(Rows)]
+        return self.get_tuples(['MovieYear', movie_db.COMPARE_COLUMNS[compare_variable], 'MovieName'], Rows)
+
+    def rank(self, compare_variable, time_interval=None, first_year=None, last_year=None, limit=None, ascending=False):
+        ''' Ranks box office champions by one variable, highest first. Movies without a value are left out.
+
+        Parameters
+        ----------
+        compare_variable: string
+            a key of movie_db.COMPARE_COLUMNS (e.g. 'IMDB rating')
+        time_interval: string
+            a time interval (e.g. 'june'), or None for every time interval
+        first_year: int
+            the first year of the champions, or None
+        last_year: int
+            the last year of the champions, or None
+        limit: int
+            the maximum number of champions, or None for all
+        ascending: bool
+            whether the lowest value comes first
+
+        Returns
+        -------
+        list
+            a list of (id, year, time interval, movie name, value) tuples
+        '''
+        if compare_variable not in movie_db.COMPARE_COLUMNS:
+            raise ValueError('Unknown variable to compare: ' + str(compare_variable))
+        column = movie_db.COMPARE_COLUMNS[compare_variable]
+        if time_interval is None:
+            Rows = np.arange(len(self))
+        else:
+            Rows = self.get_rows(time_interval)
+        Mask = self.has_movie(Rows)
+        if column in self.nulls:
+            Mask &= ~self.nulls[column][Rows]
+        Years = self.columns['MovieYear'][Rows]
+        if first_year is not None:
+            Mask &= Years >= first_year
+        if last_year is not None:
+            Mask &= Years <= last_year
+        Rows = Rows[Mask]
+        Values = self.columns[column][Rows]
+        ## a stable sort keeps the latest year first among equal values
+        Order = np.argsort(Values if ascending else -Values, kind='stable')
+        Rows = Rows[Order[:limit]]
+        return self.get_tuples(['id', 'MovieYear', 'TimeInterval', 'MovieName', column], Rows)
+
+def load_dataset(filename=movie_db.DB_FILENAME):
+    ''' Reads the box office rows and their films from a database into a MovieDataset.
+
+    Parameters
+    ----------
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    MovieDataset
+        the dataset
+    '''
+    connection = movie_db.get_connection(filename)
+    return MovieDataset(connection.execute(DATASET_QUERY).fetchall())
+
+## the dataset of every database, loaded again when its version changes
+DATASETS = movie_db.VersionedLoader(load_dataset)
+
+def get_dataset(filename=movie_db.DB_FILENAME):
+    ''' Returns the dataset of a database, loaded once and again whenever its version changes.
+    '''
+    return DATASETS.get(filename)
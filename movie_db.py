@@ -0,0 +1,680 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import math
+import os
+import re
+import sqlite3
+import threading
+
+DB_FILENAME = "Movies.sqlite"
+
+## the variables of the comparison form and the columns they compare
+COMPARE_COLUMNS = {
+    'cumulative gross': 'CumulativeGross',
+    'average gross': 'AverageGross',
+    'gross': 'Gross',
+    'IMDB rating': 'Internet_Movie_rating',
+    'Rotten Tomatoes rating': 'Rotten_Tomatoes_rating',
+    'Metacritic rating': 'Metacritic_rating',
+}
+
+TIME_INTERVAL_QUERY = '''SELECT MovieYear, TimeInterval, MovieName, Gross, id FROM BoxOffice
+    WHERE TimeInterval = ? ORDER BY MovieYear DESC'''
+
+MOVIE_DETAIL_QUERY = '''SELECT BoxOffice.id, MovieName, ReleaseDate, runtime, genre, director,
+    Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
+    FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id WHERE BoxOffice.id = ?'''
+
+## one fixed statement per variable, so every statement is prepared once per connection
+COMPARISON_QUERIES = {}
+for variable, column in COMPARE_COLUMNS.items():
+    COMPARISON_QUERIES[variable] = '''SELECT MovieYear, ''' + column + ''', MovieName
+    FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id
+    WHERE TimeInterval = ? ORDER BY MovieYear DESC'''
+
+## the champions ranked by one variable, highest or lowest first; ties keep the order of the dataset (see movie_dataset.rank)
+RANKING_QUERIES = {}
+for variable, column in COMPARE_COLUMNS.items():
+    for ascending in [False, True]:
+        RANKING_QUERIES[(variable, ascending)] = '''SELECT BoxOffice.id, MovieYear, TimeInterval, MovieName, ''' + column + '''
+    FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id
+    WHERE ''' + column + ''' IS NOT NULL AND (?1 IS NULL OR TimeInterval = ?1)
+    AND (?2 IS NULL OR MovieYear >= ?2) AND (?3 IS NULL OR MovieYear <= ?3)
+    ORDER BY ''' + column + (' ASC' if ascending else ' DESC') + ''', TimeInterval, MovieYear DESC LIMIT ?4'''
+
+## the listing and comparison queries read BoxOffice only through the first index
+INDEX_SQL = [
+    '''CREATE INDEX IF NOT EXISTS "BoxOffice_TimeInterval_MovieYear" ON BoxOffice(
+        TimeInterval, MovieYear DESC, MovieName, Gross, CumulativeGross, AverageGross, MovieId)''',
+    '''CREATE INDEX IF NOT EXISTS "BoxOffice_MovieId" ON BoxOffice(MovieId)''',
+]
+
+## the analytics read these summary tables, which every build or sync fills again (see refresh_summaries),
+## so a request reads a few precomputed rows by primary key however many years are loaded
+SUMMARY_TABLE_SQL = [
+    '''CREATE TABLE IF NOT EXISTS "DecadeSummary"(
+        TimeInterval text NOT NULL,
+        Decade integer NOT NULL,
+        Champions integer NOT NULL,
+        TotalGross integer,
+        AverageGross real,
+        AverageCumulativeGross real,
+        Internet_Movie_rating real,
+        Rotten_Tomatoes_rating real,
+        Metacritic_rating real,
+        PRIMARY KEY (TimeInterval, Decade)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS "GenreSummary"(
+        TimeInterval text NOT NULL,
+        genre text NOT NULL,
+        Champions integer NOT NULL,
+        TotalGross integer,
+        Internet_Movie_rating real,
+        PRIMARY KEY (TimeInterval, genre)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS "DirectorSummary"(
+        TimeInterval text NOT NULL,
+        director text NOT NULL,
+        Champions integer NOT NULL,
+        TotalGross integer,
+        Internet_Movie_rating real,
+        PRIMARY KEY (TimeInterval, director)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS "RatingCorrelation"(
+        TimeInterval text NOT NULL,
+        rating text NOT NULL,
+        Movies integer NOT NULL,
+        Correlation real,
+        PRIMARY KEY (TimeInterval, rating)) WITHOUT ROWID''',
+]
+SUMMARY_TABLES = ['DecadeSummary', 'GenreSummary', 'DirectorSummary', 'RatingCorrelation']
+
+def split_names(column):
+    ''' Makes the SQL table of the names in a column listing several genres or directors in one string
+    (e.g. 'Action, Adventure, Sci-Fi'): the string is turned into a json array and json_each gives one row per name.
+    '''
+    return '''json_each('["' || replace(replace(replace(''' + column + ''', '\\', '\\\\'), '"', '\\"'), ',', '","') || '"]')'''
+
+## one summary row per champion and genre (or director); 'N/A' is what OMDB gives when it has none
+NAME_SUMMARY_SQL = '''INSERT INTO "{table}" SELECT TimeInterval, trim(name.value) AS {column}, COUNT(*), SUM(Gross), AVG(Internet_Movie_rating)
+    FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id, {names} AS name
+    WHERE Movie.{column} IS NOT NULL AND Movie.{column} != 'N/A' AND trim(name.value) != ''
+    GROUP BY TimeInterval, trim(name.value)'''
+
+SUMMARY_SQL = [
+    '''INSERT INTO "DecadeSummary" SELECT TimeInterval, MovieYear / 10 * 10 AS Decade, COUNT(*), SUM(Gross), AVG(Gross),
+        AVG(CumulativeGross), AVG(Internet_Movie_rating), AVG(Rotten_Tomatoes_rating), AVG(Metacritic_rating)
+        FROM BoxOffice LEFT JOIN Movie ON BoxOffice.MovieId = Movie.id
+        GROUP BY TimeInterval, Decade''',
+    NAME_SUMMARY_SQL.format(table='GenreSummary', column='genre', names=split_names('Movie.genre')),
+    NAME_SUMMARY_SQL.format(table='DirectorSummary', column='director', names=split_names('Movie.director')),
+]
+
+## the sums the Pearson correlation of a rating and the gross (in millions) is computed from
+CORRELATION_SUMS_QUERY = '''SELECT TimeInterval, COUNT(*), SUM(x), SUM(y), SUM(x * x), SUM(y * y), SUM(x * y)
+    FROM (SELECT TimeInterval, {column} AS x, Gross / 1000000.0 AS y FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id
+          WHERE {column} IS NOT NULL AND Gross IS NOT NULL)
+    GROUP BY TimeInterval'''
+
+RATING_COLUMNS = {
+    'IMDB rating': 'Internet_Movie_rating',
+    'Rotten Tomatoes rating': 'Rotten_Tomatoes_rating',
+    'Metacritic rating': 'Metacritic_rating',
+}
+
+DECADE_QUERY = '''SELECT Decade, Champions, TotalGross, AverageGross, AverageCumulativeGross,
+    Internet_Movie_rating, Rotten_Tomatoes_rating, Metacritic_rating
+    FROM DecadeSummary WHERE TimeInterval = ? ORDER BY Decade'''
+
+## the window is a bound parameter, and the rows are read in year order from the covering index
+ROLLING_GROSS_QUERY = '''SELECT MovieYear, Gross, AVG(Gross) OVER (ORDER BY MovieYear ROWS BETWEEN ? PRECEDING AND CURRENT ROW)
+    FROM BoxOffice WHERE TimeInterval = ? ORDER BY MovieYear'''
+
+GENRE_QUERY = '''SELECT genre, Champions, TotalGross, Internet_Movie_rating
+    FROM GenreSummary WHERE TimeInterval = ? ORDER BY TotalGross DESC LIMIT ?'''
+
+DIRECTOR_QUERY = '''SELECT director, Champions, TotalGross, Internet_Movie_rating
+    FROM DirectorSummary WHERE TimeInterval = ? ORDER BY TotalGross DESC LIMIT ?'''
+
+CORRELATION_QUERY = '''SELECT rating, Movies, Correlation FROM RatingCorrelation WHERE TimeInterval = ? ORDER BY rating'''
+
+## the search index of the films, one row per film pointing at its first box office row (whose detail page is shown):
+## MovieSearch matches whole words and word prefixes, MovieTrigram matches any three letters for misspelled searches
+SEARCH_TABLE_SQL = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS "MovieSearch" USING fts5(
+        title, director, genre, BoxOfficeId UNINDEXED, MovieYear UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')''',
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS "MovieTrigram" USING fts5(
+        title, director, BoxOfficeId UNINDEXED, MovieYear UNINDEXED, genre UNINDEXED,
+        tokenize = 'trigram')''',
+]
+SEARCH_TABLES = ['MovieSearch', 'MovieTrigram']
+
+## a film OMDB did not find is searched by its box office name
+SEARCH_CONTENT_QUERY = '''SELECT Movie.id, COALESCE(Movie.title, BoxOffice.MovieName), Movie.director, Movie.genre, BoxOffice.id, BoxOffice.MovieYear
+    FROM BoxOffice JOIN Movie ON BoxOffice.MovieId = Movie.id
+    WHERE BoxOffice.id IN (SELECT MIN(id) FROM BoxOffice GROUP BY MovieId)'''
+
+## titles weigh more than directors, and directors more than genres
+WORD_SEARCH_QUERY = '''SELECT BoxOfficeId, title, MovieYear, director, genre FROM MovieSearch
+    WHERE MovieSearch MATCH ? ORDER BY bm25(MovieSearch, 10.0, 3.0, 1.0) LIMIT ?'''
+
+TRIGRAM_SEARCH_QUERY = '''SELECT BoxOfficeId, title, MovieYear, director, genre FROM MovieTrigram
+    WHERE MovieTrigram MATCH ? ORDER BY bm25(MovieTrigram, 3.0, 1.0) LIMIT ?'''
+
+## a misspelled result must be at least this similar to the search (see get_similarity)
+FUZZY_MIN_SIMILARITY = 0.5
+
+DERIVED_TABLES = SUMMARY_TABLES + SEARCH_TABLES
+
+local = threading.local()
+
+def get_connection(filename=DB_FILENAME):
+    ''' Returns the connection of the current thread to a database, opening it on first use.
+    The connection is kept open so sqlite3 keeps its prepared statements between calls. It leaves the
+    database in the rollback-journal mode it was built in: readers never block each other, an in-place
+    sync only makes them wait while it commits, and a build is a new file without -wal or -shm files
+    to share with the old one. When a new build replaced the file (see replace_database) the connection
+    is opened again, so readers move to the new data.
+
+    Parameters
+    ----------
+    filename: string
+        the path of the database (e.g. 'Movies.sqlite')
+
+    Returns
+    -------
+    sqlite3.Connection
+        the connection of the current thread
+    '''
+    connections = getattr(local, 'connections', None)
+    if connections is None:
+        connections = local.connections = {}
+    ## the inode of the file changes when a build swaps in a new file
+    try:
+        inode = os.stat(filename).st_ino
+    except OSError:
+        inode = None
+    connection, opened_inode = connections.get(filename, (None, None))
+    if connection is not None and opened_inode != inode:
+        connection.close()
+        connection = None
+    if connection is None:
+        connection = sqlite3.connect(filename, cached_statements=256)
+        connections[filename] = (connection, os.stat(filename).st_ino)
+    return connection
+
+def close_connections():
+    ''' Closes the connections of the current thread.
+    '''
+    connections = getattr(local, 'connections', {})
+    for connection, inode in connections.values():
+        connection.close()
+    connections.clear()
+
+def replace_database(new_filename, filename=DB_FILENAME):
+    ''' Swaps a database built in another file in for a database in one step. The new file is synced
+    to disk first. Connections already open on the old file keep reading the old data until their
+    next get_connection, which opens the new file.
+    Both files must be in rollback-journal mode: sqlite opens a -wal file it finds next to a database
+    whatever its mode, so a -wal or -shm file of the old database would be shared with the new one.
+    An old database still in WAL mode (written by an earlier version) is checkpointed and switched out
+    of WAL first, which sqlite only allows when no other connection has it open.
+
+    Parameters
+    ----------
+    new_filename: string
+        the path of the complete new database, with no connection open on it (e.g. 'Movies.sqlite.build')
+    filename: string
+        the path of the database to replace (e.g. 'Movies.sqlite')
+
+    Returns
+    -------
+    None
+    '''
+    conn = sqlite3.connect(new_filename)
+    mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+    conn.close()
+    if mode == 'wal':
+        raise ValueError(new_filename + ' is in WAL mode: build it with journal_mode=DELETE')
+    if os.path.exists(filename):
+        conn = sqlite3.connect(filename)
+        try:
+            if conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+                busy, log_frames, checkpointed_frames = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+                if busy != 0 or log_frames != checkpointed_frames:
+                    raise sqlite3.OperationalError('the checkpoint of ' + filename + ' did not finish (' +
+                                                   str(checkpointed_frames) + ' of ' + str(log_frames) + ' frames)')
+                ## sqlite removes the -wal and -shm files itself once no other connection uses them
+                if conn.execute('PRAGMA journal_mode=DELETE').fetchone()[0] != 'delete':
+                    raise sqlite3.OperationalError(filename + ' is in WAL mode and in use: stop its readers to replace it once')
+        finally:
+            conn.close()
+    fd = os.open(new_filename, os.O_RDONLY)
+    os.fsync(fd)
+    os.close(fd)
+    os.replace(new_filename, filename)
+
+def create_indexes(cursor):
+    ''' Creates the indexes used by the queries of this module.
+
+    Parameters
+    ----------
+    cursor: sqlite3.Cursor
+        a cursor of Movies.sqlite
+
+    Returns
+    -------
+    None
+    '''
+    for index_sql in INDEX_SQL:
+        cursor.execute(index_sql)
+
+def search_time_interval(time_interval, filename=DB_FILENAME):
+    ''' Retrieves the box office champions of one time interval, latest year first.
+
+    Parameters
+    ----------
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (year, time interval, movie name, gross, id) tuples
+    '''
+    return get_connection(filename).execute(TIME_INTERVAL_QUERY, (time_interval,)).fetchall()
+
+def search_movie_detail(movie_id, filename=DB_FILENAME):
+    ''' Retrieves the detailed information of one box office row.
+
+    Parameters
+    ----------
+    movie_id: int or string
+        the id of a box office row (e.g. 1)
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list with the (id, movie name, release date, runtime, genre, director, IMDB rating,
+        Rotten Tomatoes rating, Metacritic rating) tuple, or an empty list if there is no such row
+    '''
+    return get_connection(filename).execute(MOVIE_DETAIL_QUERY, (int(movie_id),)).fetchall()
+
+def search_comparison(compare_variable, time_interval, filename=DB_FILENAME):
+    ''' Retrieves one variable of the box office champions of one time interval, latest year first.
+
+    Parameters
+    ----------
+    compare_variable: string
+        a variable of the comparison form (a key of COMPARE_COLUMNS, e.g. 'gross')
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (year, value, movie name) tuples
+    '''
+    if compare_variable not in COMPARISON_QUERIES:
+        raise ValueError('Unknown variable to compare: ' + str(compare_variable))
+    return get_connection(filename).execute(COMPARISON_QUERIES[compare_variable], (time_interval,)).fetchall()
+
+def search_ranking(compare_variable, time_interval=None, first_year=None, last_year=None, limit=None, ascending=False, filename=DB_FILENAME):
+    ''' Ranks box office champions by one variable, highest first, as movie_dataset.MovieDataset.rank does
+    (used when numpy is not installed). Movies without a value are left out.
+
+    Parameters
+    ----------
+    compare_variable: string
+        a key of COMPARE_COLUMNS (e.g. 'IMDB rating')
+    time_interval: string
+        a time interval (e.g. 'june'), or None for every time interval
+    first_year: int
+        the first year of the champions, or None
+    last_year: int
+        the last year of the champions, or None
+    limit: int
+        the maximum number of champions, or None for all
+    ascending: bool
+        whether the lowest value comes first
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (id, year, time interval, movie name, value) tuples
+    '''
+    if compare_variable not in COMPARE_COLUMNS:
+        raise ValueError('Unknown variable to compare: ' + str(compare_variable))
+    return get_connection(filename).execute(RANKING_QUERIES[(compare_variable, bool(ascending))],
+                                            (time_interval, first_year, last_year, -1 if limit is None else int(limit))).fetchall()
+
+def get_correlation(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy):
+    ''' Computes the Pearson correlation of two variables from their sums, or None if it is undefined
+    (fewer than three pairs, or a variable that never changes).
+    '''
+    if n < 3:
+        return None
+    variance_x = n * sum_xx - sum_x * sum_x
+    variance_y = n * sum_yy - sum_y * sum_y
+    if variance_x <= 0 or variance_y <= 0:
+        return None
+    return (n * sum_xy - sum_x * sum_y) / math.sqrt(variance_x * variance_y)
+
+def refresh_summaries(cursor):
+    ''' Creates the summary tables if needed and fills them again from BoxOffice and Movie,
+    in the transaction of the cursor.
+
+    Parameters
+    ----------
+    cursor: sqlite3.Cursor
+        a cursor of Movies.sqlite
+
+    Returns
+    -------
+    None
+    '''
+    for table_sql in SUMMARY_TABLE_SQL:
+        cursor.execute(table_sql)
+    for table in SUMMARY_TABLES:
+        cursor.execute('DELETE FROM "' + table + '"')
+    for summary_sql in SUMMARY_SQL:
+        cursor.execute(summary_sql)
+    Rows = []
+    for rating, column in RATING_COLUMNS.items():
+        for sums in cursor.execute(CORRELATION_SUMS_QUERY.format(column=column)).fetchall():
+            Rows.append((sums[0], rating, sums[1], get_correlation(*sums[1:])))
+    cursor.executemany('INSERT INTO RatingCorrelation VALUES (?,?,?,?)', Rows)
+
+def refresh_search_index(cursor):
+    ''' Creates the search tables if needed and fills them again from BoxOffice and Movie,
+    in the transaction of the cursor.
+
+    Parameters
+    ----------
+    cursor: sqlite3.Cursor
+        a cursor of Movies.sqlite
+
+    Returns
+    -------
+    None
+    '''
+    for table_sql in SEARCH_TABLE_SQL:
+        cursor.execute(table_sql)
+    Rows = cursor.execute(SEARCH_CONTENT_QUERY).fetchall()
+    cursor.execute('DELETE FROM MovieSearch')
+    cursor.executemany('INSERT INTO MovieSearch (rowid, title, director, genre, BoxOfficeId, MovieYear) VALUES (?,?,?,?,?,?)', Rows)
+    cursor.execute('DELETE FROM MovieTrigram')
+    cursor.executemany('INSERT INTO MovieTrigram (rowid, title, director, genre, BoxOfficeId, MovieYear) VALUES (?,?,?,?,?,?)', Rows)
+
+def refresh_derived_tables(cursor):
+    ''' Fills the summary and search tables again after BoxOffice or Movie changed.
+    '''
+    refresh_summaries(cursor)
+    refresh_search_index(cursor)
+
+def derived_tables_exist(cursor):
+    ''' Checks whether the summary and search tables have been created.
+    '''
+    names = cursor.execute('''SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (''' + ','.join('?' * len(DERIVED_TABLES)) + ')',
+                           DERIVED_TABLES).fetchall()
+    return len(names) == len(DERIVED_TABLES)
+
+def get_trigrams(text):
+    ''' Makes the set of three-letter groups of the words of a text (e.g. 'Frozen' -> {'fro', 'roz', 'oze', 'zen'}).
+    '''
+    Trigrams = set()
+    for word in re.findall(r'\w+', text.casefold()):
+        for i in range(len(word) - 2):
+            Trigrams.add(word[i:i + 3])
+    return Trigrams
+
+def get_word_trigrams(word):
+    ''' Makes the set of three-letter groups of a word padded with spaces, so its first and last letters
+    weigh more than the middle ones (e.g. 'jaws' -> {'  j', ' ja', 'jaw', 'aws', 'ws '}).
+    '''
+    word = '  ' + word + ' '
+    return set(word[i:i + 3] for i in range(len(word) - 2))
+
+def get_similarity(text, value):
+    ''' Measures how close a title or director is to a search: every word of the search is matched with the
+    word of the value whose three-letter groups are most similar (Dice coefficient, 2|A & B| / (|A| + |B|)),
+    and the similarities of the words of the search are averaged. A long title sharing a few letters with
+    the search is therefore not similar (e.g. 'lion king' and "Look Who's Talking": 0.33), while a
+    misspelling is (e.g. 'avngers endgme' and 'Avengers: Endgame': 0.69).
+
+    Parameters
+    ----------
+    text: string
+        the search (e.g. 'frozzen')
+    value: string
+        a title or director (e.g. 'Frozen II')
+
+    Returns
+    -------
+    float
+        the similarity, from 0 (no letters in common) to 1 (the same words)
+    '''
+    Values = [get_word_trigrams(word) for word in re.findall(r'\w+', value.casefold())]
+    Words = [get_word_trigrams(word) for word in re.findall(r'\w+', text.casefold())]
+    if len(Values) == 0 or len(Words) == 0:
+        return 0.0
+    total = 0.0
+    for Trigrams in Words:
+        total = total + max(2 * len(Trigrams & Other) / (len(Trigrams) + len(Other)) for Other in Values)
+    return total / len(Words)
+
+def search_movies(text, limit=10, filename=DB_FILENAME):
+    ''' Searches the titles, directors and genres of the films. Every word of the text must start a word
+    of the film (e.g. 'star wa' finds 'Star Wars'); if that finds fewer than limit films, the films whose title
+    or director is most similar to the text (see get_similarity) are added, so misspelled searches
+    (e.g. 'Frozzen') still find them.
+
+    Parameters
+    ----------
+    text: string
+        the search (e.g. 'spielberg', 'lion king')
+    limit: int
+        the maximum number of films
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (box office id, title, year, director, genre) tuples, best match first;
+        the box office id is the one of the detail page of the film (see search_movie_detail)
+    '''
+    Words = re.findall(r'\w+', text)
+    if len(Words) == 0:
+        return []
+    connection = get_connection(filename)
+    ## quoted words cannot be read as FTS5 operators, and * matches them as prefixes
+    Results = connection.execute(WORD_SEARCH_QUERY, (' '.join('"' + word + '"*' for word in Words), int(limit))).fetchall()
+    Trigrams = get_trigrams(text)
+    if len(Results) >= limit or len(Trigrams) == 0:
+        return Results
+    Found = set(result[0] for result in Results)
+    Candidates = connection.execute(TRIGRAM_SEARCH_QUERY, (' OR '.join('"' + trigram + '"' for trigram in Trigrams), int(limit) * 5)).fetchall()
+    Scored = []
+    for candidate in Candidates:
+        if candidate[0] in Found:
+            continue
+        ## the best of the title and the director
+        similarity = max(get_similarity(text, value or '') for value in (candidate[1], candidate[3]))
+        if similarity >= FUZZY_MIN_SIMILARITY:
+            Scored.append((-similarity, len(Scored), candidate))
+    Scored.sort()
+    return Results + [candidate for similarity, order, candidate in Scored[:int(limit) - len(Results)]]
+
+def search_decades(time_interval, filename=DB_FILENAME):
+    ''' Retrieves the box office champions of one time interval rolled up by decade.
+
+    Parameters
+    ----------
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (decade, champions, total gross, average gross, average cumulative gross,
+        average IMDB rating, average Rotten Tomatoes rating, average Metacritic rating) tuples, earliest decade first
+    '''
+    return get_connection(filename).execute(DECADE_QUERY, (time_interval,)).fetchall()
+
+def search_rolling_gross(time_interval, window=5, filename=DB_FILENAME):
+    ''' Retrieves the gross of the box office champions of one time interval with its rolling average.
+
+    Parameters
+    ----------
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    window: int
+        the number of years averaged, the year itself and the years before it (e.g. 5)
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (year, gross, rolling average gross) tuples, earliest year first
+    '''
+    return get_connection(filename).execute(ROLLING_GROSS_QUERY, (max(int(window), 1) - 1, time_interval)).fetchall()
+
+def search_genres(time_interval, limit=20, filename=DB_FILENAME):
+    ''' Retrieves the genres of the box office champions of one time interval with the largest total gross.
+    A film counts once for each of its genres.
+
+    Parameters
+    ----------
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    limit: int
+        the maximum number of genres
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (genre, champions, total gross, average IMDB rating) tuples, largest total gross first
+    '''
+    return get_connection(filename).execute(GENRE_QUERY, (time_interval, int(limit))).fetchall()
+
+def search_directors(time_interval, limit=20, filename=DB_FILENAME):
+    ''' Retrieves the directors of the box office champions of one time interval with the largest total gross.
+
+    Parameters
+    ----------
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    limit: int
+        the maximum number of directors
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (director, champions, total gross, average IMDB rating) tuples, largest total gross first
+    '''
+    return get_connection(filename).execute(DIRECTOR_QUERY, (time_interval, int(limit))).fetchall()
+
+def search_rating_correlation(time_interval, filename=DB_FILENAME):
+    ''' Retrieves how closely each rating of the box office champions of one time interval follows their gross.
+
+    Parameters
+    ----------
+    time_interval: string
+        a time interval (e.g. 'first quarter', 'january')
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    list
+        a list of (rating, number of movies, Pearson correlation between -1 and 1 or None) tuples
+    '''
+    return get_connection(filename).execute(CORRELATION_QUERY, (time_interval,)).fetchall()
+
+def get_database_version(filename=DB_FILENAME):
+    ''' Reads the version of the data in a database. Every build or sync that changes rows
+    increases it, so anything derived from the data can tell when it is stale.
+
+    Parameters
+    ----------
+    filename: string
+        the path of the database
+
+    Returns
+    -------
+    int
+        the version of the data (PRAGMA user_version)
+    '''
+    return get_connection(filename).execute('PRAGMA user_version').fetchone()[0]
+
+def bump_database_version(cursor):
+    ''' Increases the version of the data, in the transaction of the cursor.
+
+    Parameters
+    ----------
+    cursor: sqlite3.Cursor
+        a cursor of the database being changed
+
+    Returns
+    -------
+    None
+    '''
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    cursor.execute('PRAGMA user_version = ' + str(version + 1))
+
+class VersionedLoader:
+    '''an object read from a database (e.g. an in-memory index of its rows), kept for every database file
+    and read again whenever the version of the database changes (see get_database_version)
+
+    Instance Attributes
+    -------------------
+    load: function
+        the function reading the object from the path of a database
+
+    loaded: dict
+        the (version, object) of every database read so far
+    '''
+    def __init__(self, load):
+        self.load = load
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def get(self, filename=DB_FILENAME):
+        ''' Returns the object of a database, reading it the first time and again whenever
+        the version of the database has changed since it was read.
+
+        Parameters
+        ----------
+        filename: string
+            the path of the database
+
+        Returns
+        -------
+        the object read by load
+        '''
+        version = get_database_version(filename)
+        entry = self.loaded.get(filename)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self.lock:
+            entry = self.loaded.get(filename)
+            if entry is None or entry[0] != version:
+                ## tagged with the version read before loading, so a change during the load is read again next time
+                entry = self.loaded[filename] = (version, self.load(filename))
+        return entry[1]
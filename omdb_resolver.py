@@ -0,0 +1,128 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Decides which OMDB record is the film of a box office row. A title alone is ambiguous
+## (remakes, re-releases, TV series sharing a name), so the year of the box office row is used
+## to check a record found by title, and to rank the results of an OMDB search.
+import re
+from difflib import SequenceMatcher
+
+## the answer kept for a film OMDB has no record of
+NOT_FOUND = {'Response': 'False', 'Error': 'Movie not found!'}
+
+## a film is released at most this many years before the year it tops the box office
+## (e.g. a film released in December and champion of January)
+YEAR_TOLERANCE = 1
+## the smallest similarity between two normalized titles for them to name the same film
+MIN_TITLE_SIMILARITY = 0.8
+
+## Box Office Mojo appends the release to the name of a re-release, sometimes without a space
+## (e.g. 'The Lion King2011 3D Release', 'Phoenix, OregonRe-release', "Star Wars: Episode IV - A New Hope1997 Special Edition")
+RE_RELEASE_PATTERN = re.compile(r'\s*(\d{4})?\s*(re-?release|special edition|3d release|imax release|\d+(st|nd|rd|th) anniversary( release)?)\s*$',
+                                re.IGNORECASE)
+
+def clean_title(title):
+    ''' Removes the re-release suffix of a box office name.
+
+    Parameters
+    ----------
+    title: string
+        the name of the movie on the box office website (e.g. 'The Lion King2011 3D Release')
+
+    Returns
+    -------
+    tuple
+        (the title of the film, whether the name is a re-release) (e.g. ('The Lion King', True))
+    '''
+    cleaned = RE_RELEASE_PATTERN.sub('', title)
+    if cleaned == '' or cleaned == title:
+        return title, False
+    return cleaned, True
+
+def normalize_title(title):
+    ''' Lower-cases a title and keeps only its letters and digits (e.g. 'Star Wars: Episode IV - A New Hope' -> 'star wars episode iv a new hope').
+    '''
+    title = title.casefold().replace('&', ' and ')
+    return ' '.join(re.sub(r'[^\w\s]', ' ', title).split())
+
+def get_title_similarity(title, other_title):
+    ''' Returns the similarity of two titles between 0 and 1 (1 when they are the same once normalized).
+    '''
+    return SequenceMatcher(None, normalize_title(title), normalize_title(other_title)).ratio()
+
+def get_release_year(record):
+    ''' Reads the year of an OMDB record or search result (e.g. 2019 from '2019' or 2015 from '2015–2018').
+
+    Returns
+    -------
+    int
+        the year, or None if the record has none
+    '''
+    match = re.match(r'\d{4}', record.get('Year', ''))
+    if match is None:
+        return None
+    return int(match.group())
+
+def is_match(response, title, year):
+    ''' Checks whether an OMDB record is the film a box office row names: a movie (not a series or
+    an episode) whose title is similar and which came out in the year of the row or the year before.
+
+    Parameters
+    ----------
+    response: dict
+        the OMDB json of a lookup
+    title: string
+        the name of the movie on the box office website
+    year: int
+        the year of the box office row
+
+    Returns
+    -------
+    bool
+        True if the record is the film
+    '''
+    if response.get('Response') != 'True' or response.get('Type', 'movie') != 'movie' or 'imdbID' not in response:
+        return False
+    release_year = get_release_year(response)
+    if release_year is None or not 0 <= int(year) - release_year <= YEAR_TOLERANCE:
+        return False
+    return get_title_similarity(response.get('Title', ''), title) >= MIN_TITLE_SIMILARITY
+
+def rank_search_results(results, title, year, rerelease=False):
+    ''' Picks the best result of an OMDB search (s=) for a box office row: among the movies with a similar
+    title that came out in the row's year or the year before (or in any earlier year for a re-release),
+    the most similar title wins, then the closest year.
+
+    Parameters
+    ----------
+    results: dict
+        the OMDB json of a search, whose 'Search' list holds {'Title', 'Year', 'imdbID', 'Type'} results
+    title: string
+        the title of the film, without any re-release suffix
+    year: int
+        the year of the box office row
+    rerelease: bool
+        whether the row is a re-release of a film (see clean_title)
+
+    Returns
+    -------
+    string
+        the imdbID of the best result (e.g. 'tt6105098'), or None if no result fits
+    '''
+    best = None
+    for result in results.get('Search', []):
+        release_year = get_release_year(result)
+        if result.get('Type', 'movie') != 'movie' or release_year is None or release_year > int(year):
+            continue
+        if not rerelease and int(year) - release_year > YEAR_TOLERANCE:
+            continue
+        similarity = get_title_similarity(result.get('Title', ''), title)
+        if similarity < MIN_TITLE_SIMILARITY:
+            continue
+        score = (round(similarity, 2), -abs(int(year) - release_year))
+        if best is None or score > best[0]:
+            best = (score, result['imdbID'])
+    if best is None:
+        return None
+    return best[1]
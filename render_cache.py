@@ -0,0 +1,71 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import threading
+from collections import OrderedDict
+
+class RenderCache:
+    '''a bounded cache of rendered pages, emptied whenever the version of the database changes.
+    The least recently used page is dropped when the cache is full.
+
+    Instance Attributes
+    -------------------
+    max_entries: int
+        the maximum number of pages kept
+
+    get_version: function
+        a function returning the current version of the data the pages are rendered from
+
+    version: int
+        the version of the data the cached pages were rendered from
+
+    pages: OrderedDict
+        the rendered pages by key, least recently used first
+    '''
+    def __init__(self, get_version, max_entries=256):
+        self.get_version = get_version
+        self.max_entries = max_entries
+        self.version = None
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        ''' Returns the page of a key, rendering it with render() only if it is not cached
+        for the current version of the data.
+
+        Parameters
+        ----------
+        key: tuple
+            the inputs of the page (e.g. ('Champions', 'gross', 'june') or ('movie', 1))
+        render: function
+            a function without arguments returning the page
+
+        Returns
+        -------
+        string
+            the rendered page
+        '''
+        version = self.get_version()
+        with self.lock:
+            if version != self.version:
+                self.pages.clear()
+                self.version = version
+            if key in self.pages:
+                self.pages.move_to_end(key)
+                self.hits += 1
+                return self.pages[key]
+            self.misses += 1
+        page = render()
+        with self.lock:
+            if self.version == version:
+                self.pages[key] = page
+                if len(self.pages) > self.max_entries:
+                    self.pages.popitem(last=False)
+        return page
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
@@ -0,0 +1,235 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Exports the tables of Movies.sqlite to a small compressed snapshot and builds a database back
+## from it, so a new machine can start without the cache, the source pages or an OMDB key.
+## The snapshot is a numpy .npz file holding one typed array per column (text columns as unicode
+## arrays, never pickled objects), a mask per column with NULL values, and the SQL of the tables,
+## indexes and views (only CREATE TABLE, INDEX and VIEW statements are run when it is imported).
+## The summary and search tables are not stored: they are filled again from the rows.
+import os
+import re
+import sqlite3
+import sys
+import time
+
+import movie_dataset
+import movie_db
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SNAPSHOT_FILENAME = "Movies.npz"
+## increased whenever the layout of the snapshot changes
+SNAPSHOT_FORMAT = 1
+## the tables kept in the snapshot; SourceHash lets a later --sync update only what changed
+SNAPSHOT_TABLES = ['BoxOffice', 'Movie', 'SourceHash']
+## the only statements import_snapshot runs from the schema of a snapshot: the snapshot tables, indexes and views
+SCHEMA_STATEMENT = re.compile(r'\s*CREATE\s+(TABLE|(?:UNIQUE\s+)?INDEX|VIEW)\s+(?:IF\s+NOT\s+EXISTS\s+)?["`\[]?(\w+)', re.IGNORECASE)
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError('numpy is needed to export or import a snapshot (pip install numpy)')
+
+def get_tables(c):
+    ''' Returns the snapshot tables a database has (a database built without --sync has no SourceHash).
+    '''
+    return [table for table in SNAPSHOT_TABLES
+            if c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None]
+
+def get_schema(c):
+    ''' Reads the SQL of the snapshot tables, of their indexes and of the views of a database.
+
+    Parameters
+    ----------
+    c: sqlite3.Cursor
+        a cursor of the database
+
+    Returns
+    -------
+    list
+        the CREATE statements, tables first
+    '''
+    Schema = []
+    for table in get_tables(c):
+        Schema.extend(row[0] for row in c.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)))
+    for table in get_tables(c):
+        Schema.extend(row[0] for row in c.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)))
+    Schema.extend(row[0] for row in c.execute("SELECT sql FROM sqlite_master WHERE type = 'view'"))
+    return Schema
+
+def split_schema(Schema):
+    ''' Checks the SQL read from a snapshot and splits it into the statements creating the tables
+    and the statements creating the indexes and views, which are run after the rows are loaded.
+
+    Parameters
+    ----------
+    Schema: list
+        the CREATE statements of a snapshot (see get_schema)
+
+    Returns
+    -------
+    tuple
+        (list of CREATE TABLE statements, list of CREATE INDEX and CREATE VIEW statements)
+    '''
+    Tables = []
+    Others = []
+    for sql in Schema:
+        match = SCHEMA_STATEMENT.match(sql)
+        ## one statement each: no ';' outside a quoted name or string ends a statement before the last character
+        sql = sql.rstrip().rstrip(';')
+        if match is None or any(sqlite3.complete_statement(sql[:i + 1]) for i, character in enumerate(sql) if character == ';'):
+            raise ValueError('Unexpected statement in the snapshot schema: ' + sql[:80])
+        if match.group(1).upper() == 'TABLE':
+            if match.group(2) not in SNAPSHOT_TABLES:
+                raise ValueError('Unexpected table in the snapshot schema: ' + match.group(2))
+            Tables.append(sql)
+        else:
+            Others.append(sql)
+    return Tables, Others
+
+def get_kind(declared_type):
+    ''' Maps the declared SQLite type of a column (e.g. 'INTEGER', 'REAL', 'TEXT') to the kind of its array
+    (see movie_dataset.make_column), following SQLite's own type affinity rules.
+    '''
+    declared_type = declared_type.lower()
+    if 'int' in declared_type:
+        return 'int'
+    if 'real' in declared_type or 'floa' in declared_type or 'doub' in declared_type:
+        return 'float'
+    return 'text'
+
+def export_snapshot(db_filename=movie_db.DB_FILENAME, snapshot_filename=SNAPSHOT_FILENAME):
+    ''' Writes the rows of the snapshot tables of a database to a compressed snapshot.
+
+    Parameters
+    ----------
+    db_filename: string
+        the path of the database (e.g. 'Movies.sqlite')
+    snapshot_filename: string
+        the path of the snapshot (e.g. 'Movies.npz')
+
+    Returns
+    -------
+    dict
+        the number of exported rows of every table (e.g. {'BoxOffice': 711, 'Movie': 455, 'SourceHash': 494})
+    '''
+    require_numpy()
+    conn = sqlite3.connect(db_filename)
+    c = conn.cursor()
+    Arrays = {'format': np.array(SNAPSHOT_FORMAT), 'version': np.array(c.execute('PRAGMA user_version').fetchone()[0]),
+              'exported_at': np.array(time.time()), 'schema': np.array(get_schema(c), dtype=str)}
+    Counts = {}
+    for table in get_tables(c):
+        columns = c.execute('PRAGMA table_info("' + table + '")').fetchall()
+        Rows = c.execute('SELECT * FROM "' + table + '"').fetchall()
+        Values = list(zip(*Rows)) if len(Rows) > 0 else [()] * len(columns)
+        Arrays[table + '.columns'] = np.array([column[1] for column in columns], dtype=str)
+        for column, values in zip(columns, Values):
+            array, nulls = movie_dataset.make_column(values, get_kind(column[2]), portable=True)
+            Arrays[table + '.' + column[1]] = array
+            if nulls is not None:
+                Arrays[table + '.' + column[1] + '.null'] = nulls
+        Counts[table] = len(Rows)
+    conn.close()
+    ## np.savez_compressed adds .npz to a file name without it
+    with open(snapshot_filename, 'wb') as snapshot_file:
+        np.savez_compressed(snapshot_file, **Arrays)
+    return Counts
+
+def read_table(snapshot, table):
+    ''' Reads the rows of one table of a snapshot, with None for the NULL values.
+
+    Returns
+    -------
+    tuple
+        (column names, list of row tuples)
+    '''
+    Names = snapshot[table + '.columns'].tolist()
+    Values = []
+    for name in Names:
+        values = snapshot[table + '.' + name]
+        if table + '.' + name + '.null' in snapshot.files:
+            values = values.astype(object)
+            values[snapshot[table + '.' + name + '.null']] = None
+        Values.append(values.tolist())
+    return Names, list(zip(*Values))
+
+def import_snapshot(snapshot_filename=SNAPSHOT_FILENAME, db_filename=movie_db.DB_FILENAME):
+    ''' Builds a database from a snapshot. The rows are written to a new file next to the database,
+    the summary and search tables are filled from them, and the new file then replaces the database,
+    so readers never see a half-built database. The version of the new database is higher than the
+    version of the database it replaces, so rendered pages and datasets of the old data are dropped.
+    Connections open on the old file move to the new one on their next query (see movie_db.replace_database).
+
+    Parameters
+    ----------
+    snapshot_filename: string
+        the path of the snapshot (e.g. 'Movies.npz')
+    db_filename: string
+        the path of the database to build (e.g. 'Movies.sqlite')
+
+    Returns
+    -------
+    dict
+        the number of imported rows of every table
+    '''
+    require_numpy()
+    Counts = {}
+    with np.load(snapshot_filename, allow_pickle=False) as snapshot:
+        if int(snapshot['format']) != SNAPSHOT_FORMAT:
+            raise ValueError('Unsupported snapshot format ' + str(int(snapshot['format'])) + ' in ' + snapshot_filename)
+        version = int(snapshot['version'])
+        if os.path.exists(db_filename):
+            old_conn = sqlite3.connect(db_filename)
+            version = max(version, old_conn.execute('PRAGMA user_version').fetchone()[0] + 1)
+            old_conn.close()
+        new_filename = db_filename + '.import'
+        if os.path.exists(new_filename):
+            os.remove(new_filename)
+        conn = sqlite3.connect(new_filename)
+        c = conn.cursor()
+        ## nothing reads the new file until it is complete, so it is written without a journal
+        ## (the commit still syncs it to disk before it replaces the database)
+        c.execute('PRAGMA journal_mode=OFF')
+        Tables, Others = split_schema(snapshot['schema'].tolist())
+        for sql in Tables:
+            c.execute(sql)
+        for table in SNAPSHOT_TABLES:
+            if table + '.columns' not in snapshot.files:
+                continue
+            Names, Rows = read_table(snapshot, table)
+            c.executemany('INSERT INTO "' + table + '" (' + ','.join('"' + name + '"' for name in Names) + ') VALUES (' + ','.join('?' * len(Names)) + ')', Rows)
+            Counts[table] = len(Rows)
+    ## building the indexes once after the bulk load is faster than updating them row by row
+    for sql in Others:
+        c.execute(sql)
+    movie_db.refresh_derived_tables(c)
+    c.execute('PRAGMA user_version = ' + str(version))
+    conn.commit()
+    c.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+    movie_db.replace_database(new_filename, db_filename)
+    return Counts
+
+if __name__ == "__main__":
+    ## python snapshot.py export [Movies.sqlite] [Movies.npz]
+    ## python snapshot.py import [Movies.npz] [Movies.sqlite]
+    if len(sys.argv) < 2 or sys.argv[1] not in ['export', 'import']:
+        print('Usage: python snapshot.py export [Movies.sqlite] [Movies.npz] | import [Movies.npz] [Movies.sqlite]')
+        sys.exit(1)
+    start = time.perf_counter()
+    if sys.argv[1] == 'export':
+        db_filename = sys.argv[2] if len(sys.argv) > 2 else movie_db.DB_FILENAME
+        snapshot_filename = sys.argv[3] if len(sys.argv) > 3 else SNAPSHOT_FILENAME
+        Counts = export_snapshot(db_filename, snapshot_filename)
+        print('Exported ' + str(Counts) + ' from ' + db_filename + ' to ' + snapshot_filename)
+    else:
+        snapshot_filename = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_FILENAME
+        db_filename = sys.argv[3] if len(sys.argv) > 3 else movie_db.DB_FILENAME
+        Counts = import_snapshot(snapshot_filename, db_filename)
+        print('Imported ' + str(Counts) + ' from ' + snapshot_filename + ' into ' + db_filename)
+    print('Took ' + str(round(time.perf_counter() - start, 3)) + ' seconds')
@@ -0,0 +1,60 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+## Points the program at temporary files and a local stub server standing in for Box Office Mojo and OMDB
+## (see benchmarks/stub_server.py), so the tests run offline without an OMDB key.
+import os
+import shutil
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'benchmarks'))
+## the stub server ignores the key
+os.environ.setdefault('OMDB_API_KEY', 'test')
+import Final_Project_Code_zhuxiaoy as program
+import cache_store
+from stub_server import start_stub_server
+
+@pytest.fixture(scope='session')
+def stub_server():
+    server = start_stub_server(os.path.join(PROJECT_DIR, 'cache.json'))
+    yield server
+    server.shutdown()
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    ''' A copy of the bundled Movies.sqlite the program uses.
+    '''
+    filename = str(tmp_path / 'Movies.sqlite')
+    shutil.copy(os.path.join(PROJECT_DIR, 'Movies.sqlite'), filename)
+    monkeypatch.setattr(program, 'DB_FILENAME', filename)
+    return filename
+
+@pytest.fixture
+def store(tmp_path, stub_server, monkeypatch):
+    ''' An empty cache store the program uses, with Movies.sqlite in a temporary directory
+    and every request sent to the stub server.
+    '''
+    monkeypatch.setattr(program, 'DB_FILENAME', str(tmp_path / 'Movies.sqlite'))
+    monkeypatch.setattr(program, 'CACHE_FILENAME', str(tmp_path / 'no_cache.json'))
+    monkeypatch.setattr(program, 'BOX_OFFICE_BASE_URL', stub_server.base_url)
+    monkeypatch.setattr(program, 'OMDB_BASE_URL', stub_server.base_url + '/')
+    monkeypatch.setattr(program, 'RATE_LIMITS', {'127.0.0.1:' + str(stub_server.server_port): 1000})
+    monkeypatch.setattr(program, 'FETCHER', None)
+    store = cache_store.CacheStore(str(tmp_path / 'cache.sqlite'), compress=True)
+    monkeypatch.setattr(program, 'CACHE_DICT', store)
+    yield store
+    if program.FETCHER is not None:
+        program.FETCHER.close()
+    store.close()
+
+def expire_pages(store):
+    ''' Makes every cached page expire, as a day later.
+    '''
+    with store.lock:
+        store.connection.execute('UPDATE Cache SET expires_at = 0 WHERE namespace = ?', (cache_store.BOX_OFFICE_NAMESPACE,))
+        store.connection.commit()
@@ -0,0 +1,83 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import socket
+
+import pytest
+
+import Final_Project_Code_zhuxiaoy as program
+import api_server
+
+@pytest.fixture
+def server(database):
+    server = api_server.start_api_server(database, '127.0.0.1', 0)
+    yield server
+    server.stop()
+
+def send(server, data):
+    ''' Sends raw bytes to the server and returns everything it answers before closing the connection.
+    '''
+    with socket.create_connection(('127.0.0.1', server.port), timeout=5) as connection:
+        connection.sendall(data)
+        answer = b''
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                return answer
+            answer = answer + chunk
+
+def test_pages_read_the_api_of_their_own_site(database):
+    assert program.get_api_url('/api/movie/1') == '/api/movie/1'
+    with program.get_app().test_client() as client:
+        response = client.get('/api/movie/1')
+        assert response.status_code == 200
+        assert response.get_json()['id'] == 1
+        assert 'Access-Control-Allow-Origin' not in response.headers
+        assert client.get('/api/movie/1', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+        assert client.get('/api/comparison?interval=june&variable=gross').get_json()['interval'] == 'june'
+        assert client.get('/api/intervals/first%20quarter?per_page=3').get_json()['movies'][0]['id'] > 0
+        assert client.get('/api/nothing').status_code == 404
+
+def test_api_base_url_can_be_configured(monkeypatch):
+    monkeypatch.setattr(program, 'API_BASE_URL', 'https://api.example.com/')
+    assert program.get_api_url('/api/movie/1') == 'https://api.example.com/api/movie/1'
+
+def test_keep_alive(server):
+    request = b'GET /api/movie/1 HTTP/1.1\r\nHost: x\r\n\r\n'
+    answer = send(server, request + request.replace(b'Host: x', b'Host: x\r\nConnection: close'))
+    assert answer.count(b'HTTP/1.1 200 OK') == 2
+
+@pytest.mark.parametrize('head, status', [
+    (b'Content-Length: 1000000000\r\n', b'413'),
+    (b'Content-Length: 5\r\n', b'413'),
+    (b'Content-Length: x\r\n', b'400'),
+    (b'Transfer-Encoding: chunked\r\n', b'413'),
+    (b''.join(b'X-%d: 1\r\n' % i for i in range(api_server.MAX_HEADERS + 1)), b'431'),
+    (b'X-Long: ' + b'a' * (api_server.MAX_LINE_BYTES + 1) + b'\r\n', b'431'),
+])
+def test_refuses_bodies_and_large_heads(server, head, status):
+    answer = send(server, b'GET /api/movie/1 HTTP/1.1\r\nHost: x\r\n' + head + b'\r\nhello')
+    assert answer.startswith(b'HTTP/1.1 ' + status)
+    assert b'Connection: close' in answer
+    assert b'Access-Control-Allow-Origin' not in answer
+
+def test_standalone_api_allows_the_configured_origin(database):
+    api = api_server.Api(database, allow_origin='https://movies.example.com')
+    status, Headers, body = api.respond('OPTIONS', '/api/movie/1', {'origin': 'https://movies.example.com'})
+    assert status == 204 and body == b''
+    assert Headers['Access-Control-Allow-Origin'] == 'https://movies.example.com'
+    assert 'If-None-Match' in Headers['Access-Control-Allow-Headers']
+    status, Headers, body = api.respond('GET', '/api/movie/1', {'origin': 'https://movies.example.com'})
+    assert status == 200
+    assert Headers['Access-Control-Allow-Origin'] == 'https://movies.example.com'
+    assert 'ETag' in Headers['Access-Control-Expose-Headers']
+    assert api_server.Api(database).respond('OPTIONS', '/api/movie/1', {})[0] == 405
+
+def test_errors_are_not_answered_with_not_modified(database):
+    api = api_server.Api(database)
+    etag = api.respond('GET', '/api/movie/1', {})[1]['ETag']
+    assert api.respond('GET', '/api/movie/1', {'if-none-match': etag})[0] == 304
+    status, Headers, body = api.respond('GET', '/api/movie/99999', {'if-none-match': etag})
+    assert status == 404 and 'ETag' not in Headers
+    assert api.respond('GET', '/api/comparison?interval=nowhere', {'if-none-match': etag})[0] == 400
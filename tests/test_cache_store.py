@@ -0,0 +1,129 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import json
+
+import pytest
+
+import cache_store
+from cache_store import CachePolicy, CacheStore, DAY, BOX_OFFICE_NAMESPACE, OMDB_NAMESPACE, OMDB_ID_NAMESPACE
+
+class Clock:
+    ''' Stands in for the time module of cache_store, so a test can move time forward.
+    '''
+    def __init__(self):
+        self.now = 1000000.0
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_store, 'time', clock)
+    return clock
+
+@pytest.fixture
+def open_store(tmp_path):
+    Stores = []
+    def open_store(**options):
+        Stores.append(CacheStore(str(tmp_path / 'cache.sqlite'), **options))
+        return Stores[-1]
+    yield open_store
+    for store in Stores:
+        store.close()
+
+FOUND = {'Response': 'True', 'Title': 'Captain Marvel', 'imdbID': 'tt4154664'}
+NOT_FOUND = {'Response': 'False', 'Error': 'Movie not found!'}
+
+def test_entries_expire_after_the_ttl_of_their_namespace(clock, open_store):
+    store = open_store()
+    store.set(OMDB_NAMESPACE, 'tt4154664', FOUND)
+    store.set(OMDB_ID_NAMESPACE, 'Captain Marvel|2019', {'imdbID': 'tt4154664'})
+    clock.now += 30 * DAY - 1
+    assert store.get(OMDB_NAMESPACE, 'tt4154664') == FOUND
+    clock.now += 1
+    assert store.get(OMDB_NAMESPACE, 'tt4154664') is None
+    assert not store.contains(OMDB_NAMESPACE, 'tt4154664')
+    ## a resolved id never expires
+    assert store.get(OMDB_ID_NAMESPACE, 'Captain Marvel|2019') == {'imdbID': 'tt4154664'}
+
+def test_failed_lookups_expire_after_the_negative_ttl(clock, open_store):
+    store = open_store()
+    store.set(OMDB_NAMESPACE, 'tt0000000', NOT_FOUND)
+    store.set(OMDB_ID_NAMESPACE, 'Phantom Movie|1999', {'imdbID': None})
+    clock.now += DAY - 1
+    assert store.get(OMDB_NAMESPACE, 'tt0000000') == NOT_FOUND
+    assert store.get(OMDB_ID_NAMESPACE, 'Phantom Movie|1999') == {'imdbID': None}
+    clock.now += 1
+    assert store.get(OMDB_NAMESPACE, 'tt0000000') is None
+    assert store.get(OMDB_ID_NAMESPACE, 'Phantom Movie|1999') is None
+
+def test_prune_keeps_the_expired_pages_to_revalidate(clock, open_store):
+    store = open_store()
+    store.set(BOX_OFFICE_NAMESPACE, 'june', '<html></html>', {'ETag': '"1"'})
+    store.set(OMDB_NAMESPACE, 'tt0000000', NOT_FOUND)
+    clock.now += 2 * DAY
+    assert store.prune() == 1
+    assert store.get(BOX_OFFICE_NAMESPACE, 'june') is None
+    assert store.get(BOX_OFFICE_NAMESPACE, 'june', allow_expired=True) == '<html></html>'
+    assert store.get_meta(BOX_OFFICE_NAMESPACE, 'june') == ({'ETag': '"1"'}, False)
+    store.refresh(BOX_OFFICE_NAMESPACE, 'june')
+    assert store.get(BOX_OFFICE_NAMESPACE, 'june') == '<html></html>'
+
+def test_least_recently_used_entries_are_evicted_over_max_bytes(clock, open_store):
+    store = open_store(policies={}, max_bytes=250)
+    for key in ['a', 'b', 'c']:
+        store.set(OMDB_NAMESPACE, key, 'x' * 98)
+        clock.now += 1
+    assert store.total_bytes == 300 - 100
+    assert store.get(OMDB_NAMESPACE, 'a') is None
+    ## reading b makes c the least recently used entry
+    assert store.get(OMDB_NAMESPACE, 'b') == 'x' * 98
+    clock.now += 1
+    store.set(OMDB_NAMESPACE, 'd', 'x' * 98)
+    assert store.get(OMDB_NAMESPACE, 'c') is None
+    assert store.get(OMDB_NAMESPACE, 'b') is not None and store.get(OMDB_NAMESPACE, 'd') is not None
+    assert store.total_bytes <= 250
+
+def test_compressed_entries_read_back_and_count_their_stored_size(open_store):
+    store = open_store(compress=True)
+    html = '<tr><td>Frozen II</td></tr>' * 1000
+    store.set(BOX_OFFICE_NAMESPACE, 'november', html)
+    assert store.get(BOX_OFFICE_NAMESPACE, 'november') == html
+    assert store.total_bytes < len(html) / 10
+
+def test_size_and_access_survive_reopening(clock, tmp_path, open_store):
+    store = CacheStore(str(tmp_path / 'cache.sqlite'), policies={}, max_bytes=250)
+    store.set(OMDB_NAMESPACE, 'a', 'x' * 98)
+    clock.now += 1
+    store.set(OMDB_NAMESPACE, 'b', 'x' * 98)
+    clock.now += 1
+    store.get(OMDB_NAMESPACE, 'a')
+    store.close()
+    store = open_store(policies={}, max_bytes=250)
+    assert store.total_bytes == 200
+    clock.now += 1
+    store.set(OMDB_NAMESPACE, 'c', 'x' * 98)
+    assert store.get(OMDB_NAMESPACE, 'b') is None
+    assert store.get(OMDB_NAMESPACE, 'a') is not None
+
+def test_json_cache_is_migrated(clock, tmp_path, open_store):
+    json_filename = str(tmp_path / 'cache.json')
+    with open(json_filename, 'w') as cache_file:
+        json.dump({'june': '<html>june</html>', 'Captain Marvel': FOUND}, cache_file)
+    store = open_store()
+    assert cache_store.migrate_json_cache(json_filename, store) == 2
+    assert store.get(BOX_OFFICE_NAMESPACE, 'june') == '<html>june</html>'
+    assert store.get(OMDB_NAMESPACE, 'Captain Marvel') == FOUND
+    ## the migrated pages expire like fetched ones, and are kept to be revalidated
+    clock.now += DAY
+    assert store.get(BOX_OFFICE_NAMESPACE, 'june') is None
+    assert store.get(BOX_OFFICE_NAMESPACE, 'june', allow_expired=True) == '<html>june</html>'
+
+def test_a_policy_without_a_ttl_never_expires(clock, open_store):
+    store = open_store(policies={OMDB_NAMESPACE: CachePolicy(ttl=None, negative_ttl=DAY, is_negative=cache_store.is_omdb_failure)})
+    store.set(OMDB_NAMESPACE, 'tt4154664', FOUND)
+    clock.now += 3650 * DAY
+    assert store.get(OMDB_NAMESPACE, 'tt4154664') == FOUND
@@ -0,0 +1,102 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import contextlib
+import io
+import sqlite3
+import time
+
+import pytest
+import requests
+
+import Final_Project_Code_zhuxiaoy as program
+import cache_store
+from conftest import expire_pages
+from fetcher import Fetcher
+
+def test_get_raises_on_client_error(stub_server):
+    fetcher = Fetcher(max_retries=0)
+    try:
+        with pytest.raises(requests.HTTPError):
+            fetcher.get(stub_server.base_url + '/month/no-such-month/')
+        assert fetcher.get(stub_server.base_url + '/month/june/').status_code == 200
+    finally:
+        fetcher.close()
+
+def test_failed_fetch_keeps_cached_page(store, stub_server, monkeypatch):
+    monkeypatch.setattr(stub_server, 'cache_dict', dict(stub_server.cache_dict))
+    with contextlib.redirect_stdout(io.StringIO()):
+        program.sync_database()
+    html = store.get(cache_store.BOX_OFFICE_NAMESPACE, 'june')
+    meta = store.get_meta(cache_store.BOX_OFFICE_NAMESPACE, 'june')[0]
+    conn = sqlite3.connect(program.DB_FILENAME)
+    before = conn.execute("SELECT COUNT(*) FROM BoxOffice WHERE TimeInterval = 'june'").fetchone()[0]
+
+    ## the page is now answered 404 Not Found
+    del stub_server.cache_dict['june']
+    expire_pages(store)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert program.sync_database()['pages'] == 0
+    assert store.get(cache_store.BOX_OFFICE_NAMESPACE, 'june', allow_expired=True) == html
+    ## the page keeps its validators and stays expired, so the next sync asks for it again
+    assert store.get_meta(cache_store.BOX_OFFICE_NAMESPACE, 'june') == (meta, False)
+    assert conn.execute("SELECT COUNT(*) FROM BoxOffice WHERE TimeInterval = 'june'").fetchone()[0] == before
+    conn.close()
+
+@pytest.fixture
+def server(stub_server, monkeypatch):
+    ''' The stub server, with its delay, errors and request count restored after the test.
+    '''
+    monkeypatch.setattr(stub_server, 'delay', 0.0)
+    monkeypatch.setattr(stub_server, 'errors', [])
+    monkeypatch.setattr(stub_server, 'request_count', 0)
+    return stub_server
+
+def test_calls_under_one_key_share_the_request_in_flight(server):
+    server.delay = 0.2
+    fetcher = Fetcher(max_workers=4)
+    try:
+        Futures = [fetcher.submit('june', server.base_url + '/month/june/') for i in range(4)]
+        assert len(set(Futures)) == 1
+        assert Futures[0].result() == server.cache_dict['june']
+        assert server.request_count == 1
+        ## once it is done, the key is fetched again
+        fetcher.submit('june', server.base_url + '/month/june/').result()
+        assert server.request_count == 2
+    finally:
+        fetcher.close()
+
+def test_requests_to_one_host_are_spaced_out(server):
+    rate = 20
+    fetcher = Fetcher(max_workers=4, rate_limits={'127.0.0.1:' + str(server.server_port): rate})
+    try:
+        start = time.monotonic()
+        Futures = [fetcher.submit(str(i), server.base_url + '/?i=tt' + str(i), as_json=True) for i in range(6)]
+        for future in Futures:
+            future.result()
+        assert time.monotonic() - start >= 5 / rate
+        assert server.request_count == 6
+    finally:
+        fetcher.close()
+
+@pytest.mark.parametrize('errors', [[429], [503, 500], [502, 504, 503]])
+def test_rate_limited_and_server_errors_are_retried(server, errors):
+    server.errors = list(errors)
+    fetcher = Fetcher(max_retries=3, backoff=0.01)
+    try:
+        assert fetcher.get(server.base_url + '/month/june/').text == server.cache_dict['june']
+        assert server.request_count == len(errors) + 1
+    finally:
+        fetcher.close()
+
+def test_retries_give_up_after_max_retries(server):
+    server.errors = [503] * 3
+    fetcher = Fetcher(max_retries=2, backoff=0.01)
+    try:
+        with pytest.raises(requests.HTTPError) as error:
+            fetcher.get(server.base_url + '/month/june/')
+        assert error.value.response.status_code == 503
+        assert server.request_count == 3
+    finally:
+        fetcher.close()
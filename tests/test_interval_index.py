@@ -0,0 +1,28 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import sqlite3
+
+import interval_index
+import movie_db
+
+def test_index_is_loaded_again_when_the_version_changes(database):
+    index = interval_index.get_index(database)
+    assert interval_index.get_index(database) is index
+    conn = sqlite3.connect(database)
+    conn.execute("UPDATE BoxOffice SET MovieName = 'Renamed' WHERE id = 1")
+    movie_db.bump_database_version(conn.cursor())
+    conn.commit()
+    conn.close()
+    reloaded = interval_index.get_index(database)
+    assert reloaded is not index
+    assert reloaded.search_movie_detail(1)[0][1] == 'Renamed'
+
+def test_champions_pages(database):
+    index = interval_index.get_index(database)
+    Rows, total = index.get_champions('june', 'year', True, 1990, 1999, 1, 4)
+    assert total == 10
+    assert [m[0] for m in Rows] == [1999, 1998, 1997, 1996]
+    Rows, total = index.get_champions('june', 'gross', True, 1990, 1999)
+    assert [m[3] for m in Rows] == sorted([m[3] for m in Rows], reverse=True)
@@ -0,0 +1,62 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import pytest
+import requests
+
+import Final_Project_Code_zhuxiaoy as program
+import omdb_resolver
+
+def record(title, year, kind='movie', imdb_id='tt0000001'):
+    return {'Response': 'True', 'Title': title, 'Year': str(year), 'Type': kind, 'imdbID': imdb_id}
+
+@pytest.mark.parametrize('release_year, matches', [(2019, True), (2018, True), (2017, False), (2020, False)])
+def test_a_record_matches_the_year_of_the_row_or_the_year_before(release_year, matches):
+    assert omdb_resolver.is_match(record('The Lion King', release_year), 'The Lion King', 2019) == matches
+
+def test_search_results_of_a_later_year_are_left_out():
+    results = {'Search': [record('Daredevil', 2004, imdb_id='tt1'), record('Daredevil', 2015, 'series', 'tt2'),
+                          record('Daredevil', 2003, imdb_id='tt3'), record('Daredevil', 1999, imdb_id='tt4')]}
+    assert omdb_resolver.rank_search_results(results, 'Daredevil', 2003) == 'tt3'
+    assert omdb_resolver.rank_search_results(results, 'Daredevil', 2002) is None
+    ## a re-release is the film of the closest earlier year
+    assert omdb_resolver.rank_search_results(results, 'Daredevil', 2013, rerelease=True) == 'tt1'
+    assert omdb_resolver.rank_search_results(results, 'Daredevil', 2013) is None
+
+def test_offline_resolution_leaves_a_mismatched_legacy_record_unresolved(store, monkeypatch):
+    def request_omdb(params):
+        raise requests.ConnectionError('offline')
+    monkeypatch.setattr(program, 'request_omdb', request_omdb)
+    legacy = record('The Lion King', 1994)
+    assert program.resolve_omdb_response('The Lion King', 2019, legacy) == omdb_resolver.NOT_FOUND
+    ## nothing is saved, so the next run resolves the film again
+    assert store.get(program.OMDB_ID_NAMESPACE, program.get_film_key('The Lion King', 2019)) is None
+    with pytest.raises(requests.ConnectionError):
+        program.resolve_omdb_response('The Lion King', 2019)
+
+## OMDB's records of the remake and of the film, which a lookup by title alone does not return
+## (it answers the 1994 The Lion King and the 2015 Daredevil series)
+LION_KING_2019 = dict(record('The Lion King', 2019, imdb_id='tt6105098'), Ratings=[])
+DAREDEVIL_2003 = dict(record('Daredevil', 2003, imdb_id='tt0287978'), Ratings=[])
+
+@pytest.fixture
+def omdb(store, stub_server, monkeypatch):
+    cache_dict = dict(stub_server.cache_dict)
+    cache_dict.update({'The Lion King (2019)': LION_KING_2019, 'Daredevil (2003)': DAREDEVIL_2003})
+    monkeypatch.setattr(stub_server, 'cache_dict', cache_dict)
+    return store
+
+@pytest.mark.parametrize('title, year, imdb_id', [
+    ('The Lion King', 2019, 'tt6105098'),
+    ('The Lion King', 1994, 'tt0110357'),
+    ('The Lion King2011 3D Release', 2011, 'tt0110357'),
+    ('Daredevil', 2003, 'tt0287978'),
+])
+def test_films_sharing_a_title_are_resolved_by_year(omdb, title, year, imdb_id):
+    assert program.resolve_omdb_response(title, year)['imdbID'] == imdb_id
+    assert omdb.get(program.OMDB_ID_NAMESPACE, program.get_film_key(title, year)) == {'imdbID': imdb_id}
+
+def test_a_series_is_not_taken_for_a_film(omdb):
+    assert program.resolve_omdb_response('Daredevil', 2016) == omdb_resolver.NOT_FOUND
+    assert omdb.get(program.OMDB_ID_NAMESPACE, program.get_film_key('Daredevil', 2016)) == {'imdbID': None}
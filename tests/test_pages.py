@@ -0,0 +1,51 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import pytest
+
+import Final_Project_Code_zhuxiaoy as program
+
+@pytest.fixture
+def client(database):
+    program.RENDER_CACHE.clear()
+    with program.get_app().test_client() as client:
+        yield client
+    program.RENDER_CACHE.clear()
+
+def test_results_page_renders_a_choice_of_the_form(client):
+    response = client.post('/results', data={'movies': 'Champions', 'champions': 'IMDB rating', 'allmovies': 'NA', 'interval': 'june'})
+    assert response.status_code == 200
+    assert b'IMDB rating' in response.data
+
+@pytest.mark.parametrize('form', [
+    {'movies': 'Champions', 'champions': 'IMDB rating', 'interval': 'junuary'},
+    {'movies': 'Champions', 'champions': 'NA', 'interval': 'june'},
+    {'movies': 'AllMovies', 'allmovies': 'gross', 'interval': 'june'},
+    {'movies': 'Everything', 'champions': 'gross', 'interval': 'june'},
+    {'interval': 'june'},
+])
+def test_results_page_refuses_other_choices_before_caching(client, form):
+    assert client.post('/results', data=form).status_code == 400
+    assert not program.RENDER_CACHE.pages
+
+@pytest.mark.parametrize('query', ['analysis=rolling&window=0', 'analysis=genres&limit=-1', 'window=x', 'analysis=everything', 'interval=junuary'])
+def test_analytics_refuses_invalid_arguments(client, query):
+    assert client.get('/api/analytics?' + query).status_code == 400
+
+def test_analytics_caps_window_and_limit(client):
+    response = client.get('/api/analytics?analysis=rolling&interval=june&window=' + '9' * 30)
+    assert response.status_code == 200
+    assert len(response.get_json()['rows']) > 0
+    assert client.get('/analytics?analysis=genres&interval=june&limit=100000').status_code == 200
+    assert client.get('/analytics?analysis=genres&interval=june&limit=' + str(program.ANALYTICS_MAX_LIMIT)).status_code == 200
+    assert len(program.RENDER_CACHE.pages) == 1
+
+def test_metrics_are_served_only_with_the_option(database, monkeypatch):
+    monkeypatch.setattr(program, 'APP', None)
+    assert program.get_app().test_client().get('/metrics').status_code == 404
+    monkeypatch.setattr(program, 'APP', None)
+    monkeypatch.setattr(program.instrumentation, 'ENABLED', True)
+    response = program.get_app().test_client().get('/metrics')
+    assert response.status_code == 200
+    assert 'render cache' in response.get_json()
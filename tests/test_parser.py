@@ -0,0 +1,23 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import json
+import os
+
+import pytest
+
+import box_office_parser
+from cache_store import TIME_INTERVALS
+from conftest import PROJECT_DIR
+
+pytest.importorskip('lxml')
+
+with open(os.path.join(PROJECT_DIR, 'cache.json'), 'r') as cache_file:
+    PAGES = dict((key, value) for key, value in json.load(cache_file).items() if key in TIME_INTERVALS)
+
+@pytest.mark.parametrize('interval', sorted(PAGES))
+def test_lxml_and_beautifulsoup_read_the_same_rows(interval):
+    Rows = box_office_parser.parse_box_office_rows_lxml(PAGES[interval])
+    assert len(Rows) > 0
+    assert Rows == box_office_parser.parse_box_office_rows_soup(PAGES[interval])
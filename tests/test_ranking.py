@@ -0,0 +1,32 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import pytest
+
+import Final_Project_Code_zhuxiaoy as program
+import movie_dataset
+import movie_db
+
+pytest.importorskip('numpy')
+
+@pytest.mark.parametrize('variable, time_interval, first_year, last_year, limit, ascending', [
+    ('IMDB rating', 'june', 1990, 2000, 10, False),
+    ('gross', None, None, None, 25, False),
+    ('Metacritic rating', 'first quarter', None, 1999, None, True),
+    ('average gross', 'december', 2000, None, 5, True),
+])
+def test_dataset_ranking_matches_sqlite(database, variable, time_interval, first_year, last_year, limit, ascending):
+    Ranked = movie_dataset.get_dataset(database).rank(variable, time_interval, first_year, last_year, limit, ascending)
+    assert len(Ranked) > 0
+    assert Ranked == movie_db.search_ranking(variable, time_interval, first_year, last_year, limit, ascending, database)
+
+def test_rank_api(database):
+    with program.get_app().test_client() as client:
+        data = client.get('/api/rank?variable=IMDB%20rating&interval=june&from=1990&to=1999&limit=3').get_json()
+        assert len(data['movies']) == 3
+        Values = [movie['value'] for movie in data['movies']]
+        assert Values == sorted(Values, reverse=True)
+        assert all(1990 <= movie['year'] <= 1999 for movie in data['movies'])
+        assert client.get('/api/rank?variable=popcorn').status_code == 400
+        assert len(client.get('/api/rank?variable=gross&limit=100000').get_json()['movies']) == 100
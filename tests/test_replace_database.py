@@ -0,0 +1,62 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import os
+import sqlite3
+
+import pytest
+
+import movie_db
+
+def make_database(filename, value, journal_mode='delete'):
+    conn = sqlite3.connect(filename)
+    conn.execute('PRAGMA journal_mode=' + journal_mode)
+    conn.execute('CREATE TABLE T (value)')
+    conn.execute('INSERT INTO T VALUES (?)', (value,))
+    conn.commit()
+    conn.close()
+
+def read(filename):
+    return movie_db.get_connection(filename).execute('SELECT value FROM T').fetchone()[0]
+
+def test_readers_move_to_the_new_file(tmp_path):
+    filename = str(tmp_path / 'Movies.sqlite')
+    make_database(filename, 'old')
+    assert read(filename) == 'old'
+    make_database(filename + '.build', 'new')
+    movie_db.replace_database(filename + '.build', filename)
+    assert read(filename) == 'new'
+    assert not os.path.exists(filename + '-wal')
+    movie_db.close_connections()
+
+def test_old_wal_database_is_checkpointed_before_the_swap(tmp_path):
+    filename = str(tmp_path / 'Movies.sqlite')
+    make_database(filename, 'old', 'wal')
+    make_database(filename + '.build', 'new')
+    movie_db.replace_database(filename + '.build', filename)
+    conn = sqlite3.connect(filename)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    assert conn.execute('SELECT value FROM T').fetchone()[0] == 'new'
+    conn.close()
+    assert not os.path.exists(filename + '-wal') and not os.path.exists(filename + '-shm')
+
+def test_old_wal_database_in_use_is_not_replaced(tmp_path):
+    filename = str(tmp_path / 'Movies.sqlite')
+    make_database(filename, 'old', 'wal')
+    make_database(filename + '.build', 'new')
+    reader = sqlite3.connect(filename, timeout=0.1)
+    reader.execute('SELECT value FROM T').fetchone()
+    with pytest.raises(sqlite3.OperationalError):
+        movie_db.replace_database(filename + '.build', filename)
+    ## its -wal and -shm files are left to the connection using them
+    assert os.path.exists(filename + '-wal')
+    assert reader.execute('SELECT value FROM T').fetchone()[0] == 'old'
+    reader.close()
+
+def test_new_wal_database_is_refused(tmp_path):
+    filename = str(tmp_path / 'Movies.sqlite')
+    make_database(filename, 'old')
+    make_database(filename + '.build', 'new', 'wal')
+    with pytest.raises(ValueError):
+        movie_db.replace_database(filename + '.build', filename)
@@ -0,0 +1,50 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import pytest
+
+import Final_Project_Code_zhuxiaoy as program
+import movie_db
+
+def titles(database, text):
+    return [result[1] for result in movie_db.search_movies(text, 10, database)]
+
+@pytest.mark.parametrize('text, first', [
+    ('frozzen', 'Frozen II'),
+    ('avngers endgme', 'Avengers: Endgame'),
+    ('jurasic park', 'Jurassic Park'),
+    ('the lion kng', 'The Lion King'),
+])
+def test_misspelled_search_finds_the_movie_first(database, text, first):
+    assert titles(database, text)[0] == first
+
+@pytest.mark.parametrize('text, unrelated', [
+    ('lion king', ["Look Who's Talking", 'The Incredible Shrinking Woman']),
+    ('batman', ['Dave', 'Juno', 'Twins', 'Stripes', 'Ghostbusters']),
+    ('jaws', ["We're the Millers"]),
+])
+def test_search_leaves_out_titles_sharing_a_few_letters(database, text, unrelated):
+    Titles = titles(database, text)
+    assert set(Titles).isdisjoint(unrelated)
+
+def test_batman_ranking(database):
+    assert titles(database, 'batman') == ['Batman', 'Batman Forever', 'Batman Begins', 'Batman Returns', 'The Lego Batman Movie']
+
+def test_similarity():
+    assert movie_db.get_similarity('Frozen', 'Frozen II') == 1.0
+    assert movie_db.get_similarity('frozzen', 'Frozen II') >= movie_db.FUZZY_MIN_SIMILARITY
+    assert movie_db.get_similarity('lion king', "Look Who's Talking") < movie_db.FUZZY_MIN_SIMILARITY
+    assert movie_db.get_similarity('jaws', "We're the Millers") == 0.0
+    assert movie_db.get_similarity('', 'Jaws') == 0.0
+
+@pytest.mark.parametrize('limit, count', [('-1', 1), ('0', 1), ('3', 3), ('1000', 50)])
+def test_search_api_clamps_limit(database, limit, count):
+    with program.get_app().test_client() as client:
+        response = client.get('/api/search?q=the&limit=' + limit)
+    assert response.status_code == 200
+    assert len(response.get_json()['hits']) == count
+
+def test_search_api_refuses_invalid_limit(database):
+    with program.get_app().test_client() as client:
+        assert client.get('/api/search?q=the&limit=ten').status_code == 400
@@ -0,0 +1,45 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import sqlite3
+
+import pytest
+
+import snapshot
+
+np = pytest.importorskip('numpy')
+
+def read_rows(filename, table):
+    conn = sqlite3.connect(filename)
+    Rows = conn.execute('SELECT * FROM "' + table + '" ORDER BY 1').fetchall()
+    conn.close()
+    return Rows
+
+def test_snapshot_round_trip(database, tmp_path):
+    snapshot_filename = str(tmp_path / 'Movies.npz')
+    imported = str(tmp_path / 'Imported.sqlite')
+    Counts = snapshot.export_snapshot(database, snapshot_filename)
+    assert snapshot.import_snapshot(snapshot_filename, imported) == Counts
+    for table in snapshot.SNAPSHOT_TABLES:
+        assert read_rows(imported, table) == read_rows(database, table)
+
+def test_kinds():
+    assert [snapshot.get_kind(declared) for declared in ['INTEGER', 'REAL', 'TEXT', '', 'DOUBLE']] == ['int', 'float', 'text', 'text', 'float']
+
+@pytest.mark.parametrize('sql', [
+    'CREATE TRIGGER "Cleanup" AFTER INSERT ON BoxOffice BEGIN DELETE FROM Movie; END',
+    'DROP TABLE BoxOffice',
+    'CREATE TABLE "Other"(id INTEGER)',
+    'CREATE VIEW "Both" AS SELECT 1; DROP TABLE Movie',
+])
+def test_import_runs_only_the_snapshot_schema(database, tmp_path, sql):
+    snapshot_filename = str(tmp_path / 'Movies.npz')
+    snapshot.export_snapshot(database, snapshot_filename)
+    with np.load(snapshot_filename) as exported:
+        Arrays = {name: exported[name] for name in exported.files}
+    Arrays['schema'] = np.array(Arrays['schema'].tolist() + [sql], dtype=str)
+    with open(snapshot_filename, 'wb') as snapshot_file:
+        np.savez_compressed(snapshot_file, **Arrays)
+    with pytest.raises(ValueError):
+        snapshot.import_snapshot(snapshot_filename, str(tmp_path / 'Imported.sqlite'))
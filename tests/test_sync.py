@@ -0,0 +1,106 @@
+#################################
+##### Name:          Xiaoyang Zhu
+##### Uniqname:      zhuxiaoy
+#################################
+import contextlib
+import io
+import os
+import sqlite3
+
+import pytest
+
+import Final_Project_Code_zhuxiaoy as program
+from conftest import PROJECT_DIR, expire_pages
+
+def sync():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return program.sync_database()
+
+def count_rows(interval):
+    conn = sqlite3.connect(program.DB_FILENAME)
+    count = conn.execute('SELECT COUNT(*) FROM BoxOffice WHERE TimeInterval = ?', (interval,)).fetchone()[0]
+    conn.close()
+    return count
+
+@pytest.fixture
+def synced(store, stub_server, monkeypatch):
+    ''' A first sync of every page, after which the pages served may be changed.
+    '''
+    monkeypatch.setattr(stub_server, 'cache_dict', dict(stub_server.cache_dict))
+    sync()
+    return store
+
+@pytest.mark.parametrize('page', ['<html><body>Service unavailable</body></html>', 'cut short'])
+def test_sync_keeps_rows_of_implausible_page(synced, stub_server, page):
+    before = count_rows('june')
+    assert before > 0
+    html = stub_server.cache_dict['june']
+    if page == 'cut short':
+        ## keep the first few rows of the table only
+        page = html[:html.index('</tr>', html.index('</tr>', html.index('</tr>') + 1) + 1)] + '</tr></table></body></html>'
+    stub_server.cache_dict['june'] = page
+    expire_pages(synced)
+    Counts = sync()
+    assert Counts['pages'] == 0
+    assert count_rows('june') == before
+    ## the page is read again by the next sync, and replaces the rows once it is whole again
+    stub_server.cache_dict['june'] = html.replace('</body>', '<!-- updated --></body>')
+    expire_pages(synced)
+    assert sync()['pages'] == 1
+    assert count_rows('june') == before
+
+def test_sync_deletes_years_missing_from_plausible_page(synced, stub_server):
+    before = count_rows('june')
+    html = stub_server.cache_dict['june']
+    ## drop the row of the latest year
+    start = html.index('<tr', html.index('</tr>'))
+    stub_server.cache_dict['june'] = html[:start] + html[html.index('</tr>', start) + len('</tr>'):]
+    expire_pages(synced)
+    assert sync()['pages'] == 1
+    assert count_rows('june') == before - 1
+
+def test_unresolved_films_are_keyed_by_name_and_year():
+    assert program.get_movie_key('Phantom Movie', 1999, {'Response': 'False'}) == 'phantom movie|1999'
+    assert program.get_movie_key('Phantom Movie', 2004, {'Response': 'False'}) != program.get_movie_key('Phantom Movie', 1999, {'Response': 'False'})
+    assert program.get_movie_key('Daredevil', 2003, {'Response': 'True', 'Title': 'Daredevil', 'Year': '2003'}) == 'daredevil|2003'
+
+def test_sync_keys_the_unresolved_films_of_an_earlier_version_again(store, database):
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM Movie WHERE MovieKey LIKE '%|'").fetchone()[0] > 0
+    conn.close()
+    sync()
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM Movie WHERE MovieKey LIKE '%|'").fetchone()[0] == 0
+    assert conn.execute('SELECT COUNT(*) FROM BoxOffice WHERE MovieId IS NULL OR MovieId NOT IN (SELECT id FROM Movie)').fetchone()[0] == 0
+    conn.close()
+
+## the tables as the first version of the program wrote them: money, counts and ratings as strings
+## (e.g. '$204,417,855', '124 min', '6.6/10') and one MovieDetailedInformation row per box office row
+OLD_BOX_OFFICE_TABLE_SQL = '''CREATE TABLE "BoxOffice"(id integer PRIMARY KEY AUTOINCREMENT UNIQUE, MovieYear integer NOT NULL,
+    TimeInterval text NOT NULL, MovieName text NOT NULL, Gross real NOT NULL, Release real NOT NULL,
+    CumulativeGross real NOT NULL, AverageGross real NOT NULL)'''
+OLD_DETAILED_INFORMATION_TABLE_SQL = '''CREATE TABLE "MovieDetailedInformation"(id integer PRIMARY KEY AUTOINCREMENT UNIQUE,
+    title text, ReleaseDate text, runtime real, genre text, director text, Internet_Movie_rating real,
+    Rotten_Tomatoes_rating real, Metacritic_rating real)'''
+
+def test_sync_upgrades_a_database_of_the_first_version(store):
+    bundled = sqlite3.connect(os.path.join(PROJECT_DIR, 'Movies.sqlite'))
+    Rows = bundled.execute('SELECT id, MovieYear, TimeInterval, MovieName, Gross, Release, CumulativeGross, AverageGross FROM BoxOffice').fetchall()
+    bundled.close()
+    conn = sqlite3.connect(program.DB_FILENAME)
+    conn.execute(OLD_BOX_OFFICE_TABLE_SQL)
+    conn.execute(OLD_DETAILED_INFORMATION_TABLE_SQL)
+    conn.executemany('INSERT INTO BoxOffice VALUES (?,?,?,?,?,?,?,?)',
+                     [row[:4] + ('${:,}'.format(row[4]), '{:,}'.format(row[5]), '${:,}'.format(row[6]), '${:,}'.format(row[7])) for row in Rows])
+    conn.execute("INSERT INTO MovieDetailedInformation VALUES (1, 'Bad Boys for Life', '17 Jan 2020', '124 min', 'Action', 'Adil El Arbi', '6.6/10', '77%', '59/100')")
+    conn.commit()
+    conn.close()
+    sync()
+    conn = sqlite3.connect(program.DB_FILENAME)
+    assert conn.execute("SELECT type FROM sqlite_master WHERE name = 'MovieDetailedInformation'").fetchone()[0] == 'view'
+    assert conn.execute('SELECT id, MovieYear, TimeInterval, MovieName, Gross, Release, CumulativeGross, AverageGross FROM BoxOffice ORDER BY id').fetchall() == sorted(Rows)
+    assert conn.execute("SELECT COUNT(*) FROM BoxOffice WHERE typeof(Gross) != 'integer' OR typeof(AverageGross) != 'integer'").fetchone()[0] == 0
+    assert conn.execute('SELECT COUNT(*) FROM BoxOffice WHERE MovieId IS NULL').fetchone()[0] == 0
+    assert conn.execute('SELECT runtime, Internet_Movie_rating, Rotten_Tomatoes_rating FROM Movie WHERE MovieKey = ?',
+                        ('bad boys for life|2020',)).fetchone() == (124, 66.0, 77.0)
+    conn.close()